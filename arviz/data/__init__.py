@@ -2,6 +2,7 @@
 from .base import CoordSpec, DimSpec, dict_to_dataset, numpy_to_data_array
 from .converters import convert_to_dataset, convert_to_inference_data
 from .datasets import clear_data_home, list_datasets, load_arviz_data
+from .diagnostics_cache import DiagnosticsCache
 from .inference_data import InferenceData, concat
 from .io_cmdstan import from_cmdstan
 from .io_cmdstanpy import from_cmdstanpy
@@ -18,6 +19,7 @@ from .io_tfp import from_tfp
 
 __all__ = [
     "InferenceData",
+    "DiagnosticsCache",
     "concat",
     "load_arviz_data",
     "list_datasets",
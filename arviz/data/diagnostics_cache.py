@@ -0,0 +1,177 @@
+"""Cache of diagnostics computed on the groups of InferenceData objects."""
+from collections import OrderedDict
+
+import numpy as np
+import xarray as xr
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+__all__ = ["DiagnosticsCache"]
+
+CACHE_GROUP = "diagnostics_cache"
+
+
+def _params_key(params):
+    """Convert a dict of parameters to a hashable and serializable key."""
+    if params is None:
+        params = {}
+    return json.dumps(
+        {key: np.asarray(value).tolist() for key, value in params.items()}, sort_keys=True
+    )
+
+
+class DiagnosticsCache:
+    """Cache of diagnostics results of InferenceData groups.
+
+    Results are stored per variable, keyed by group, variable name, method and the
+    parameters used to compute them. :class:`~arviz.InferenceData` objects invalidate
+    the results of a group whenever the group is replaced or removed, for example with
+    ``sel``, ``map`` or ``rename``. Modifying a group dataset inplace, instead of
+    replacing it, is not detected, use :meth:`invalidate` in that case.
+
+    Attributes
+    ----------
+    hits : int
+        Number of variable results found in the cache.
+    misses : int
+        Number of variable results not found in the cache.
+
+    Examples
+    --------
+    Diagnostics computed on ``InferenceData`` objects are reused:
+
+    .. ipython::
+
+        In [1]: import arviz as az
+           ...: idata = az.load_arviz_data("centered_eight")
+           ...: az.ess(idata, var_names=["mu"])
+           ...: az.ess(idata)
+           ...: idata.diagnostics_cache
+
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """Return the number of cached variable results."""
+        return len(self._entries)
+
+    def __repr__(self):
+        """Make string representation of the cache."""
+        return (
+            f"Diagnostics cache with {len(self)} results ({self.hits} hits, {self.misses} misses)"
+        )
+
+    def __deepcopy__(self, memo):
+        """Return an empty cache, deep copies are often modified inplace."""
+        return DiagnosticsCache()
+
+    def get(self, group, var_name, method, params=None):
+        """Get a cached result, ``None`` if not present.
+
+        Parameters
+        ----------
+        group : str
+        var_name : str
+        method : str
+            Name of the diagnostic and method, i.e. ``"ess_bulk"``.
+        params : dict, optional
+            Parameters used to compute the diagnostic.
+
+        Returns
+        -------
+        xarray.DataArray or None
+        """
+        value = self._entries.get((group, var_name, method, _params_key(params)))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, group, var_name, method, params, value):
+        """Store a result in the cache."""
+        self._entries[(group, var_name, method, _params_key(params))] = value
+
+    def invalidate(self, group=None):
+        """Remove the results of `group`, or all the results if `group` is None."""
+        if group is None:
+            self._entries.clear()
+        else:
+            for key in [key for key in self._entries if key[0] == group]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all the results and reset the counters."""
+        self.invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, group, dataset, keys, func):
+        """Get the diagnostics of every variable in `dataset`, computing only the missing ones.
+
+        Parameters
+        ----------
+        group : str
+            Group `dataset` comes from.
+        dataset : xarray.Dataset
+        keys : list of (str, dict) tuples
+            Method and parameters of every output of `func`.
+        func : callable
+            Called on the dataset of the variables missing from the cache. It must return
+            a dataset per key, a single dataset if there is only one key.
+
+        Returns
+        -------
+        xarray.Dataset or tuple of xarray.Dataset
+        """
+        var_names = list(dataset.data_vars)
+        results = [
+            {var_name: self.get(group, var_name, method, params) for var_name in var_names}
+            for method, params in keys
+        ]
+        missing = [
+            var_name
+            for var_name in var_names
+            if any(result[var_name] is None for result in results)
+        ]
+        if missing:
+            computed = func(dataset[missing])
+            if len(keys) == 1:
+                computed = (computed,)
+            for (method, params), result, computed_dataset in zip(keys, results, computed):
+                for var_name in missing:
+                    result[var_name] = computed_dataset[var_name]
+                    self.set(group, var_name, method, params, computed_dataset[var_name])
+        datasets = tuple(xr.Dataset(result) for result in results)
+        return datasets[0] if len(keys) == 1 else datasets
+
+    def to_datasets(self):
+        """Convert the cache to datasets, one per group, method and parameters.
+
+        Returns
+        -------
+        list of xarray.Dataset
+            The group, method and parameters are stored as attributes.
+        """
+        grouped = OrderedDict()
+        for (group, var_name, method, params), value in self._entries.items():
+            grouped.setdefault((group, method, params), {})[var_name] = value
+        return [
+            xr.Dataset(data_vars, attrs={"group": group, "method": method, "params": params})
+            for (group, method, params), data_vars in grouped.items()
+        ]
+
+    def update_from_datasets(self, datasets):
+        """Add the results stored in datasets created by :meth:`to_datasets`."""
+        for dataset in datasets:
+            attrs = dataset.attrs
+            params = json.loads(attrs["params"])
+            for var_name, value in dataset.data_vars.items():
+                self.set(attrs["group"], var_name, attrs["method"], params, value)
@@ -16,6 +16,7 @@ import xarray as xr
 from ..rcparams import rcParams
 from ..utils import HtmlTemplate, _subset_list, either_dict_or_kwargs
 from .base import _extend_xr_method, _make_json_serializable, dict_to_dataset
+from .diagnostics_cache import CACHE_GROUP, DiagnosticsCache
 
 try:
     import ujson as json
@@ -27,6 +28,7 @@ SUPPORTED_GROUPS = [
     "posterior_predictive",
     "predictions",
     "log_likelihood",
+    "psis",
     "sample_stats",
     "prior",
     "prior_predictive",
@@ -38,6 +40,9 @@ SUPPORTED_GROUPS = [
 
 WARMUP_TAG = "warmup_"
 
+# groups the psis group is computed from
+PSIS_SOURCE_GROUPS = ("posterior", "log_likelihood")
+
 SUPPORTED_GROUPS_WARMUP = [
     "{}posterior".format(WARMUP_TAG),
     "{}posterior_predictive".format(WARMUP_TAG),
@@ -100,6 +105,8 @@ class InferenceData:
         """
         self._groups = []
         self._groups_warmup = []
+        self._diagnostics_cache = DiagnosticsCache()
+        self._valid_psis = None
         save_warmup = kwargs.pop("save_warmup", False)
         key_list = [key for key in SUPPORTED_GROUPS_ALL if key in kwargs]
         for key in kwargs:
@@ -133,6 +140,7 @@ class InferenceData:
                     key = "{}{}".format(WARMUP_TAG, key)
                     setattr(self, key, dataset_warmup)
                     self._groups_warmup.append(key)
+        self._valid_psis = getattr(self, "psis", None)
 
     def __repr__(self):
         """Make string representation of InferenceData object."""
@@ -173,14 +181,63 @@ class InferenceData:
             html_repr = f"<pre>{escape(repr(self))}</pre>"
         return html_repr
 
+    def __setattr__(self, name, value):
+        """Set an attribute, invalidating the cached diagnostics of replaced groups."""
+        cache = self.__dict__.get("_diagnostics_cache")
+        if cache is not None and not name.startswith("_"):
+            cache.invalidate(name)
+        if name in PSIS_SOURCE_GROUPS:
+            self.__dict__["_valid_psis"] = None
+        object.__setattr__(self, name, value)
+
     def __delattr__(self, group):
         """Delete a group from the InferenceData object."""
         if group in self._groups:
             self._groups.remove(group)
         elif group in self._groups_warmup:
             self._groups_warmup.remove(group)
+        cache = self.__dict__.get("_diagnostics_cache")
+        if cache is not None:
+            cache.invalidate(group)
+        if group in PSIS_SOURCE_GROUPS + ("psis",):
+            self.__dict__["_valid_psis"] = None
         object.__delattr__(self, group)
 
+    @property
+    def diagnostics_cache(self):
+        """Cache of the diagnostics computed on the groups of the InferenceData object.
+
+        See :class:`~arviz.data.diagnostics_cache.DiagnosticsCache`.
+        """
+        if "_diagnostics_cache" not in self.__dict__:
+            # objects unpickled from versions without cache
+            self._diagnostics_cache = DiagnosticsCache()
+        return self._diagnostics_cache
+
+    @property
+    def _psis(self):
+        """Get the ``psis`` group if it is valid, ``None`` otherwise.
+
+        The ``psis`` group is valid if it was stored with :meth:`_set_psis`, or given when
+        creating the object, and neither it nor the ``posterior`` and ``log_likelihood``
+        groups have been replaced since.
+        """
+        psis = self.__dict__.get("psis")
+        if psis is None or psis is not self.__dict__.get("_valid_psis"):
+            return None
+        return psis
+
+    def _set_psis(self, dataset):
+        """Store the ``psis`` group computed from the current groups."""
+        if "psis" not in self._groups:
+            previous_groups = SUPPORTED_GROUPS[: SUPPORTED_GROUPS.index("psis")]
+            index = len([group for group in self._groups if group in previous_groups])
+            self._groups.insert(index, "psis")
+        self._diagnostics_cache.invalidate("psis")
+        # set through __dict__, like __setattr__, to mark the new group as valid
+        self.__dict__["psis"] = dataset
+        self.__dict__["_valid_psis"] = dataset
+
     @property
     def _groups_all(self):
         return self._groups + self._groups_warmup
@@ -229,8 +286,12 @@ class InferenceData:
         InferenceData object
         """
         groups = {}
+        cache_groups = []
         with nc.Dataset(filename, mode="r") as data:
             data_groups = list(data.groups)
+            if CACHE_GROUP in data_groups:
+                data_groups.remove(CACHE_GROUP)
+                cache_groups = list(data.groups[CACHE_GROUP].groups)
 
         for group in data_groups:
             with xr.open_dataset(filename, group=group) as data:
@@ -238,9 +299,16 @@ class InferenceData:
                     groups[group] = data.load()
                 else:
                     groups[group] = data
-        return InferenceData(**groups)
+        inference_data = InferenceData(**groups)
+
+        cache_datasets = []
+        for group in cache_groups:
+            with xr.open_dataset(filename, group=f"{CACHE_GROUP}/{group}") as data:
+                cache_datasets.append(data.load())
+        inference_data.diagnostics_cache.update_from_datasets(cache_datasets)
+        return inference_data
 
-    def to_netcdf(self, filename, compress=True, groups=None):
+    def to_netcdf(self, filename, compress=True, groups=None, diagnostics_cache=False):
         """Write InferenceData to file using netcdf4.
 
         Parameters
@@ -251,7 +319,12 @@ class InferenceData:
             Whether to compress result. Note this saves disk space, but may make
             saving and loading somewhat slower (default: True).
         groups : list, optional
-            Write only these groups to netcdf file.
+            Write only these groups to netcdf file. The ``psis`` group is not written if
+            the ``posterior`` or ``log_likelihood`` groups have changed since it was computed.
+        diagnostics_cache : bool, optional
+            Also write the cached diagnostics of the written groups to a
+            ``diagnostics_cache`` group, they are restored by :meth:`from_netcdf`.
+            Defaults to False.
 
         Returns
         -------
@@ -264,6 +337,8 @@ class InferenceData:
                 groups = self._groups_all
             else:
                 groups = [group for group in self._groups_all if group in groups]
+            if self._psis is None:
+                groups = [group for group in groups if group != "psis"]
 
             for group in groups:
                 data = getattr(self, group)
@@ -273,6 +348,16 @@ class InferenceData:
                 data.to_netcdf(filename, mode=mode, group=group, **kwargs)
                 data.close()
                 mode = "a"
+
+            if diagnostics_cache:
+                cache_datasets = [
+                    dataset
+                    for dataset in self.diagnostics_cache.to_datasets()
+                    if dataset.attrs["group"] in groups
+                ]
+                for i, dataset in enumerate(cache_datasets):
+                    dataset.to_netcdf(filename, mode=mode, group=f"{CACHE_GROUP}/entry{i}")
+                    mode = "a"
         else:  # creates a netcdf file for an empty InferenceData object.
             empty_netcdf_file = nc.Dataset(filename, mode="w", format="NETCDF4")
             empty_netcdf_file.close()
@@ -1388,11 +1473,14 @@ def concat(*args, dim=None, copy=True, inplace=False, reset_dim=True):
         for arg in args[1:]:
             for group0 in arg0_groups:
                 if group0 not in arg._groups_all:
-                    if group0 == "observed_data":
+                    if group0 in ("observed_data", "psis"):
                         continue
                     msg = "Mismatch between the groups."
                     raise TypeError(msg)
             for group in arg._groups_all:
+                # psis results are not valid for the concatenated samples
+                if group == "psis":
+                    continue
                 # handle data groups seperately
                 if group not in ["observed_data", "constant_data", "predictions_constant_data"]:
                     # assert that groups are equal
@@ -1,7 +1,9 @@
-from typing import TYPE_CHECKING, Iterable, List, Optional, overload
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, overload
 
 import xarray as xr
 
+from .diagnostics_cache import DiagnosticsCache
+
 if TYPE_CHECKING:
     from typing_extensions import Literal
 
@@ -27,7 +29,10 @@ class InferenceData:
     warmup_sample_stats: Optional[xr.Dataset]
     def __init__(self, **kwargs): ...
     def __repr__(self) -> str: ...
+    def __setattr__(self, name: str, value: Any) -> None: ...
     def __delattr__(self, group: str) -> None: ...
+    @property
+    def diagnostics_cache(self) -> DiagnosticsCache: ...
     def __add__(self, other: "InferenceData"): ...
     @property
     def _groups_all(self) -> List[str]: ...
@@ -38,6 +43,7 @@ class InferenceData:
         filename: str,
         compress: bool = True,
         groups: Optional[List[str]] = None,  # pylint: disable=line-too-long
+        diagnostics_cache: bool = False,
     ) -> str: ...
     def sel(
         self, inplace: bool = False, chain_prior: bool = False, **kwargs
@@ -74,7 +74,7 @@ def plot_autocorr(
         x_prime = x
         if combined:
             x_prime = x.flatten()
-        y = autocorr(x_prime)
+        y = autocorr(x_prime, max_lag=max_lag)
 
         ax.segment(
             x0=np.arange(len(y)),
@@ -49,7 +49,7 @@ def plot_autocorr(
         x_prime = x
         if combined:
             x_prime = x.flatten()
-        y = autocorr(x_prime)
+        y = autocorr(x_prime, max_lag=max_lag)
         ax.vlines(x=np.arange(0, max_lag), ymin=0, ymax=y[0:max_lag], lw=linewidth)
         ax.hlines(0, 0, max_lag, "steelblue")
         ax.set_title(make_label(var_name, selection), fontsize=titlesize, wrap=True)
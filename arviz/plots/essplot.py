@@ -1,10 +1,9 @@
 """Plot quantile or local effective sample sizes."""
 import numpy as np
-import xarray as xr
 
-from ..data import convert_to_dataset
+from ..data import InferenceData, convert_to_dataset
 from ..rcparams import rcParams
-from ..stats import ess
+from ..stats import ess, ess_evolution
 from ..utils import _var_names, get_coords
 from .plot_utils import default_grid, filter_plotters_list, get_plotting_function, xarray_var_iter
 
@@ -177,6 +176,8 @@ def plot_ess(
 
     data = get_coords(convert_to_dataset(idata, group="posterior"), coords)
     var_names = _var_names(var_names, data, filter_vars)
+    # without coords, diagnostics are computed on idata to use its diagnostics cache
+    diagnostics_data = idata if isinstance(idata, InferenceData) and not coords else data
     n_draws = data.dims["draw"]
     n_samples = n_draws * data.dims["chain"]
 
@@ -188,59 +189,32 @@ def plot_ess(
         probs = np.linspace(1 / n_points, 1 - 1 / n_points, n_points)
         xdata = probs
         ylabel = "{} for quantiles"
-        ess_dataset = xr.concat(
-            [
-                ess(data, var_names=var_names, relative=relative, method="quantile", prob=p)
-                for p in probs
-            ],
-            dim="ess_dim",
-        )
+        ess_dataset = ess(
+            diagnostics_data,
+            var_names=var_names,
+            relative=relative,
+            method="quantile",
+            prob=probs,
+        ).rename(prob="ess_dim")
     elif kind == "local":
         probs = np.linspace(0, 1, n_points, endpoint=False)
         xdata = probs
         ylabel = "{} for small intervals"
-        ess_dataset = xr.concat(
-            [
-                ess(
-                    data,
-                    var_names=var_names,
-                    relative=relative,
-                    method="local",
-                    prob=[p, p + 1 / n_points],
-                )
-                for p in probs
-            ],
-            dim="ess_dim",
-        )
+        ess_dataset = ess(
+            diagnostics_data,
+            var_names=var_names,
+            relative=relative,
+            method="local",
+            prob=np.stack((probs, probs + 1 / n_points), axis=-1),
+        ).rename(prob="ess_dim")
     else:
-        first_draw = data.draw.values[0]
         ylabel = "{}"
-        xdata = np.linspace(n_samples / n_points, n_samples, n_points)
-        draw_divisions = np.linspace(n_draws // n_points, n_draws, n_points, dtype=int)
-        ess_dataset = xr.concat(
-            [
-                ess(
-                    data.sel(draw=slice(first_draw + draw_div)),
-                    var_names=var_names,
-                    relative=relative,
-                    method="bulk",
-                )
-                for draw_div in draw_divisions
-            ],
-            dim="ess_dim",
-        )
-        ess_tail_dataset = xr.concat(
-            [
-                ess(
-                    data.sel(draw=slice(first_draw + draw_div)),
-                    var_names=var_names,
-                    relative=relative,
-                    method="tail",
-                )
-                for draw_div in draw_divisions
-            ],
-            dim="ess_dim",
-        )
+        ess_evolution_dataset = ess_evolution(
+            diagnostics_data, var_names=var_names, n_points=n_points, relative=relative
+        ).rename(draw_prefix="ess_dim")
+        xdata = ess_evolution_dataset["ess_dim"].values * data.dims["chain"]
+        ess_dataset = ess_evolution_dataset.sel(ess_method="bulk", drop=True)
+        ess_tail_dataset = ess_evolution_dataset.sel(ess_method="tail", drop=True)
 
     plotters = filter_plotters_list(
         list(xarray_var_iter(ess_dataset, var_names=var_names, skip_dims={"ess_dim"})), "plot_ess"
@@ -249,8 +223,8 @@ def plot_ess(
     rows, cols = default_grid(length_plotters, grid=grid)
 
     if extra_methods:
-        mean_ess = ess(data, var_names=var_names, method="mean", relative=relative)
-        sd_ess = ess(data, var_names=var_names, method="sd", relative=relative)
+        mean_ess = ess(diagnostics_data, var_names=var_names, method="mean", relative=relative)
+        sd_ess = ess(diagnostics_data, var_names=var_names, method="sd", relative=relative)
 
     essplot_kwargs = dict(
         ax=ax,
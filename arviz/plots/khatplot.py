@@ -2,6 +2,7 @@
 import numpy as np
 from xarray import DataArray
 
+from ..data import InferenceData
 from ..rcparams import rcParams
 from ..stats import ELPDData
 from ..utils import get_coords
@@ -35,7 +36,8 @@ def plot_khat(
     Parameters
     ----------
     khats : ELPDData cointaining pareto shapes information or array
-        Pareto tail indices.
+        Pareto tail indices. It can also be an InferenceData object with a ``psis`` group
+        stored by :func:`arviz.loo` with ``save_psis=True``.
     color : str or array_like, optional
         Colors of the scatter plot, if color is a str all dots will have the same color,
         if it is the size of the observations, each dot will have the specified color,
@@ -129,7 +131,14 @@ def plot_khat(
         legend = False
         dims = []
     else:
-        if isinstance(khats, ELPDData):
+        if isinstance(khats, InferenceData):
+            psis = khats._psis  # pylint: disable=protected-access
+            if psis is None:
+                raise ValueError(
+                    "InferenceData object has no valid psis group, use az.loo with save_psis=True"
+                )
+            khats = psis.pareto_k
+        elif isinstance(khats, ELPDData):
             khats = khats.pareto_k
         if not isinstance(khats, DataArray):
             raise ValueError("Incorrect khat data input. Check the documentation")
@@ -1,8 +1,7 @@
 """Plot quantile MC standard error."""
 import numpy as np
-import xarray as xr
 
-from ..data import convert_to_dataset
+from ..data import InferenceData, convert_to_dataset
 from ..rcparams import rcParams
 from ..stats import mcse
 from ..utils import _var_names, get_coords
@@ -121,11 +120,13 @@ def plot_mcse(
 
     data = get_coords(convert_to_dataset(idata, group="posterior"), coords)
     var_names = _var_names(var_names, data, filter_vars)
+    # without coords, diagnostics are computed on idata to use its diagnostics cache
+    diagnostics_data = idata if isinstance(idata, InferenceData) and not coords else data
 
     probs = np.linspace(1 / n_points, 1 - 1 / n_points, n_points)
-    mcse_dataset = xr.concat(
-        [mcse(data, var_names=var_names, method="quantile", prob=p) for p in probs], dim="mcse_dim"
-    )
+    mcse_dataset = mcse(
+        diagnostics_data, var_names=var_names, method="quantile", prob=probs
+    ).rename(prob="mcse_dim")
 
     plotters = filter_plotters_list(
         list(xarray_var_iter(mcse_dataset, var_names=var_names, skip_dims={"mcse_dim"})),
@@ -135,8 +136,8 @@ def plot_mcse(
     rows, cols = default_grid(length_plotters, grid=grid)
 
     if extra_methods:
-        mean_mcse = mcse(data, var_names=var_names, method="mean")
-        sd_mcse = mcse(data, var_names=var_names, method="sd")
+        mean_mcse = mcse(diagnostics_data, var_names=var_names, method="mean")
+        sd_mcse = mcse(diagnostics_data, var_names=var_names, method="sd")
 
     mcse_kwargs = dict(
         ax=ax,
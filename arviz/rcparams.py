@@ -280,6 +280,7 @@ defaultParams = {  # pylint: disable=invalid-name
     "stats.information_criterion": ("loo", _make_validate_choice({"waic", "loo"})),
     "stats.ic_pointwise": (False, _validate_boolean),
     "stats.ic_scale": ("log", _make_validate_choice({"deviance", "log", "negative_log"})),
+    "stats.n_jobs": (1, _validate_positive_int_or_none),
 }
 
 
@@ -15,18 +15,22 @@ __all__ = [
     "kde",
     "loo",
     "loo_pit",
+    "loo_subsample",
     "psislw",
     "r2_score",
     "summary",
     "waic",
     "ELPDData",
     "ess",
+    "ess_evolution",
     "rhat",
     "mcse",
     "geweke",
+    "StreamingDiagnostics",
     "autocorr",
     "autocov",
     "make_ufunc",
     "wrap_xarray_ufunc",
     "reloo",
+    "kfold",
 ]
@@ -3,7 +3,7 @@
 import warnings
 
 import numpy as np
-from scipy.fftpack import fft
+from scipy.fftpack import fft, next_fast_len
 from scipy.optimize import brentq
 from scipy.signal import convolve, convolve2d, gaussian  # pylint: disable=no-name-in-module
 from scipy.sparse import coo_matrix
@@ -203,19 +203,19 @@ def _dct1d(x):
     Parameters
     ----------
     x : numpy array
-        1 dimensional array of values for which the
-        DCT is desired
+        Array of values for which the DCT is desired.
+        The DCT is computed over the last axis.
 
     Returns
     -------
     output : DTC transformed values
     """
-    x_len = len(x)
+    x_len = x.shape[-1]
 
     even_increasing = np.arange(0, x_len, 2)
     odd_decreasing = np.arange(x_len - 1, 0, -2)
 
-    x = np.concatenate((x[even_increasing], x[odd_decreasing]))
+    x = np.concatenate((x[..., even_increasing], x[..., odd_decreasing]), axis=-1)
 
     w_1k = np.r_[1, (2 * np.exp(-(0 + 1j) * (np.arange(1, x_len)) * np.pi / (2 * x_len)))]
     output = np.real(w_1k * fft(x))
@@ -227,6 +227,7 @@ def _fixed_point(t, N, k_sq, a_sq):
     """Calculate t-zeta*gamma^[l](t).
 
     Implementation of the function t-zeta*gamma^[l](t) derived from equation (30) in [1].
+    `t` and `N` can be arrays, one value per row of `a_sq`.
 
     References
     ----------
@@ -238,7 +239,8 @@ def _fixed_point(t, N, k_sq, a_sq):
     a_sq = np.asfarray(a_sq, dtype=np.float64)
 
     l = 7
-    f = np.sum(np.power(k_sq, l) * a_sq * np.exp(-k_sq * np.pi ** 2 * t))
+    t_exp = np.expand_dims(t, -1)
+    f = np.sum(np.power(k_sq, l) * a_sq * np.exp(-k_sq * np.pi ** 2 * t_exp), axis=-1)
     f *= 0.5 * np.pi ** (2.0 * l)
 
     for j in np.arange(l - 1, 2 - 1, -1):
@@ -246,7 +248,8 @@ def _fixed_point(t, N, k_sq, a_sq):
         c2 = np.product(np.arange(1.0, 2 * j + 1, 2, dtype=np.float64))
         c2 /= (np.pi / 2) ** 0.5
         t_j = np.power((c1 * (c2 / (N * f))), (2.0 / (3.0 + 2.0 * j)))
-        f = np.sum(k_sq ** j * a_sq * np.exp(-k_sq * np.pi ** 2.0 * t_j))
+        t_j = np.expand_dims(t_j, -1)
+        f = np.sum(k_sq ** j * a_sq * np.exp(-k_sq * np.pi ** 2.0 * t_j), axis=-1)
         f *= 0.5 * np.pi ** (2 * j)
 
     out = t - (2 * N * np.pi ** 0.5 * f) ** (-0.4)
@@ -278,6 +281,50 @@ def _root(function, N, args, x):
     return bw
 
 
+def _root_batched(function, args, size, xtol=2e-12, maxiter=100):
+    """Find the roots of `function` in [0, 0.01] for `size` problems at once.
+
+    Vectorized counterpart of the ``brentq`` call in :func:`_root`, using the Illinois
+    variant of regula falsi. `function` is called with an array of points and `args`
+    indexed with the problems still being solved. NaN is returned for the problems
+    without a sign change in the interval.
+    """
+    lower = np.zeros(size)
+    upper = np.full(size, 0.01)
+    f_lower = function(lower, *args)
+    f_upper = function(upper, *args)
+    root = np.full(size, np.nan)
+    root[f_upper == 0] = upper[f_upper == 0]
+    root[f_lower == 0] = 0
+    side = np.zeros(size, dtype=int)
+
+    active = np.flatnonzero(f_lower * f_upper < 0)
+    for _ in range(maxiter):
+        if active.size == 0:
+            break
+        lo, hi, f_lo, f_hi = lower[active], upper[active], f_lower[active], f_upper[active]
+        t = (lo * f_hi - hi * f_lo) / (f_hi - f_lo)
+        f_t = function(t, *(arg[active] for arg in args))
+        step = np.abs(t - root[active])
+        root[active] = t
+
+        replace_lower = np.sign(f_t) == np.sign(f_lo)
+        # Illinois: halve the value of the end kept twice in a row
+        keep_upper = replace_lower & (side[active] == -1)
+        keep_lower = ~replace_lower & (side[active] == 1)
+        f_upper[active[keep_upper]] *= 0.5
+        f_lower[active[keep_lower]] *= 0.5
+        lower[active[replace_lower]] = t[replace_lower]
+        f_lower[active[replace_lower]] = f_t[replace_lower]
+        upper[active[~replace_lower]] = t[~replace_lower]
+        f_upper[active[~replace_lower]] = f_t[~replace_lower]
+        side[active] = np.where(replace_lower, -1, 1)
+
+        converged = (f_t == 0) | (step < xtol) | (upper[active] - lower[active] < xtol)
+        active = active[~converged]
+    return root
+
+
 def _check_type(x):
     """Check the input is of the correct type.
 
@@ -788,6 +835,81 @@ def _kde_convolution(x, bw, grid_edges, grid_counts, grid_len, bound_correction,
     return grid, pdf
 
 
+def _kde_linear_batched(x, grid_len=512):
+    """Linear density estimation of every element along the leading dimensions of `x`.
+
+    Batched equivalent of calling :func:`_kde_linear` with its default arguments on
+    each ``x[idx]``. The data of all the elements is binned with a single ``bincount``,
+    the bandwidths are estimated with the fixed point iterations of all the elements
+    at once and the Gaussian kernels are applied with FFT convolutions over the last axis.
+    Non finite values are ignored, every element must have at least two distinct
+    finite values.
+
+    Parameters
+    ----------
+    x : numpy array
+        Data used to calculate the density estimations, over the last axis.
+    grid_len: int, optional
+        The number of intervals used to bin the data points. Defaults to 512.
+
+    Returns
+    -------
+    grid : numpy array of shape ``(*x.shape[:-1], grid_len)``
+    pdf : numpy array of shape ``(*x.shape[:-1], grid_len)``
+    """
+    x = np.asfarray(x)
+    lead_shape = x.shape[:-1]
+    x = x.reshape(-1, x.shape[-1])
+    n_elements = x.shape[0]
+    grid_len = max(int(grid_len), 100)
+
+    finite = np.isfinite(x)
+    x = np.where(finite, x, np.nan)
+    x_len = finite.sum(axis=-1)
+    x_min = np.nanmin(x, axis=-1)
+    x_max = np.nanmax(x, axis=-1)
+    x_std = ((np.nansum(x ** 2, axis=-1) / x_len) - (np.nansum(x, axis=-1) / x_len) ** 2) ** 0.5
+    x_range = x_max - x_min
+
+    # Bin all the elements at once, the grid spans the range of each element
+    bin_width = x_range / grid_len
+    grid_edges = x_min[:, None] + bin_width[:, None] * np.arange(grid_len + 1)
+    grid = (grid_edges[:, 1:] + grid_edges[:, :-1]) / 2
+    bin_idx = ((x - x_min[:, None]) * (grid_len / x_range)[:, None])[finite].astype(int)
+    bin_idx = np.minimum(bin_idx, grid_len - 1) + grid_len * np.nonzero(finite)[0]
+    grid_counts = np.bincount(bin_idx, minlength=n_elements * grid_len)
+    grid_counts = grid_counts.reshape(n_elements, grid_len)
+
+    # Experimental bandwidth: average of Silverman's rule and Improved Sheather-Jones
+    percentile = np.percentile if finite.all() else np.nanpercentile
+    q75, q25 = percentile(x, [75, 25], axis=-1)
+    bw_silverman = 0.9 * np.minimum(x_std, (q75 - q25) / 1.34) * x_len ** (-0.2)
+    a_sq = _dct1d(grid_counts / x_len[:, None])[:, 1 : grid_len - 1] ** 2
+    k_sq = np.arange(1, grid_len - 1) ** 2
+    t = _root_batched(lambda t, n, a: _fixed_point(t, n, k_sq, a), (x_len, a_sq), n_elements)
+    # Fall back to Silverman's rule like _root when the root finding fails
+    t = np.where(t > 0, t, (bw_silverman / x_range) ** 2)
+    bw = 0.5 * (bw_silverman + t ** 0.5 * x_range) / bin_width
+
+    # Convolve the relative frequencies, reflected at the bounds, with the Gaussian kernels
+    f = grid_counts / bin_width[:, None] / x_len[:, None]
+    npad = int(grid_len / 5)
+    f = np.concatenate([f[:, npad - 1 :: -1], f, f[:, : grid_len - npad - 1 : -1]], axis=1)
+    kernel_n = np.maximum((bw * 2 * np.pi).astype(int), 1)
+    # even length kernels are centered half a bin to the right, like scipy's convolve
+    offset = np.where(kernel_n % 2 == 0, -0.5, 0)
+    half_len = kernel_n.max() // 2 + 1
+    lags = np.arange(-half_len, half_len + 1) + offset[:, None]
+    kernel = np.exp(-0.5 * (lags / bw[:, None]) ** 2)
+    kernel[np.abs(lags) > (kernel_n[:, None] - 1) / 2] = 0
+    n_fft = next_fast_len(f.shape[1] + half_len + 1)
+    kernel = np.roll(np.pad(kernel, ((0, 0), (0, n_fft - kernel.shape[1]))), -half_len, axis=1)
+    pdf = np.fft.irfft(np.fft.rfft(f, n_fft) * np.fft.rfft(kernel, n_fft), n_fft)
+    pdf = np.maximum(pdf[:, npad : npad + grid_len], 0) / (bw[:, None] * (2 * np.pi) ** 0.5)
+
+    return grid.reshape(*lead_shape, grid_len), pdf.reshape(*lead_shape, grid_len)
+
+
 def _kde_adaptive(x, bw, grid_edges, grid_counts, grid_len, bound_correction, **kwargs):
     """Compute Adaptive Kernel Density Estimation.
 
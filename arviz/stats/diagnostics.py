@@ -2,22 +2,24 @@
 """Diagnostic functions for ArviZ."""
 import warnings
 from collections.abc import Sequence
+from functools import partial
 
 import numpy as np
 import pandas as pd
-from scipy import stats
+import xarray as xr
+from scipy import special, stats
+from scipy.fftpack import next_fast_len
 
-from ..data import convert_to_dataset
-from ..utils import Numba, _numba_var, _stack, _var_names, conditional_jit
+from ..data import InferenceData, convert_to_dataset
+from ..utils import Numba, _numba_var, _var_names, conditional_jit
 from .density_utils import histogram as _histogram
-from .stats_utils import _circular_standard_deviation, _sqrt
+from .stats_utils import _circular_batch_means, _circular_standard_deviation, _QuantileSketch, _sqrt
 from .stats_utils import autocov as _autocov
 from .stats_utils import not_valid as _not_valid
-from .stats_utils import quantile as _quantile
 from .stats_utils import stats_variance_2d as svar
 from .stats_utils import wrap_xarray_ufunc as _wrap_xarray_ufunc
 
-__all__ = ["bfmi", "ess", "rhat", "mcse", "geweke"]
+__all__ = ["bfmi", "ess", "ess_evolution", "rhat", "mcse", "geweke", "StreamingDiagnostics"]
 
 
 def bfmi(data):
@@ -96,11 +98,15 @@ def ess(
         - "folded"
         - "identity"
         - "local"
+        - "rank_approx" (approximate "bulk" for very long chains, see Notes)
     relative : bool
         Return relative ess
         `ress = ess / n`
     prob : float, or tuple of two floats, optional
         probability value for "tail", "quantile" or "local" ess functions.
+        For "quantile" it can also be an array of probabilities and for "local" an
+        array of shape ``(n, 2)`` with the bounds of ``n`` intervals. The ess of all of
+        them is computed at once and returned along a new ``prob`` dimension.
     dask_kwargs : dict, optional
         Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
 
@@ -125,6 +131,14 @@ def ess(
     The current implementation is similar to Stan, which uses Geyer's initial monotone sequence
     criterion (Geyer, 1992; Geyer, 2011).
 
+    The "rank_approx" method computes the "bulk" ess without sorting all the draws of every
+    variable, nor loading them all at once: lazily loaded data is read in chunks along the
+    ``draw`` dimension and elements are processed in batches, so memory use does not grow
+    with the size of the data. Ranks come from a quantile sketch of every variable, whose rank error
+    is at most :math:`\epsilon MN` with :math:`\epsilon = \log_2(MN / 1024) / 2048`,
+    i.e. below 0.6% of the draws for 4 million draws and much smaller in practice.
+    Autocorrelations are truncated at lag 1000. `dask_kwargs` is ignored with this method.
+
     References
     ----------
     * Vehtari et al. (2019) see https://arxiv.org/abs/1903.08008
@@ -168,6 +182,7 @@ def ess(
         "folded": _ess_folded,
         "identity": _ess_identity,
         "local": _ess_local,
+        "rank_approx": _ess_rank_approx,
     }
 
     if method not in methods:
@@ -180,6 +195,8 @@ def ess(
     if isinstance(data, np.ndarray):
         data = np.atleast_2d(data)
         if len(data.shape) < 3:
+            if method == "rank_approx":
+                return ess_func(convert_to_dataset(data), relative=relative)["x"].values[()]
             if prob is not None:
                 return ess_func(  # pylint: disable=unexpected-keyword-arg
                     data, prob=prob, relative=relative
@@ -198,15 +215,42 @@ def ess(
 
     dataset = dataset if var_names is None else dataset[var_names]
 
-    ufunc_kwargs = {"ravel": False}
+    compute = partial(
+        _ess_dataset,
+        ess_func=ess_func,
+        method=method,
+        relative=relative,
+        prob=prob,
+        dask_kwargs=dask_kwargs,
+    )
+    return _cached_diagnostic(
+        data, dataset, f"ess_{method}", {"prob": prob, "relative": relative}, compute
+    )
+
+
+def _ess_dataset(dataset, ess_func, method, relative, prob, dask_kwargs):
+    """Compute the ess of every variable in `dataset`, see :func:`ess`."""
+    if method == "rank_approx":
+        return ess_func(dataset, relative=relative)
+
+    ufunc_kwargs = {"ravel": False, "vectorized": True}
     func_kwargs = {"relative": relative} if prob is None else {"prob": prob, "relative": relative}
-    return _wrap_xarray_ufunc(
+    kwargs = {}
+    prob_shape = np.shape(prob)[:-1] if method == "local" else np.shape(prob)
+    if method in ("quantile", "local") and prob_shape:
+        func_kwargs["out_shape"] = prob_shape
+        kwargs["output_core_dims"] = [["prob"]]
+    ess_dataset = _wrap_xarray_ufunc(
         ess_func,
         dataset,
         ufunc_kwargs=ufunc_kwargs,
         func_kwargs=func_kwargs,
         dask_kwargs=dask_kwargs,
+        **kwargs,
     )
+    if method == "quantile" and prob_shape:
+        ess_dataset = ess_dataset.assign_coords(prob=prob)
+    return ess_dataset
 
 
 def rhat(data, *, var_names=None, method="rank", dask_kwargs=None):
@@ -236,6 +280,7 @@ def rhat(data, *, var_names=None, method="rank", dask_kwargs=None):
         - "folded"
         - "z_scale"
         - "identity"
+        - "rank_approx" # approximate "rank" for very long chains, see Notes
     dask_kwargs : dict, optional
         Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
 
@@ -258,6 +303,14 @@ def rhat(data, *, var_names=None, method="rank", dask_kwargs=None):
     Rank values are calculated over all the chains with `scipy.stats.rankdata`.
     Each chain is split in two and normalized with the z-transform following Vehtari et al. (2019).
 
+    The "rank_approx" method computes the "rank" R-hat without sorting all the draws of every
+    variable, nor loading them all at once: lazily loaded data is read in chunks along the
+    ``draw`` dimension and elements are processed in batches, so memory use does not grow
+    with the size of the data. Ranks come from a quantile sketch of every variable, whose rank error
+    is at most :math:`\epsilon MN` with :math:`\epsilon = \log_2(MN / 1024) / 2048` for
+    :math:`M` chains and :math:`N` draws, i.e. below 0.6% of the draws for 4 million draws
+    and much smaller in practice. `dask_kwargs` is ignored with this method.
+
     References
     ----------
     * Vehtari et al. (2019) see https://arxiv.org/abs/1903.08008
@@ -288,6 +341,7 @@ def rhat(data, *, var_names=None, method="rank", dask_kwargs=None):
         "folded": _rhat_folded,
         "z_scale": _rhat_z_scale,
         "identity": _rhat_identity,
+        "rank_approx": _rhat_rank_approx,
     }
     if method not in methods:
         raise TypeError(
@@ -298,6 +352,8 @@ def rhat(data, *, var_names=None, method="rank", dask_kwargs=None):
     if isinstance(data, np.ndarray):
         data = np.atleast_2d(data)
         if len(data.shape) < 3:
+            if method == "rank_approx":
+                return rhat_func(convert_to_dataset(data))["x"].values[()]
             return rhat_func(data)
         else:
             msg = (
@@ -311,7 +367,16 @@ def rhat(data, *, var_names=None, method="rank", dask_kwargs=None):
 
     dataset = dataset if var_names is None else dataset[var_names]
 
-    ufunc_kwargs = {"ravel": False}
+    compute = partial(_rhat_dataset, rhat_func=rhat_func, method=method, dask_kwargs=dask_kwargs)
+    return _cached_diagnostic(data, dataset, f"rhat_{method}", {}, compute)
+
+
+def _rhat_dataset(dataset, rhat_func, method, dask_kwargs):
+    """Compute the rhat of every variable in `dataset`, see :func:`rhat`."""
+    if method == "rank_approx":
+        return rhat_func(dataset)
+
+    ufunc_kwargs = {"ravel": False, "vectorized": True}
     func_kwargs = {}
     return _wrap_xarray_ufunc(
         rhat_func,
@@ -341,8 +406,9 @@ def mcse(data, *, var_names=None, method="mean", prob=None, dask_kwargs=None):
         - "median"
         - "quantile"
 
-    prob : float
-        Quantile information.
+    prob : float or array_like of float
+        Quantile information. If an array, the mcse of every quantile is computed at once
+        and returned along a new ``prob`` dimension.
     dask_kwargs : dict, optional
         Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
 
@@ -404,17 +470,136 @@ def mcse(data, *, var_names=None, method="mean", prob=None, dask_kwargs=None):
 
     dataset = dataset if var_names is None else dataset[var_names]
 
-    ufunc_kwargs = {"ravel": False}
+    compute = partial(
+        _mcse_dataset, mcse_func=mcse_func, method=method, prob=prob, dask_kwargs=dask_kwargs
+    )
+    return _cached_diagnostic(data, dataset, f"mcse_{method}", {"prob": prob}, compute)
+
+
+def _mcse_dataset(dataset, mcse_func, method, prob, dask_kwargs):
+    """Compute the mcse of every variable in `dataset`, see :func:`mcse`."""
+    ufunc_kwargs = {"ravel": False, "vectorized": True}
     func_kwargs = {} if prob is None else {"prob": prob}
-    return _wrap_xarray_ufunc(
+    kwargs = {}
+    if method == "quantile" and np.ndim(prob):
+        func_kwargs["out_shape"] = np.shape(prob)
+        kwargs["output_core_dims"] = [["prob"]]
+    mcse_dataset = _wrap_xarray_ufunc(
         mcse_func,
         dataset,
         ufunc_kwargs=ufunc_kwargs,
         func_kwargs=func_kwargs,
         dask_kwargs=dask_kwargs,
+        **kwargs,
+    )
+    if method == "quantile" and np.ndim(prob):
+        mcse_dataset = mcse_dataset.assign_coords(prob=prob)
+    return mcse_dataset
+
+
+def ess_evolution(data, *, var_names=None, n_points=20, relative=False, dask_kwargs=None):
+    r"""Calculate the bulk and tail ess of growing subsets of the draws.
+
+    The ess is computed on ``n_points`` subsets made of the first draws of every chain,
+    the last subset contains all the draws.
+
+    Parameters
+    ----------
+    data : obj
+        Any object that can be converted to an ``az.InferenceData`` object.
+        Refer to documentation of ``az.convert_to_dataset`` for details.
+        For ndarray: shape = (chain, draw).
+        For n-dimensional ndarray transform first to dataset with ``az.convert_to_dataset``.
+    var_names : str or list of str
+        Names of variables to include in the return value Dataset.
+    n_points : int, optional
+        Number of subsets of the draws. Defaults to 20.
+    relative : bool
+        Return relative ess
+        `ress = ess / n`
+    dask_kwargs : dict, optional
+        Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
+
+    Returns
+    -------
+    xarray.Dataset
+        The bulk and tail ess along the ``ess_method`` and ``draw_prefix`` dimensions. The
+        ``draw_prefix`` coordinate is the number of draws per chain in each subset. For
+        ndarray input, a ``(2, n_points)`` array.
+
+    Notes
+    -----
+    The result is equivalent to calling :func:`arviz.ess` with the "bulk" and "tail" methods
+    on every subset, but the draws of every variable are sorted only once. The ranks and
+    quantiles of every subset are derived from that ordering, and the bulk and tail
+    autocovariances of a subset are computed together.
+
+    Examples
+    --------
+    Calculate the ess evolution of some variables:
+
+    .. ipython::
+
+        In [1]: import arviz as az
+           ...: data = az.load_arviz_data('non_centered_eight')
+           ...: az.ess_evolution(data, var_names=["mu", "tau"], n_points=5)
+
+    """
+    if isinstance(data, np.ndarray):
+        data = np.atleast_2d(data)
+        if len(data.shape) < 3:
+            draw_prefix = _draw_prefix(data.shape[-1], n_points)
+            return _ess_evolution(data, draw_prefix=draw_prefix, relative=relative)
+        else:
+            msg = (
+                "Only uni-dimensional ndarray variables are supported."
+                " Please transform first to dataset with `az.convert_to_dataset`."
+            )
+            raise TypeError(msg)
+
+    dataset = convert_to_dataset(data, group="posterior")
+    var_names = _var_names(var_names, dataset)
+
+    dataset = dataset if var_names is None else dataset[var_names]
+
+    compute = partial(
+        _ess_evolution_dataset, n_points=n_points, relative=relative, dask_kwargs=dask_kwargs
+    )
+    return _cached_diagnostic(
+        data, dataset, "ess_evolution", {"n_points": n_points, "relative": relative}, compute
     )
 
 
+def _ess_evolution_dataset(dataset, n_points, relative, dask_kwargs):
+    """Compute the ess evolution of every variable in `dataset`, see :func:`ess_evolution`."""
+    draw_prefix = _draw_prefix(dataset.dims["draw"], n_points)
+    ufunc_kwargs = {"ravel": False, "vectorized": True}
+    func_kwargs = {
+        "draw_prefix": draw_prefix,
+        "relative": relative,
+        "out_shape": (2, len(draw_prefix)),
+    }
+    ess_dataset = _wrap_xarray_ufunc(
+        _ess_evolution,
+        dataset,
+        ufunc_kwargs=ufunc_kwargs,
+        func_kwargs=func_kwargs,
+        dask_kwargs=dask_kwargs,
+        output_core_dims=[["ess_method", "draw_prefix"]],
+    )
+    return ess_dataset.assign_coords(ess_method=["bulk", "tail"], draw_prefix=draw_prefix)
+
+
+def _cached_diagnostic(data, dataset, method, params, func):
+    """Compute ``func(dataset)`` reusing the cached results of `data` if it is InferenceData.
+
+    `dataset` must be a subset of the variables of the posterior group of `data`.
+    """
+    if isinstance(data, InferenceData):
+        return data.diagnostics_cache.compute("posterior", dataset, [(method, params)], func)
+    return func(dataset)
+
+
 @conditional_jit(forceobj=True)
 def geweke(ary, first=0.1, last=0.5, intervals=20):
     r"""Compute z-scores for convergence diagnostics.
@@ -528,6 +713,276 @@ def ks_summary(pareto_tail_indices):
     return df_k
 
 
+class StreamingDiagnostics:
+    """Convergence diagnostics updated as draws arrive.
+
+    Draws are added in blocks, per chain or for all chains at once, and only a fixed
+    amount of memory is kept for every chain: running moments (Welford's algorithm)
+    and the sums needed to estimate the autocovariance up to ``max_lag``. R-hat,
+    ess and mcse can be requested at any time without revisiting previous draws.
+
+    Parameters
+    ----------
+    chains : int
+        Number of chains.
+    shape : tuple of int, optional
+        Shape of a single draw of the variable, ``()`` for scalar variables.
+    max_lag : int, optional
+        Maximum lag of the autocovariance kept for the ess estimates. Geyer's initial
+        positive sequence is truncated at this lag if it has not stopped before.
+
+    Notes
+    -----
+    Rank normalization and chain splitting need the whole history of draws, so the
+    diagnostics reported here are the ones computed on the raw draws:
+
+    - :meth:`rhat` matches ``rhat(ary, method="identity")``.
+    - :meth:`ess` matches ``ess(ary, method="identity")`` whenever the autocorrelation
+      sequence is truncated before ``max_lag``, otherwise it overestimates it.
+    - :meth:`mcse` is the standard deviation divided by the square root of :meth:`ess`,
+      ``mcse(ary, method="mean")`` uses the split chains ess instead.
+
+    With the same draws, results agree with the functions above to a relative tolerance
+    of 1e-8. Autocovariances are accumulated on draws shifted by the first draw of each
+    chain, precision degrades if chains drift many standard deviations away from it.
+
+    Examples
+    --------
+    Update the diagnostics with every new block of draws and stop once converged:
+
+    .. code:: python
+
+        streaming = az.StreamingDiagnostics(chains=4, shape=(8,))
+        for block in sampler:  # block of shape (4, n_draws, 8)
+            streaming.update(block)
+            if (streaming.rhat() < 1.01).all() and (streaming.ess() > 400).all():
+                break
+
+    """
+
+    def __init__(self, chains, shape=(), max_lag=1000):
+        if max_lag < 1:
+            raise ValueError("max_lag must be a positive integer")
+        self.chains = chains
+        self.shape = tuple(shape)
+        self.max_lag = max_lag
+        size = int(np.prod(self.shape, dtype=int))
+        self._count = np.zeros(chains, dtype=int)
+        self._shift = np.zeros((size, chains))
+        self._mean = np.zeros((size, chains))
+        self._m2 = np.zeros((size, chains))
+        self._sum = np.zeros((size, chains))
+        self._min = np.full((size, chains), np.inf)
+        self._max = np.full((size, chains), -np.inf)
+        self._lag_products = np.zeros((size, chains, max_lag + 1))
+        self._head = np.zeros((size, chains, max_lag))
+        self._tail = np.zeros((size, chains, max_lag))
+
+    @property
+    def draws(self):
+        """Number of draws received by every chain."""
+        return self._count.copy()
+
+    def update(self, draws, chain=None):
+        """Add a block of draws.
+
+        Parameters
+        ----------
+        draws : array_like
+            New draws. Of shape ``(chain, draw, *shape)`` if `chain` is None,
+            ``(draw, *shape)`` otherwise.
+        chain : int, optional
+            Index of the chain the draws belong to.
+
+        Returns
+        -------
+        StreamingDiagnostics
+            The updated object.
+        """
+        draws = np.asarray(draws, dtype=float)
+        if chain is None:
+            expected_shape = (self.chains, *self.shape)
+            if draws.shape[:1] + draws.shape[2:] != expected_shape:
+                raise ValueError(
+                    f"draws of shape {draws.shape} don't match expected (chain, draw, *shape) "
+                    f"shape {(self.chains, 'draw', *self.shape)}"
+                )
+            for chain_idx, chain_draws in enumerate(draws):
+                self._update_chain(chain_idx, chain_draws)
+        else:
+            if draws.shape[1:] != self.shape:
+                raise ValueError(
+                    f"draws of shape {draws.shape} don't match expected (draw, *shape) "
+                    f"shape {('draw', *self.shape)}"
+                )
+            self._update_chain(chain, draws)
+        return self
+
+    def _update_chain(self, chain, draws):
+        n_new = len(draws)
+        if n_new == 0:
+            return
+        count = self._count[chain]
+        values = draws.reshape(n_new, -1).T
+        if count == 0:
+            self._shift[:, chain] = values[:, 0]
+        values = values - self._shift[:, chain, None]
+
+        # combine running moments with the moments of the new block
+        block_mean = values.mean(axis=-1)
+        block_m2 = np.sum((values - block_mean[:, None]) ** 2, axis=-1)
+        delta = block_mean - self._mean[:, chain]
+        total = count + n_new
+        self._mean[:, chain] += delta * n_new / total
+        self._m2[:, chain] += block_m2 + delta ** 2 * count * n_new / total
+        self._sum[:, chain] += values.sum(axis=-1)
+        self._min[:, chain] = np.minimum(self._min[:, chain], values.min(axis=-1))
+        self._max[:, chain] = np.maximum(self._max[:, chain], values.max(axis=-1))
+
+        # products of every new draw with the previous max_lag ones
+        history = np.concatenate((self._tail[:, chain], values), axis=-1)
+        self._lag_products[:, chain] += _lag_products(history, values, self.max_lag)
+        if count < self.max_lag:
+            n_head = min(self.max_lag - count, n_new)
+            self._head[:, chain, count : count + n_head] = values[:, :n_head]
+        self._tail[:, chain] = history[:, -self.max_lag :]
+        self._count[chain] = total
+
+    def _check_draws(self):
+        n_draw = self._count[0]
+        if (self._count != n_draw).any():
+            raise ValueError(
+                f"All chains must have the same number of draws, got {tuple(self._count)}"
+            )
+        return n_draw
+
+    def _invalid(self, min_chains=1, min_draws=4):
+        n_draw = self._check_draws()
+        invalid = np.isnan(self._min).any(axis=-1) | np.isnan(self._max).any(axis=-1)
+        return invalid | (self.chains < min_chains) | (n_draw < min_draws)
+
+    def _result(self, values):
+        return np.reshape(values, self.shape)[()]
+
+    def autocov(self):
+        """Return the autocovariance of every chain up to ``max_lag``.
+
+        Returns
+        -------
+        np.ndarray
+            Autocovariance of shape ``(*shape, chain, lag)``, with the normalization
+            used in :func:`arviz.autocov`.
+        """
+        n_draw = self._check_draws()
+        n_lags = max(min(self.max_lag, n_draw - 1) + 1, 1)
+        lags = np.arange(n_lags)
+        mean = self._mean[..., None]
+        first_sum = np.concatenate(
+            (np.zeros(self._head.shape[:-1] + (1,)), np.cumsum(self._head, axis=-1)), axis=-1
+        )[..., :n_lags]
+        last_sum = np.concatenate(
+            (
+                np.zeros(self._tail.shape[:-1] + (1,)),
+                np.cumsum(self._tail[..., ::-1], axis=-1),
+            ),
+            axis=-1,
+        )[..., :n_lags]
+        # sum over t of (x_t - mean) * (x_{t+k} - mean), for t < n - k
+        centered_products = (
+            self._lag_products[..., :n_lags]
+            - mean * (2 * self._sum[..., None] - first_sum - last_sum)
+            + (n_draw - lags) * mean ** 2
+        )
+        centered_products[..., 0] = self._m2
+        return (centered_products / n_draw).reshape(*self.shape, self.chains, n_lags)
+
+    def rhat(self):
+        """Compute the R-hat of the draws received so far.
+
+        Returns
+        -------
+        float or np.ndarray
+            R-hat, equal to ``rhat(ary, method="identity")``.
+        """
+        invalid = self._invalid(min_chains=2)
+        n_draw = self._count[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rhat_value = _rhat_moments(self._mean + self._shift, self._m2 / (n_draw - 1), n_draw)
+        return self._result(np.where(invalid, np.nan, rhat_value))
+
+    def ess(self, relative=False):
+        """Compute the effective sample size of the draws received so far.
+
+        Parameters
+        ----------
+        relative : bool
+            Return relative ess ``ress = ess / n``.
+
+        Returns
+        -------
+        float or np.ndarray
+            Effective sample size, equal to ``ess(ary, method="identity")`` when the
+            autocorrelation sequence is truncated before ``max_lag``.
+        """
+        invalid = self._invalid()
+        n_draw = self._count[0]
+        ess = np.full(invalid.shape, float(self.chains * n_draw))
+        resolution = np.finfo(float).resolution  # pylint: disable=no-member
+        with np.errstate(invalid="ignore"):
+            constant = (self._max.max(axis=-1) - self._min.min(axis=-1)) < resolution
+        compute = ~(invalid | constant)
+        if compute.any():
+            acov = self.autocov()
+            acov = acov.reshape(-1, self.chains, acov.shape[-1])
+            chain_mean = self._mean + self._shift
+            ess[compute], _ = _ess_autocov(
+                acov[compute], chain_mean[compute], n_draw, relative=relative
+            )
+        return self._result(np.where(invalid, np.nan, ess))
+
+    def mcse(self):
+        """Compute the Monte Carlo standard error of the mean of the draws received so far.
+
+        Returns
+        -------
+        float or np.ndarray
+            Standard deviation of all the draws divided by the square root of :meth:`ess`.
+        """
+        n_draw = self._check_draws()
+        n_samples = self.chains * n_draw
+        mean = self._mean + self._shift
+        grand_mean = mean.mean(axis=-1, keepdims=True)
+        m2 = self._m2.sum(axis=-1) + n_draw * np.sum((mean - grand_mean) ** 2, axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sd = np.sqrt(m2 / (n_samples - 1))
+        return self._result(np.reshape(sd, self.shape) / np.sqrt(self.ess()))
+
+
+def _lag_products(history, values, max_lag):
+    """Compute ``sum_j values[j] * history[max_lag + j - k]`` for every lag ``k <= max_lag``.
+
+    `history` holds the previous `max_lag` draws followed by the `values`. Lags are computed
+    directly if there are few of them, with an FFT otherwise.
+    """
+    n_new = values.shape[-1]
+    if (max_lag + 1) * n_new <= 4 * (max_lag + n_new) * np.log2(max_lag + n_new + 1):
+        products = np.empty(values.shape[:-1] + (max_lag + 1,))
+        for lag in range(max_lag + 1):
+            start = max_lag - lag
+            products[..., lag] = np.sum(history[..., start : start + n_new] * values, axis=-1)
+        return products
+    n_fft = next_fast_len(max_lag + n_new)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        correlation = np.fft.irfft(
+            np.fft.rfft(history, n=n_fft, axis=-1)
+            * np.conjugate(np.fft.rfft(values, n=n_fft, axis=-1)),
+            n=n_fft,
+            axis=-1,
+        )
+    return correlation[..., max_lag::-1]
+
+
 def _bfmi(energy):
     r"""Calculate the estimated Bayesian fraction of missing information (BFMI).
 
@@ -559,15 +1014,17 @@ def _bfmi(energy):
     return num / den
 
 
-def _backtransform_ranks(arr, c=3 / 8):  # pylint: disable=invalid-name
+def _backtransform_ranks(arr, c=3 / 8, size=None):  # pylint: disable=invalid-name
     """Backtransformation of ranks.
 
     Parameters
     ----------
     arr : np.ndarray
-        Ranks array
+        Ranks array, ranks are taken along the last axis.
     c : float
         Fractional offset. Defaults to c = 3/8 as recommended by Blom (1958).
+    size : int, optional
+        Number of ranked values, defaults to the length of the last axis of `arr`.
 
     Returns
     -------
@@ -578,13 +1035,84 @@ def _backtransform_ranks(arr, c=3 / 8):  # pylint: disable=invalid-name
     Blom, G. (1958). Statistical Estimates and Transformed Beta-Variables. Wiley; New York.
     """
     arr = np.asarray(arr)
-    size = arr.size
+    if size is None:
+        size = arr.shape[-1]
     return (arr - c) / (size - 2 * c + 1)
 
 
+def _rankdata(ary):
+    """Rank ``ary`` along its last axis, ties get the average of their ranks.
+
+    Equivalent to ``scipy.stats.rankdata(ary, method="average")`` for every 1D slice
+    along the last axis, but all the slices are sorted at once.
+    """
+    ary = np.asarray(ary)
+    order = np.argsort(ary, axis=-1)
+    sorted_ary = np.take_along_axis(ary, order, axis=-1)
+    return _rank_sorted(sorted_ary, order)
+
+
+def _normal_scores(rank):
+    """Compute ``stats.norm.ppf(_backtransform_ranks(rank))`` for average ranks.
+
+    Average ranks are multiples of 1/2, so the normal quantiles are computed once per
+    possible rank and looked up instead of evaluating the ppf for every value.
+    """
+    size = rank.shape[-1]
+    z_table = stats.norm.ppf(_backtransform_ranks(np.arange(2 * size + 1) / 2, size=size))
+    return z_table[(2 * rank).astype(int)]
+
+
+def _rank_sorted(sorted_ary, order, mask=None):
+    """Compute average ranks along the last axis from an already sorted array.
+
+    Parameters
+    ----------
+    sorted_ary : np.ndarray
+        Values sorted along the last axis.
+    order : np.ndarray
+        Indices that sort the original array along the last axis.
+    mask : np.ndarray, optional
+        Boolean array with the shape of the original array. Only the values where
+        `mask` is true are ranked, as if the other values were not present. The rank
+        of values outside the mask is undefined.
+
+    Returns
+    -------
+    np.ndarray
+        Ranks with the layout of the original (unsorted) array.
+    """
+    n = sorted_ary.shape[-1]
+    if mask is None:
+        n_after = np.broadcast_to(np.arange(1, n + 1), sorted_ary.shape)
+        n_before = n_after - 1
+    else:
+        sorted_mask = np.take_along_axis(mask, order, axis=-1)
+        n_after = np.cumsum(sorted_mask, axis=-1)
+        n_before = n_after - sorted_mask
+    positions = np.arange(n)
+    tie_start = np.ones(sorted_ary.shape, dtype=bool)
+    tie_start[..., 1:] = sorted_ary[..., 1:] != sorted_ary[..., :-1]
+    tie_end = np.ones(sorted_ary.shape, dtype=bool)
+    tie_end[..., :-1] = tie_start[..., 1:]
+    first = np.maximum.accumulate(np.where(tie_start, positions, 0), axis=-1)
+    last = np.flip(
+        np.minimum.accumulate(np.flip(np.where(tie_end, positions, n - 1), axis=-1), axis=-1),
+        axis=-1,
+    )
+    first = np.take_along_axis(n_before, first, axis=-1)
+    last = np.take_along_axis(n_after, last, axis=-1)
+    rank = np.empty(sorted_ary.shape)
+    np.put_along_axis(rank, order, 0.5 * (first + last + 1), axis=-1)
+    return rank
+
+
 def _z_scale(ary):
     """Calculate z_scale.
 
+    Ranks are computed over the last two dimensions, ``(chain, draw)``, independently
+    for every element along the leading dimensions.
+
     Parameters
     ----------
     ary : np.ndarray
@@ -594,54 +1122,100 @@ def _z_scale(ary):
     np.ndarray
     """
     ary = np.asarray(ary)
-    rank = stats.rankdata(ary, method="average")
-    rank = _backtransform_ranks(rank)
-    z = stats.norm.ppf(rank)
+    rank = _rankdata(ary.reshape(*ary.shape[:-2], -1))
+    z = _normal_scores(rank)
     z = z.reshape(ary.shape)
     return z
 
 
 def _split_chains(ary):
-    """Split and stack chains."""
+    """Split and stack chains along the last two dimensions, ``(chain, draw)``."""
     ary = np.asarray(ary)
-    if len(ary.shape) > 1:
-        _, n_draw = ary.shape
-    else:
+    if len(ary.shape) < 2:
         ary = np.atleast_2d(ary)
-        _, n_draw = ary.shape
+    n_draw = ary.shape[-1]
     half = n_draw // 2
-    return _stack(ary[:, :half], ary[:, -half:])
+    return np.concatenate((ary[..., :half], ary[..., n_draw - half :]), axis=-2)
 
 
 def _z_fold(ary):
     """Fold and z-scale values."""
     ary = np.asarray(ary)
-    ary = abs(ary - np.median(ary))
+    ary = abs(ary - np.median(ary, axis=(-2, -1), keepdims=True))
     ary = _z_scale(ary)
     return ary
 
 
+def _quantile_sorted(sorted_ary, prob):
+    """Compute quantiles along the last axis of an already sorted array.
+
+    Uses the same definition (type 7) and arithmetic as :func:`arviz.stats.stats_utils.quantile`,
+    which is equivalent to sort the flattened array once per element and per call.
+    The quantiles are stacked along a new last dimension.
+    """
+    prob = np.array(prob, dtype=float, ndmin=1)
+    n = sorted_ary.shape[-1]
+    if n == 1:
+        return np.repeat(sorted_ary, len(prob), axis=-1).astype(float)
+    aleph = n * prob + (1.0 + prob * (1.0 - 1 - 1))
+    k = np.floor(aleph.clip(1, n - 1)).astype(int)
+    gamma = (aleph - k).clip(0, 1)
+    return (1.0 - gamma) * sorted_ary[..., k - 1] + gamma * sorted_ary[..., k]
+
+
+def _sort_samples(ary):
+    """Sort all the samples of every element, flattening the ``(chain, draw)`` dimensions."""
+    ary = np.asarray(ary)
+    return np.sort(ary.reshape(*ary.shape[:-2], -1), axis=-1)
+
+
+def _invalid_elements(ary, min_chains=1, min_draws=4):
+    """Flag the elements of a ``(..., chain, draw)`` array diagnostics can't be computed for.
+
+    Elements are invalid if they contain NaN values or if there are not enough
+    chains or draws, in which case all the elements are invalid.
+    """
+    invalid = _not_valid(ary, check_shape=False, nan_kwargs=dict(axis=(-2, -1)))
+    shape_error = _not_valid(
+        np.broadcast_to(0.0, ary.shape[-2:]),
+        check_nan=False,
+        shape_kwargs=dict(min_draws=min_draws, min_chains=min_chains),
+    )
+    return np.asarray(invalid | shape_error)
+
+
+def _nan_invalid(values, invalid):
+    """Set ``values`` of invalid elements to NaN, returning a scalar for 0d results."""
+    values = np.where(invalid, np.nan, values)
+    return values[()]
+
+
 def _rhat(ary):
-    """Compute the rhat for a 2d array."""
-    _numba_flag = Numba.numba_flag
-    ary = np.asarray(ary, dtype=float)
-    if _not_valid(ary, check_shape=False):
-        return np.nan
-    _, num_samples = ary.shape
-
-    # Calculate chain mean
-    chain_mean = np.mean(ary, axis=1)
-    # Calculate chain variance
-    chain_var = _numba_var(svar, np.var, ary, axis=1, ddof=1)
+    """Compute the rhat for a 2d array.
+
+    Any leading dimensions are treated as independent elements, ``(..., chain, draw)``.
+    """
+    ary = np.atleast_2d(np.asarray(ary, dtype=float))
+    invalid = _invalid_elements(ary, min_chains=0, min_draws=0)
+    _, num_samples = ary.shape[-2:]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Calculate chain mean
+        chain_mean = np.mean(ary, axis=-1)
+        # Calculate chain variance
+        chain_var = np.var(ary, axis=-1, ddof=1)
+        rhat_value = _rhat_moments(chain_mean, chain_var, num_samples)
+    return _nan_invalid(rhat_value, invalid)
+
+
+def _rhat_moments(chain_mean, chain_var, num_samples):
+    """Compute the rhat from the per chain means and variances, chains on the last axis."""
     # Calculate between-chain variance
-    between_chain_variance = num_samples * _numba_var(svar, np.var, chain_mean, axis=None, ddof=1)
+    between_chain_variance = num_samples * np.var(chain_mean, axis=-1, ddof=1)
     # Calculate within-chain variance
-    within_chain_variance = np.mean(chain_var)
+    within_chain_variance = np.mean(chain_var, axis=-1)
     # Estimate of marginal posterior variance
-    rhat_value = np.sqrt(
-        (between_chain_variance / within_chain_variance + num_samples - 1) / (num_samples)
-    )
-    return rhat_value
+    return np.sqrt((between_chain_variance / within_chain_variance + num_samples - 1) / num_samples)
 
 
 def _rhat_rank(ary):
@@ -649,112 +1223,183 @@ def _rhat_rank(ary):
 
     Computation follows https://arxiv.org/abs/1903.08008
     """
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=2)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary, min_chains=2)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
     split_ary = _split_chains(ary)
-    rhat_bulk = _rhat(_z_scale(split_ary))
-
-    split_ary_folded = abs(split_ary - np.median(split_ary))
-    rhat_tail = _rhat(_z_scale(split_ary_folded))
-
-    rhat_rank = max(rhat_bulk, rhat_tail)
-    return rhat_rank
+    split_ary_folded = abs(split_ary - np.median(split_ary, axis=(-2, -1), keepdims=True))
+    rhat_bulk, rhat_tail = _rhat(_z_scale(np.stack((split_ary, split_ary_folded))))
+    return _nan_invalid(np.maximum(rhat_bulk, rhat_tail), invalid)
 
 
 def _rhat_folded(ary):
     """Calculate split-Rhat for folded z-values."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=2)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary, min_chains=2)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
     ary = _z_fold(_split_chains(ary))
-    return _rhat(ary)
+    return _nan_invalid(_rhat(ary), invalid)
 
 
 def _rhat_z_scale(ary):
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=2)):
-        return np.nan
-    return _rhat(_z_scale(_split_chains(ary)))
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary, min_chains=2)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_rhat(_z_scale(_split_chains(ary))), invalid)
 
 
 def _rhat_split(ary):
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=2)):
-        return np.nan
-    return _rhat(_split_chains(ary))
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary, min_chains=2)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_rhat(_split_chains(ary)), invalid)
 
 
 def _rhat_identity(ary):
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=2)):
-        return np.nan
-    return _rhat(ary)
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary, min_chains=2)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_rhat(ary), invalid)
+
+
+# maximum number of values in each block of the batched autocovariance computation in _ess
+_ESS_BLOCK_SIZE = 2 ** 23
+# number of autocovariance lags computed first in _ess and growth factor when more are needed
+_ESS_INITIAL_LAGS = 16
+_ESS_LAGS_GROWTH = 8
+
+
+def _rhat_rank_approx(dataset):
+    """Calculate approximate rank normalized split R-hat of every variable in `dataset`."""
+    return _rank_approx(dataset, "rhat")
 
 
 def _ess(ary, relative=False):
-    """Compute the effective sample size for a 2D array."""
-    _numba_flag = Numba.numba_flag
-    ary = np.asarray(ary, dtype=float)
-    if _not_valid(ary, check_shape=False):
-        return np.nan
-    if (np.max(ary) - np.min(ary)) < np.finfo(float).resolution:  # pylint: disable=no-member
-        return ary.size
-    if len(ary.shape) < 2:
-        ary = np.atleast_2d(ary)
-    n_chain, n_draw = ary.shape
-    acov = _autocov(ary, axis=1)
-    chain_mean = ary.mean(axis=1)
-    mean_var = np.mean(acov[:, 0]) * n_draw / (n_draw - 1.0)
+    """Compute the effective sample size for a 2D array.
+
+    Any leading dimensions are treated as independent elements, ``(..., chain, draw)``.
+    Elements are processed in blocks, each block computes the autocovariance of all
+    its elements with a single batched FFT, and Geyer's initial positive and
+    initial monotone sequences are applied to all of them at once. Boolean arrays,
+    like the indicator series of quantiles, are converted to float block by block.
+    """
+    ary = np.atleast_2d(np.asarray(ary))
+    if ary.dtype != bool:
+        ary = ary.astype(float, copy=False)
+    element_shape = ary.shape[:-2]
+    n_chain, n_draw = ary.shape[-2:]
+    ary = ary.reshape(-1, n_chain, n_draw)
+    invalid = _invalid_elements(ary, min_chains=0, min_draws=0)
+    with np.errstate(invalid="ignore"):
+        spread = np.subtract(ary.max(axis=(-2, -1)), ary.min(axis=(-2, -1)), dtype=float)
+        constant = spread < np.finfo(float).resolution  # pylint: disable=no-member
+    ess = np.full(len(ary), float(n_chain * n_draw))
+    (compute_idx,) = np.nonzero(~(invalid | constant))
+    block_size = max(1, _ESS_BLOCK_SIZE // (n_chain * 2 * n_draw))
+    for start in range(0, len(compute_idx), block_size):
+        block_idx = compute_idx[start : start + block_size]
+        ess[block_idx] = _ess_block(ary[block_idx].astype(float, copy=False), relative=relative)
+    return _nan_invalid(ess, invalid).reshape(element_shape)[()]
+
+
+def _ess_block(ary, relative=False):
+    """Compute the effective sample size of every element of a ``(element, chain, draw)`` array.
+
+    Elements must be valid and not constant, see :func:`_ess`.
+    """
+    n_draw = ary.shape[-1]
+    chain_mean = ary.mean(axis=-1)
+    ess = np.empty(len(ary))
+    remaining = np.arange(len(ary))
+    block = ary
+    # lags are computed in growing blocks, stopping once Geyer's initial positive
+    # sequence is truncated, which for well mixed chains needs only a few lags
+    n_lags = min(_ESS_INITIAL_LAGS, n_draw)
+    while True:
+        acov = _autocov(block, axis=-1, max_lag=n_lags - 1)
+        block_ess, stopped = _ess_autocov(acov, chain_mean[remaining], n_draw, relative=relative)
+        ess[remaining] = block_ess
+        remaining = remaining[~stopped]
+        if not len(remaining):  # pylint: disable=len-as-condition
+            return ess
+        block = ary[remaining]
+        n_lags = min(n_lags * _ESS_LAGS_GROWTH, n_draw)
+
+
+def _ess_autocov(acov, chain_mean, n_draw, relative=False):
+    """Compute the effective sample size from the autocovariance of every chain.
+
+    Parameters
+    ----------
+    acov : np.ndarray
+        Autocovariance of shape ``(element, chain, lag)``. It can be truncated to fewer
+        lags than draws, if Geyer's initial positive sequence doesn't stop before the
+        last lag available, the sequence is truncated there.
+    chain_mean : np.ndarray
+        Mean of every chain, shape ``(element, chain)``.
+    n_draw : int
+        Number of draws per chain.
+    relative : bool
+        Return relative ess ``ress = ess / n``.
+
+    Returns
+    -------
+    ess : np.ndarray
+    stopped : np.ndarray
+        Boolean array, false for elements whose initial positive sequence may continue
+        after the last lag available in `acov`.
+    """
+    n_chain = acov.shape[1]
+    mean_var = np.mean(acov[..., 0], axis=-1) * n_draw / (n_draw - 1.0)
     var_plus = mean_var * (n_draw - 1.0) / n_draw
     if n_chain > 1:
-        var_plus += _numba_var(svar, np.var, chain_mean, axis=None, ddof=1)
-
-    rho_hat_t = np.zeros(n_draw)
-    rho_hat_even = 1.0
-    rho_hat_t[0] = rho_hat_even
-    rho_hat_odd = 1.0 - (mean_var - np.mean(acov[:, 1])) / var_plus
-    rho_hat_t[1] = rho_hat_odd
-
-    # Geyer's initial positive sequence
-    t = 1
-    while t < (n_draw - 3) and (rho_hat_even + rho_hat_odd) > 0.0:
-        rho_hat_even = 1.0 - (mean_var - np.mean(acov[:, t + 1])) / var_plus
-        rho_hat_odd = 1.0 - (mean_var - np.mean(acov[:, t + 2])) / var_plus
-        if (rho_hat_even + rho_hat_odd) >= 0:
-            rho_hat_t[t + 1] = rho_hat_even
-            rho_hat_t[t + 2] = rho_hat_odd
-        t += 2
-
-    max_t = t - 2
-    # improve estimation
-    if rho_hat_even > 0:
-        rho_hat_t[max_t + 1] = rho_hat_even
+        var_plus += np.var(chain_mean, axis=-1, ddof=1)
+
+    rho_hat_t = 1.0 - (mean_var[:, None] - np.mean(acov, axis=1)) / var_plus[:, None]
+    rho_hat_t[:, 0] = 1.0
+    nan_rho = np.isnan(rho_hat_t[:, 1])
+
+    # Geyer's initial positive sequence: pairs of consecutive autocorrelations are
+    # added (rho_0+rho_1, rho_2+rho_3...) until the first non positive pair
+    max_pairs = max((n_draw - 1) // 2, 1)
+    n_pairs = max(min(max_pairs, acov.shape[-1] // 2), 1)
+    pairs = rho_hat_t[:, : 2 * n_pairs].reshape(-1, n_pairs, 2)
+    pair_sum = pairs.sum(axis=-1)
+    stop = ~(pair_sum > 0)
+    stopped = stop.any(axis=1) | (n_pairs == max_pairs)
+    last_pair = np.where(stop.any(axis=1), stop.argmax(axis=1), n_pairs - 1)
+    pair_idx = np.arange(n_pairs)
     # Geyer's initial monotone sequence
-    t = 1
-    while t <= max_t - 2:
-        if (rho_hat_t[t + 1] + rho_hat_t[t + 2]) > (rho_hat_t[t - 1] + rho_hat_t[t]):
-            rho_hat_t[t + 1] = (rho_hat_t[t - 1] + rho_hat_t[t]) / 2.0
-            rho_hat_t[t + 2] = rho_hat_t[t + 1]
-        t += 2
+    monotone_sum = np.minimum.accumulate(
+        np.where(pair_idx < last_pair[:, None], pair_sum, 0), axis=1
+    )
+    # improve estimation using the even autocorrelation of the last pair if positive
+    last_even = np.take_along_axis(pairs[..., 0], last_pair[:, None], axis=1)[:, 0]
+    last_pair_sum = np.take_along_axis(pair_sum, last_pair[:, None], axis=1)[:, 0]
+    last_even = np.where((last_even > 0) | (last_pair_sum >= 0), last_even, 0)
 
     ess = n_chain * n_draw
-    tau_hat = -1.0 + 2.0 * np.sum(rho_hat_t[: max_t + 1]) + np.sum(rho_hat_t[max_t + 1 : max_t + 2])
-    tau_hat = max(tau_hat, 1 / np.log10(ess))
+    tau_hat = -1.0 + 2.0 * np.sum(monotone_sum, axis=1) + last_even
+    tau_hat = np.maximum(tau_hat, 1 / np.log10(ess))
     ess = (1 if relative else ess) / tau_hat
-    if np.isnan(rho_hat_t).any():
-        ess = np.nan
-    return ess
+    ess[nan_rho] = np.nan
+    return ess, stopped
 
 
 def _ess_bulk(ary, relative=False):
     """Compute the effective sample size for the bulk."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
     z_scaled = _z_scale(_split_chains(ary))
     ess_bulk = _ess(z_scaled, relative=relative)
-    return ess_bulk
+    return _nan_invalid(ess_bulk, invalid)
 
 
 def _ess_tail(ary, prob=None, relative=False):
@@ -767,131 +1412,370 @@ def _ess_tail(ary, prob=None, relative=False):
     elif not isinstance(prob, Sequence):
         prob = (prob, 1 - prob)
 
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
 
-    prob_low, prob_high = prob
-    quantile_low_ess = _ess_quantile(ary, prob_low, relative=relative)
-    quantile_high_ess = _ess_quantile(ary, prob_high, relative=relative)
-    return min(quantile_low_ess, quantile_high_ess)
+    quantile_ess = _ess_quantile_sorted(ary, _sort_samples(ary), prob, relative=relative)
+    quantile_low_ess, quantile_high_ess = np.moveaxis(quantile_ess, -1, 0)
+    return _nan_invalid(np.minimum(quantile_low_ess, quantile_high_ess), invalid)
 
 
 def _ess_mean(ary, relative=False):
     """Compute the effective sample size for the mean."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
-    return _ess(_split_chains(ary), relative=relative)
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_ess(_split_chains(ary), relative=relative), invalid)
 
 
 def _ess_sd(ary, relative=False):
     """Compute the effective sample size for the sd."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
     ary = _split_chains(ary)
-    return min(_ess(ary, relative=relative), _ess(ary ** 2, relative=relative))
+    ess_ary, ess_square = _ess(np.stack((ary, ary ** 2)), relative=relative)
+    return _nan_invalid(np.minimum(ess_ary, ess_square), invalid)
 
 
 def _ess_quantile(ary, prob, relative=False):
-    """Compute the effective sample size for the specific residual."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    """Compute the effective sample size for the specific residual.
+
+    If `prob` is an array, the ess of every probability is stacked along a new last
+    dimension. All the quantiles come from a single sort of every element.
+    """
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
     if prob is None:
         raise TypeError("Prob not defined.")
-    (quantile,) = _quantile(ary, prob)
-    iquantile = ary <= quantile
-    return _ess(_split_chains(iquantile), relative=relative)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape + np.shape(prob)), invalid)
+    ess = _ess_quantile_sorted(ary, _sort_samples(ary), prob, relative=relative)
+    return _nan_invalid(ess, invalid.reshape(invalid.shape + (1,) * np.ndim(prob)))
+
+
+def _ess_quantile_sorted(ary, sorted_ary, prob, relative=False):
+    """Compute the quantile ess of every probability in `prob` given the sorted samples.
+
+    Returns an array with the shape of the elements followed by the shape of `prob`.
+    """
+    prob = np.asarray(prob, dtype=float)
+    quantile = _quantile_sorted(sorted_ary, prob.ravel())
+    iquantile = ary[..., None, :, :] <= quantile[..., None, None]
+    ess = _ess(_split_chains(iquantile), relative=relative)
+    return ess.reshape(ary.shape[:-2] + prob.shape)
 
 
 def _ess_local(ary, prob, relative=False):
-    """Compute the effective sample size for the specific residual."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    """Compute the effective sample size for the specific residual.
+
+    `prob` can also be a ``(n, 2)`` array of lower and upper bounds, the ess of every
+    interval is stacked along a new last dimension.
+    """
+    ary = np.atleast_2d(np.asarray(ary))
     if prob is None:
         raise TypeError("Prob not defined.")
-    if len(prob) != 2:
+    if np.shape(prob)[-1] != 2 or np.ndim(prob) > 2:
         raise ValueError("Prob argument in ess local must be upper and lower bound")
-    quantile = _quantile(ary, prob)
-    iquantile = (quantile[0] <= ary) & (ary <= quantile[1])
-    return _ess(_split_chains(iquantile), relative=relative)
+    invalid = _invalid_elements(ary)
+    prob_shape = np.shape(prob)[:-1]
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape + prob_shape), invalid)
+    prob = np.asarray(prob, dtype=float).reshape(-1, 2)
+    quantile = _quantile_sorted(_sort_samples(ary), prob.ravel())
+    quantile = quantile.reshape(*quantile.shape[:-1], -1, 2)[..., None, None, :]
+    ary = ary[..., None, :, :]
+    iquantile = (quantile[..., 0] <= ary) & (ary <= quantile[..., 1])
+    ess = _ess(_split_chains(iquantile), relative=relative)
+    ess = ess.reshape(invalid.shape + prob_shape)
+    return _nan_invalid(ess, invalid.reshape(invalid.shape + (1,) * len(prob_shape)))
 
 
 def _ess_z_scale(ary, relative=False):
     """Calculate ess for z-scaLe."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
-    return _ess(_z_scale(_split_chains(ary)), relative=relative)
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_ess(_z_scale(_split_chains(ary)), relative=relative), invalid)
 
 
 def _ess_folded(ary, relative=False):
     """Calculate split-ess for folded data."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
-    return _ess(_z_fold(_split_chains(ary)), relative=relative)
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_ess(_z_fold(_split_chains(ary)), relative=relative), invalid)
 
 
 def _ess_median(ary, relative=False):
     """Calculate split-ess for median."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
     return _ess_quantile(ary, 0.5, relative=relative)
 
 
 def _ess_mad(ary, relative=False):
     """Calculate split-ess for mean absolute deviance."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
-    ary = abs(ary - np.median(ary))
-    ary = ary <= np.median(ary)
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    ary = abs(ary - np.median(ary, axis=(-2, -1), keepdims=True))
+    ary = ary <= np.median(ary, axis=(-2, -1), keepdims=True)
     ary = _z_scale(_split_chains(ary))
-    return _ess(ary, relative=relative)
+    return _nan_invalid(_ess(ary, relative=relative), invalid)
 
 
 def _ess_identity(ary, relative=False):
     """Calculate ess."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
-    return _ess(ary, relative=relative)
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
+    return _nan_invalid(_ess(ary, relative=relative), invalid)
+
+
+def _draw_prefix(n_draw, n_points):
+    """Compute the number of draws of every subset used by :func:`ess_evolution`."""
+    return np.unique(np.linspace(n_draw // n_points, n_draw, n_points, dtype=int).clip(1, None))
+
+
+def _ess_evolution(ary, draw_prefix, relative=False):
+    """Compute the bulk and tail ess of the first `draw_prefix` draws of every chain.
+
+    Every element is sorted once, the sorted draws of every subset are extracted from
+    that ordering to get their ranks and tail quantiles without sorting them again.
+    Returns an array of shape ``(..., 2, len(draw_prefix))``, bulk ess first.
+    """
+    ary = np.atleast_2d(np.asarray(ary, dtype=float))
+    shape = ary.shape
+    n_chain, n_draw_total = shape[-2:]
+    flat_ary = ary.reshape(*shape[:-2], -1)
+    order = np.argsort(flat_ary, axis=-1)
+    sorted_ary = np.take_along_axis(flat_ary, order, axis=-1)
+    sorted_draw = order % n_draw_total
+
+    ess = np.empty((*shape[:-2], 2, len(draw_prefix)))
+    for i, n_draw in enumerate(draw_prefix):
+        prefix = ary[..., :n_draw]
+        invalid = _invalid_elements(prefix)
+        if invalid.all():
+            ess[..., i] = np.nan
+            continue
+        in_prefix = sorted_draw < n_draw
+        prefix_shape = (*shape[:-2], n_chain * n_draw)
+        sorted_prefix = sorted_ary[in_prefix].reshape(prefix_shape)
+        prefix_order = order[in_prefix].reshape(prefix_shape)
+        prefix_order = prefix_order // n_draw_total * n_draw + prefix_order % n_draw_total
+
+        # ranks only among the draws kept by _split_chains
+        split_mask = None
+        if n_draw % 2:
+            split_mask = np.ones(prefix.shape, dtype=bool)
+            split_mask[..., n_draw // 2] = False
+            split_mask = split_mask.reshape(prefix_shape)
+        rank = _rank_sorted(sorted_prefix, prefix_order, mask=split_mask)
+        rank = _split_chains(rank.reshape(prefix.shape))
+        z_split = _normal_scores(rank.reshape(*rank.shape[:-2], -1)).reshape(rank.shape)
+
+        quantile05, quantile95 = np.moveaxis(_quantile_sorted(sorted_prefix, [0.05, 0.95]), -1, 0)
+        ess_bulk, quantile05_ess, quantile95_ess = _ess(
+            np.stack(
+                (
+                    z_split,
+                    _split_chains(prefix <= quantile05[..., None, None]),
+                    _split_chains(prefix <= quantile95[..., None, None]),
+                )
+            ),
+            relative=relative,
+        )
+        ess[..., 0, i] = _nan_invalid(ess_bulk, invalid)
+        ess[..., 1, i] = _nan_invalid(np.minimum(quantile05_ess, quantile95_ess), invalid)
+    return ess
+
+
+# number of buffered values per element of the quantile sketches used by the rank_approx methods
+_RANK_APPROX_SKETCH_SIZE = 1024
+# maximum lag of the autocovariance used by the rank_approx ess
+_RANK_APPROX_MAX_LAG = 1000
+# maximum number of values loaded or kept per element batch by the rank_approx methods
+_RANK_APPROX_CHUNK_SIZE = 2 ** 19
+
+
+def _rank_approx(dataset, diagnostic, relative=False):
+    """Compute approximate rank normalized split R-hat or bulk ess reading draws in chunks.
+
+    A first pass over the draws builds a quantile sketch of every element, a second pass
+    maps the draws to normal scores using the approximate ranks from the sketch and feeds
+    them to :class:`StreamingDiagnostics`. Elements are processed in batches and draws are
+    read in chunks along the ``draw`` dimension, so the memory used is bounded by
+    ``_RANK_APPROX_CHUNK_SIZE`` values, up to a constant factor, and lazily loaded datasets
+    are never loaded completely in memory.
+
+    Parameters
+    ----------
+    dataset : xarray.Dataset
+    diagnostic : {"rhat", "ess"}
+        Diagnostic to compute.
+    relative : bool
+        Return relative ess, ignored for R-hat.
+
+    Returns
+    -------
+    xarray.Dataset
+    """
+    data_vars = {}
+    for var_name, da in dataset.data_vars.items():
+        da = da.transpose("chain", "draw", ...)
+        template = da.isel(chain=0, draw=0, drop=True)
+        n_chain, n_draw = da.shape[:2]
+        if diagnostic == "rhat":
+            # R-hat only uses the moments of the split chains
+            max_lag = 1
+        else:
+            # autocovariance of the split chains, lags beyond their length are not needed
+            max_lag = max(min(_RANK_APPROX_MAX_LAG, n_draw // 2 - 1), 1)
+        n_levels = np.log2(max(n_chain * n_draw / _RANK_APPROX_SKETCH_SIZE, 1)) + 3
+        # values kept per element by the sketch and the lag products of StreamingDiagnostics
+        element_size = _RANK_APPROX_SKETCH_SIZE * n_levels + 3 * 4 * n_chain * (max_lag + 1)
+        batch_size = max(1, int(_RANK_APPROX_CHUNK_SIZE // element_size))
+        value = np.empty(template.shape)
+        for idx in _element_batches(template.shape, batch_size):
+            batch_value = _rank_approx_batch(
+                da[(slice(None), slice(None), *idx)], diagnostic, max_lag, relative
+            )
+            value[idx] = batch_value.reshape(value[idx].shape)
+        data_vars[var_name] = template.copy(data=value)
+    return xr.Dataset(data_vars)
+
+
+def _element_batches(shape, batch_size):
+    """Split the elements of an array of `shape` in batches of at most `batch_size` elements.
+
+    Yields tuples of integers and one slice that index contiguous batches of elements.
+    """
+    inner = 1
+    axis = len(shape)
+    # last axis sliced, all the following ones are taken whole
+    while axis > 0 and inner * shape[axis - 1] <= batch_size:
+        axis -= 1
+        inner *= shape[axis]
+    if axis == 0:
+        yield ()
+        return
+    axis -= 1
+    step = max(1, batch_size // inner)
+    for outer in np.ndindex(*shape[:axis]):
+        for start in range(0, shape[axis], step):
+            yield (*outer, slice(start, start + step))
+
+
+def _rank_approx_batch(da, diagnostic, max_lag, relative=False):
+    """Compute approximate rank normalized split R-hat or bulk ess of a batch of elements.
+
+    Returns a flat array with the diagnostic of every element of `da`.
+    """
+    n_chain, n_draw = da.shape[:2]
+    n_elements = int(np.prod(da.shape[2:], dtype=int))
+    chunk_size = max(1, _RANK_APPROX_CHUNK_SIZE // (n_chain * n_elements))
+
+    invalid = np.zeros(n_elements, dtype=bool)
+    sketch = _QuantileSketch(n_elements, size=_RANK_APPROX_SKETCH_SIZE)
+    for _, values in _draw_chunks(da, chunk_size):
+        invalid |= np.isnan(values).any(axis=(1, 2))
+        sketch.update(values.reshape(n_elements, -1))
+    n_samples = sketch.count
+
+    # folded ranks are only used by the tail R-hat
+    folded = diagnostic == "rhat"
+    if folded:
+        median = sketch.quantile(0.5)[:, None]
+    half = n_draw // 2
+    streaming = StreamingDiagnostics(
+        chains=2 * n_chain, shape=(1 + folded, n_elements), max_lag=max_lag
+    )
+    for start, values in _draw_chunks(da, chunk_size):
+        values = values.reshape(n_elements, -1)
+        n_values = values.shape[1]
+        if folded:
+            # the folded rank of a draw is the difference of the ranks of the draw and of its
+            # reflection around the median, both searched sorted
+            order = np.argsort(values, axis=1)
+            sorted_values = np.take_along_axis(values, order, axis=1)
+            ranks = np.empty((2, n_elements, n_values))
+            less, less_equal = sketch.ranks(sorted_values, assume_sorted=True)
+            less += less_equal
+            np.put_along_axis(ranks[0], order, less, axis=1)
+            less, less_equal = sketch.ranks(2 * median - sorted_values[:, ::-1], assume_sorted=True)
+            less += less_equal
+            np.put_along_axis(ranks[1], order[:, ::-1], less, axis=1)
+            ranks[1] = np.abs(ranks[0] - ranks[1])
+        else:
+            less, less_equal = sketch.ranks(values)
+            ranks = (less + less_equal)[None]
+        ranks = np.clip(0.5 * (ranks + 1), 1, n_samples)
+        # same backtransformation as _backtransform_ranks
+        z_scores = special.ndtri((ranks - 3 / 8) / (n_samples + 1 / 4))  # pylint: disable=no-member
+        z_scores = z_scores.reshape(len(ranks), n_elements, n_chain, -1)
+        draw_idx = np.arange(start, start + z_scores.shape[-1])
+        first_half = draw_idx < half
+        second_half = draw_idx >= n_draw - half
+        for chain in range(n_chain):
+            streaming.update(np.moveaxis(z_scores[..., chain, first_half], -1, 0), chain=chain)
+            streaming.update(
+                np.moveaxis(z_scores[..., chain, second_half], -1, 0), chain=chain + n_chain
+            )
+
+    invalid |= n_draw < 4
+    if folded:
+        rhat_bulk, rhat_tail = streaming.rhat()
+        return np.where(invalid | (n_chain < 2), np.nan, np.maximum(rhat_bulk, rhat_tail))
+    return np.where(invalid, np.nan, streaming.ess(relative=relative)[0])
+
+
+def _draw_chunks(da, chunk_size):
+    """Iterate over chunks of draws of a ``(chain, draw, ...)`` DataArray.
+
+    Yields the index of the first draw and the values as a ``(element, chain, draw)`` array.
+    """
+    n_chain, n_draw = da.shape[:2]
+    for start in range(0, n_draw, chunk_size):
+        values = np.asarray(da.isel(draw=slice(start, start + chunk_size)).values, dtype=float)
+        yield start, values.reshape(n_chain, values.shape[1], -1).transpose(2, 0, 1)
+
+
+def _ess_rank_approx(dataset, relative=False):
+    """Calculate approximate bulk ess of every variable in `dataset`."""
+    return _rank_approx(dataset, "ess", relative=relative)
 
 
 def _mcse_mean(ary):
     """Compute the Markov Chain mean error."""
-    _numba_flag = Numba.numba_flag
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
     ess = _ess_mean(ary)
-    if _numba_flag:
-        sd = _sqrt(svar(np.ravel(ary), ddof=1), np.zeros(1))
-    else:
-        sd = np.std(ary, ddof=1)
+    sd = np.std(ary, axis=(-2, -1), ddof=1)
     mcse_mean_value = sd / np.sqrt(ess)
-    return mcse_mean_value
+    return _nan_invalid(mcse_mean_value, invalid)
 
 
 def _mcse_sd(ary):
     """Compute the Markov Chain sd error."""
-    _numba_flag = Numba.numba_flag
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape), invalid)
     ess = _ess_sd(ary)
-    if _numba_flag:
-        sd = np.float(_sqrt(svar(np.ravel(ary), ddof=1), np.zeros(1)))
-    else:
-        sd = np.std(ary, ddof=1)
+    sd = np.std(ary, axis=(-2, -1), ddof=1)
     fac_mcse_sd = np.sqrt(np.exp(1) * (1 - 1 / ess) ** (ess - 1) - 1)
     mcse_sd_value = sd * fac_mcse_sd
-    return mcse_sd_value
+    return _nan_invalid(mcse_sd_value, invalid)
 
 
 def _mcse_median(ary):
@@ -900,23 +1784,34 @@ def _mcse_median(ary):
 
 
 def _mcse_quantile(ary, prob):
-    """Compute the Markov Chain quantile error at quantile=prob."""
-    ary = np.asarray(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan
-    ess = _ess_quantile(ary, prob)
-    probability = [0.1586553, 0.8413447]
+    """Compute the Markov Chain quantile error at quantile=prob.
+
+    If `prob` is an array, the error of every probability is stacked along a new
+    last dimension. Samples are sorted only once for all of them.
+    """
+    ary = np.atleast_2d(np.asarray(ary))
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return _nan_invalid(np.empty(invalid.shape + np.shape(prob)), invalid)
+    prob_ary = np.array(prob, dtype=float, ndmin=1)
+    sorted_ary = _sort_samples(ary)
+    ess = _ess_quantile_sorted(ary, sorted_ary, prob_ary)[..., None]
+    probability = np.array([0.1586553, 0.8413447])
     with np.errstate(invalid="ignore"):
-        ppf = stats.beta.ppf(probability, ess * prob + 1, ess * (1 - prob) + 1)
-    sorted_ary = np.sort(ary.ravel())
-    size = sorted_ary.size
+        ppf = stats.beta.ppf(
+            probability, ess * prob_ary[:, None] + 1, ess * (1 - prob_ary[:, None]) + 1
+        )
+    size = sorted_ary.shape[-1]
     ppf_size = ppf * size - 1
-    th1 = sorted_ary[int(np.floor(np.nanmax((ppf_size[0], 0))))]
-    th2 = sorted_ary[int(np.ceil(np.nanmin((ppf_size[1], size - 1))))]
-    return (th2 - th1) / 2
+    idx1 = np.floor(np.fmax(ppf_size[..., 0], 0)).astype(int)
+    idx2 = np.ceil(np.fmin(ppf_size[..., 1], size - 1)).astype(int)
+    th1 = np.take_along_axis(sorted_ary, idx1, axis=-1)
+    th2 = np.take_along_axis(sorted_ary, idx2, axis=-1)
+    mcse_quantile_value = ((th2 - th1) / 2).reshape(invalid.shape + np.shape(prob))
+    return _nan_invalid(mcse_quantile_value, invalid.reshape(invalid.shape + (1,) * np.ndim(prob)))
 
 
-def _mc_error(ary, batches=5, circular=False):
+def _mc_error(ary, batches=5, circular=False, axis=0):
     """Calculate the simulation standard error, accounting for non-independent samples.
 
     The trace is divided into batches, and the standard deviation of the batch
@@ -931,111 +1826,197 @@ def _mc_error(ary, batches=5, circular=False):
     circular : bool
         Whether to compute the error taking into account `ary` is a circular variable
         (in the range [-np.pi, np.pi]) or not. Defaults to False (i.e non-circular variables).
+    axis : int
+        Axis containing the samples, all other axes are independent elements.
+        Defaults to the first one.
 
     Returns
     -------
-    mc_error : float
-        Simulation standard error
+    mc_error : float or Numpy array
+        Simulation standard error, with the shape of `ary` without `axis`
     """
     _numba_flag = Numba.numba_flag
-    if ary.ndim > 1:
-
-        dims = np.shape(ary)
-        trace = np.transpose([t.ravel() for t in ary])
-
-        return np.reshape([_mc_error(t, batches) for t in trace], dims[1:])
-
-    else:
-        if _not_valid(ary, check_shape=False):
-            return np.nan
-        if batches == 1:
-            if circular:
-                if _numba_flag:
-                    std = _circular_standard_deviation(ary, high=np.pi, low=-np.pi)
-                else:
-                    std = stats.circstd(ary, high=np.pi, low=-np.pi)
-            else:
-                if _numba_flag:
-                    std = np.float(_sqrt(svar(ary), np.zeros(1)))
-                else:
-                    std = np.std(ary)
-            return std / np.sqrt(len(ary))
-
-        batched_traces = np.resize(ary, (batches, int(len(ary) / batches)))
+    ary = np.moveaxis(np.asarray(ary, dtype=float), axis, -1)
+    element_shape, n_samples = ary.shape[:-1], ary.shape[-1]
+    invalid = _not_valid(ary, check_shape=False, nan_kwargs=dict(axis=-1))
+    ary = ary.reshape(-1, n_samples)
 
+    if batches == 1:
         if circular:
-            means = stats.circmean(batched_traces, high=np.pi, low=-np.pi, axis=1)
             if _numba_flag:
-                std = _circular_standard_deviation(means, high=np.pi, low=-np.pi)
+                std = _circular_standard_deviation(ary, high=np.pi, low=-np.pi, axis=-1)
             else:
-                std = stats.circstd(means, high=np.pi, low=-np.pi)
+                std = stats.circstd(ary, high=np.pi, low=-np.pi, axis=-1)
         else:
-            means = np.mean(batched_traces, 1)
-            if _numba_flag:
-                std = _sqrt(svar(means), np.zeros(1))
-            else:
-                std = np.std(means)
+            std = np.sqrt(_numba_var(svar, np.var, ary, axis=1))
+        return _nan_invalid((std / np.sqrt(n_samples)).reshape(element_shape), invalid)
 
-        return std / np.sqrt(batches)
+    batch_size = n_samples // batches
+    if circular:
+        if _numba_flag:
+            means = _circular_batch_means(
+                np.ascontiguousarray(ary), batches, high=np.pi, low=-np.pi
+            )
+            std = _circular_standard_deviation(means, high=np.pi, low=-np.pi, axis=-1)
+        else:
+            batched_traces = ary[:, : batches * batch_size].reshape(-1, batches, batch_size)
+            means = stats.circmean(batched_traces, high=np.pi, low=-np.pi, axis=-1)
+            std = stats.circstd(means, high=np.pi, low=-np.pi, axis=-1)
+    else:
+        batched_traces = ary[:, : batches * batch_size].reshape(-1, batches, batch_size)
+        means = np.mean(batched_traces, axis=-1)
+        std = np.sqrt(_numba_var(svar, np.var, means, axis=1))
+
+    return _nan_invalid((std / np.sqrt(batches)).reshape(element_shape), invalid)
 
 
-def _multichain_statistics(ary):
+def _hdi_sorted(sorted_ary, hdi_prob):
+    """Compute the HDI along the last axis of an already sorted array.
+
+    Equivalent to :func:`arviz.stats.stats._hdi` on every element, without circular
+    or skipna support. The lower and higher bounds are stacked along a new last dimension.
+    """
+    n = sorted_ary.shape[-1]
+    interval_idx_inc = int(np.floor(hdi_prob * n))
+    n_intervals = n - interval_idx_inc
+    if n_intervals < 1:
+        raise ValueError("Too few elements for interval calculation. ")
+    interval_width = np.subtract(
+        sorted_ary[..., interval_idx_inc:], sorted_ary[..., :n_intervals], dtype=np.float_
+    )
+    min_idx = np.argmin(interval_width, axis=-1)[..., None]
+    return np.concatenate(
+        (
+            np.take_along_axis(sorted_ary, min_idx, axis=-1),
+            np.take_along_axis(sorted_ary, min_idx + interval_idx_inc, axis=-1),
+        ),
+        axis=-1,
+    )
+
+
+def _multichain_statistics(ary, hdi_prob=None, diagnostics=True):
     """Calculate efficiently multichain statistics for summary.
 
+    Every element along the leading dimensions of ``(..., chain, draw)`` arrays is
+    sorted only once. The hdi, the ranks of the bulk and folded draws and the tail
+    quantiles are all derived from that ordering, and the autocovariances of the five
+    series needed for the ess estimates are computed together.
+
     Parameters
     ----------
     ary : numpy.ndarray
+    hdi_prob : float, optional
+        If given, the mean, sd and hdi bounds are also computed.
+    diagnostics : bool, optional
+        Compute the diagnostics, defaults to True.
 
     Returns
     -------
     tuple
         Order of return parameters is
-            - mcse_mean, mcse_sd, ess_mean, ess_sd, ess_bulk, ess_tail, r_hat
+            - mean, sd, hdi_lower, hdi_higher if ``hdi_prob`` is not None
+            - mcse_mean, mcse_sd, ess_mean, ess_sd, ess_bulk, ess_tail, r_hat if
+              ``diagnostics`` is True
     """
-    ary = np.atleast_2d(ary)
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=1)):
-        return np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, np.nan
-    # ess mean
-    ess_mean_value = _ess_mean(ary)
-
-    # ess sd
-    ess_sd_value = _ess_sd(ary)
-
-    # ess bulk
-    z_split = _z_scale(_split_chains(ary))
-    ess_bulk_value = _ess(z_split)
-
-    # ess tail
-    quantile05, quantile95 = _quantile(ary, [0.05, 0.95])
-    iquantile05 = ary <= quantile05
-    quantile05_ess = _ess(_split_chains(iquantile05))
-    iquantile95 = ary <= quantile95
-    quantile95_ess = _ess(_split_chains(iquantile95))
-    ess_tail_value = min(quantile05_ess, quantile95_ess)
-
-    if _not_valid(ary, shape_kwargs=dict(min_draws=4, min_chains=2)):
-        rhat_value = np.nan
+    ary = np.atleast_2d(np.asarray(ary, dtype=float))
+    shape = ary.shape
+    flat_ary = ary.reshape(*shape[:-2], -1)
+    if diagnostics:
+        order = np.argsort(flat_ary, axis=-1)
+        sorted_ary = np.take_along_axis(flat_ary, order, axis=-1)
+    else:
+        sorted_ary = np.sort(flat_ary, axis=-1)
+
+    statistics = ()
+    if hdi_prob is not None:
+        hdi_bounds = _hdi_sorted(sorted_ary, hdi_prob)
+        statistics = (
+            np.mean(flat_ary, axis=-1)[()],
+            np.std(flat_ary, axis=-1, ddof=1)[()],
+            hdi_bounds[..., 0][()],
+            hdi_bounds[..., 1][()],
+        )
+    if not diagnostics:
+        return statistics
+
+    invalid = _invalid_elements(ary)
+    if invalid.all():
+        return statistics + tuple(_nan_invalid(np.empty(invalid.shape), invalid) for _ in range(7))
+    n_draw = shape[-1]
+    half = n_draw // 2
+    # mask of the draws kept by _split_chains, only differs from all true for odd draws
+    split_mask = np.ones(shape, dtype=bool)
+    if n_draw % 2:
+        split_mask[..., half] = False
+    split_mask = split_mask.reshape(*shape[:-2], -1)
+
+    quantile05, quantile95 = np.moveaxis(_quantile_sorted(sorted_ary, [0.05, 0.95]), -1, 0)
+    n_samples = sorted_ary.shape[-1]
+    if n_samples % 2:
+        median = sorted_ary[..., n_samples // 2]
     else:
-        # r_hat
-        rhat_bulk = _rhat(z_split)
-        ary_folded = np.abs(ary - np.median(ary))
-        rhat_tail = _rhat(_z_scale(_split_chains(ary_folded)))
-        rhat_value = max(rhat_bulk, rhat_tail)
+        median = np.mean(sorted_ary[..., n_samples // 2 - 1 : n_samples // 2 + 1], axis=-1)
+
+    # folded draws are sorted merging the draws below the median in reverse order
+    # with the draws above it, the stable sort is linear on these two sorted runs
+    n_below = (sorted_ary < median[..., None]).sum(axis=-1, keepdims=True)
+    positions = np.arange(n_samples)
+    runs = np.where(positions < n_below, n_below - 1 - positions, positions)
+    folded_order = np.take_along_axis(order, runs, axis=-1)
+    sorted_folded = np.abs(np.take_along_axis(flat_ary, folded_order, axis=-1) - median[..., None])
+    merge = np.argsort(sorted_folded, axis=-1, kind="stable")
+    folded_order = np.take_along_axis(folded_order, merge, axis=-1)
+    sorted_folded = np.take_along_axis(sorted_folded, merge, axis=-1)
+
+    # z-scaled split draws, ranks only among the draws kept by _split_chains
+    z_split, z_folded_split = [
+        _split_chains(_rank_sorted(sorted_values, sorted_order, mask=split_mask).reshape(shape))
+        for sorted_values, sorted_order in ((sorted_ary, order), (sorted_folded, folded_order))
+    ]
+    split_shape = z_split.shape
+    z_split, z_folded_split = [
+        _normal_scores(rank.reshape(*shape[:-2], -1)).reshape(split_shape)
+        for rank in (z_split, z_folded_split)
+    ]
+
+    split_ary = _split_chains(ary)
+    ess_mean_value, ess_square, ess_bulk_value, quantile05_ess, quantile95_ess = _ess(
+        np.stack(
+            (
+                split_ary,
+                split_ary ** 2,
+                z_split,
+                _split_chains(ary <= quantile05[..., None, None]),
+                _split_chains(ary <= quantile95[..., None, None]),
+            )
+        )
+    )
+    ess_sd_value = np.minimum(ess_mean_value, ess_square)
+    ess_tail_value = np.minimum(quantile05_ess, quantile95_ess)
+
+    if _invalid_elements(np.broadcast_to(0.0, shape[-2:]), min_chains=2):
+        rhat_value = np.full(invalid.shape, np.nan)
+    else:
+        rhat_bulk, rhat_tail = _rhat(np.stack((z_split, z_folded_split)))
+        rhat_value = np.maximum(rhat_bulk, rhat_tail)
 
     # mcse_mean
-    sd = np.std(ary, ddof=1)
+    sd = np.std(ary, axis=(-2, -1), ddof=1)
     mcse_mean_value = sd / np.sqrt(ess_mean_value)
 
     # mcse_sd
     fac_mcse_sd = np.sqrt(np.exp(1) * (1 - 1 / ess_sd_value) ** (ess_sd_value - 1) - 1)
     mcse_sd_value = sd * fac_mcse_sd
 
-    return (
-        mcse_mean_value,
-        mcse_sd_value,
-        ess_mean_value,
-        ess_sd_value,
-        ess_bulk_value,
-        ess_tail_value,
-        rhat_value,
+    return statistics + tuple(
+        _nan_invalid(value, invalid)
+        for value in (
+            mcse_mean_value,
+            mcse_sd_value,
+            ess_mean_value,
+            ess_sd_value,
+            ess_bulk_value,
+            ess_tail_value,
+            rhat_value,
+        )
     )
@@ -1,8 +1,10 @@
 # pylint: disable=too-many-lines
 """Statistical functions in ArviZ."""
 import warnings
-from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from functools import partial
+from threading import Lock
 from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
@@ -15,14 +17,15 @@ from arviz import _log
 from ..data import CoordSpec, DimSpec, InferenceData, convert_to_dataset, convert_to_inference_data
 from ..rcparams import rcParams
 from ..utils import Numba, _numba_var, _var_names, credible_interval_warning, get_coords
+from .density_utils import _kde_linear_batched
 from .density_utils import get_bins as _get_bins
 from .density_utils import histogram as _histogram
 from .density_utils import kde as _kde
 from .diagnostics import _mc_error, _multichain_statistics, ess
-from .stats_utils import ELPDData, _circular_standard_deviation
+from .stats_utils import ELPDData, _circular_standard_deviation, _get_n_jobs
 from .stats_utils import get_log_likelihood as _get_log_likelihood
+from .stats_utils import is_dask_backed as _is_dask_backed
 from .stats_utils import logsumexp as _logsumexp
-from .stats_utils import make_ufunc as _make_ufunc
 from .stats_utils import stats_variance_2d as svar
 from .stats_utils import wrap_xarray_ufunc as _wrap_xarray_ufunc
 
@@ -34,6 +37,7 @@ __all__ = [
     "hpd",
     "loo",
     "loo_pit",
+    "loo_subsample",
     "psislw",
     "r2_score",
     "summary",
@@ -42,7 +46,15 @@ __all__ = [
 
 
 def compare(
-    dataset_dict, ic=None, method="stacking", b_samples=1000, alpha=1, seed=None, scale=None
+    dataset_dict,
+    ic=None,
+    method="stacking",
+    b_samples=1000,
+    alpha=1,
+    seed=None,
+    scale=None,
+    n_jobs=None,
+    ic_kwargs=None,
 ):
     r"""Compare models based on PSIS-LOO `loo` or WAIC `waic` cross-validation.
 
@@ -53,8 +65,11 @@ def compare(
 
     Parameters
     ----------
-    dataset_dict: dict[str] -> InferenceData
-        A dictionary of model names and InferenceData objects
+    dataset_dict: dict[str] -> InferenceData, ELPDData or str
+        A dictionary of model names and InferenceData objects or pointwise ELPDData objects,
+        for example the results of :func:`loo_subsample`. Paths to netCDF files are loaded
+        when the model is evaluated, with ``rcParams["data.load"] = "lazy"`` only the
+        log likelihood data being processed is loaded in memory.
     ic: str
         Information Criterion (PSIS-LOO `loo` or WAIC `waic`) used to compare models. Defaults to
         ``rcParams["stats.information_criterion"]``.
@@ -88,6 +103,12 @@ def compare(
 
         A higher log-score (or a lower deviance) indicates a model with better predictive
         accuracy.
+    n_jobs : int, optional
+        Number of models evaluated concurrently in a thread pool. Defaults to
+        ``rcParams["stats.n_jobs"]``, all the cpus if that is None.
+    ic_kwargs : dict, optional
+        Keyword arguments passed to :func:`loo` or :func:`waic`, for example ``chunk_size``
+        to bound the memory used by every model evaluation.
 
     Returns
     -------
@@ -201,67 +222,41 @@ def compare(
     p_ic = f"p_{ic}"
     ic_i = f"{ic}_i"
 
-    ics = pd.DataFrame()
-    names = []
-    for name, dataset in dataset_dict.items():
-        names.append(name)
-        ics = ics.append([ic_func(dataset, pointwise=True, scale=scale)])
-    ics.index = names
+    if ic_kwargs is None:
+        ic_kwargs = {}
+    # opening netCDF files is not thread safe
+    load_lock = Lock()
+
+    def compute_ic(name):
+        dataset = dataset_dict[name]
+        if isinstance(dataset, ELPDData):
+            if dataset.index[0] != ic or ic_i not in dataset:
+                raise ValueError(f"ELPDData of model {name} must contain pointwise {ic} results")
+            if dataset[scale_col] != scale:
+                raise ValueError(f"ELPDData of model {name} is not in {scale} scale")
+            return dataset
+        with load_lock:
+            dataset = convert_to_inference_data(dataset)
+        return ic_func(dataset, pointwise=True, scale=scale, **ic_kwargs)
+
+    names = list(dataset_dict.keys())
+    n_jobs = min(_get_n_jobs(n_jobs), len(names))
+    if n_jobs > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            ics = list(executor.map(compute_ic, names))
+    else:
+        ics = [compute_ic(name) for name in names]
+    ics = pd.DataFrame(ics, index=names)
     ics.sort_values(by=ic, inplace=True, ascending=ascending)
-    ics[ic_i] = ics[ic_i].apply(lambda x: x.values.flatten())
+    _, _, ic_i_val = _ic_matrix(ics, ic_i)
 
     if method.lower() == "stacking":
-        rows, cols, ic_i_val = _ic_matrix(ics, ic_i)
-        exp_ic_i = np.exp(ic_i_val / scale_value)
-        km1 = cols - 1
-
-        def w_fuller(weights):
-            return np.concatenate((weights, [max(1.0 - np.sum(weights), 0.0)]))
-
-        def log_score(weights):
-            w_full = w_fuller(weights)
-            score = 0.0
-            for i in range(rows):
-                score += np.log(np.dot(exp_ic_i[i], w_full))
-            return -score
-
-        def gradient(weights):
-            w_full = w_fuller(weights)
-            grad = np.zeros(km1)
-            for k in range(km1):
-                for i in range(rows):
-                    grad[k] += (exp_ic_i[i, k] - exp_ic_i[i, km1]) / np.dot(exp_ic_i[i], w_full)
-            return -grad
-
-        theta = np.full(km1, 1.0 / cols)
-        bounds = [(0.0, 1.0) for _ in range(km1)]
-        constraints = [
-            {"type": "ineq", "fun": lambda x: -np.sum(x) + 1.0},
-            {"type": "ineq", "fun": np.sum},
-        ]
-
-        weights = minimize(
-            fun=log_score, x0=theta, jac=gradient, bounds=bounds, constraints=constraints
-        )
-
-        weights = w_fuller(weights["x"])
+        weights = _stacking_weights(ic_i_val, scale_value)
         ses = ics[ic_se]
 
     elif method.lower() == "bb-pseudo-bma":
-        rows, cols, ic_i_val = _ic_matrix(ics, ic_i)
-        ic_i_val = ic_i_val * rows
-
-        b_weighting = st.dirichlet.rvs(alpha=[alpha] * rows, size=b_samples, random_state=seed)
-        weights = np.zeros((b_samples, cols))
-        z_bs = np.zeros_like(weights)
-        for i in range(b_samples):
-            z_b = np.dot(b_weighting[i], ic_i_val)
-            u_weights = np.exp((z_b - np.max(z_b)) / scale_value)
-            z_bs[i] = z_b  # pylint: disable=unsupported-assignment-operation
-            weights[i] = u_weights / np.sum(u_weights)
-
-        weights = weights.mean(axis=0)
-        ses = pd.Series(z_bs.std(axis=0), index=names)  # pylint: disable=no-member
+        weights, z_bs_std = _bb_pseudo_bma_weights(ic_i_val, scale_value, b_samples, alpha, seed)
+        ses = pd.Series(z_bs_std, index=names)
 
     elif method.lower() == "pseudo-bma":
         min_ic = ics.iloc[0][ic]
@@ -270,15 +265,17 @@ def compare(
         ses = ics[ic_se]
 
     if np.any(weights):
-        min_ic_i_val = ics[ic_i].iloc[0]
+        min_ic_i_val = ic_i_val[:, 0]
         for idx, val in enumerate(ics.index):
             res = ics.loc[val]
             if scale_value < 0:
-                diff = res[ic_i] - min_ic_i_val
+                diff = ic_i_val[:, idx] - min_ic_i_val
             else:
-                diff = min_ic_i_val - res[ic_i]
+                diff = min_ic_i_val - ic_i_val[:, idx]
             d_ic = np.sum(diff)
             d_std_err = np.sqrt(len(diff) * np.var(diff))
+            if _is_subsampled(res) or _is_subsampled(ics.iloc[0]):
+                d_ic, d_std_err = _subsample_diff(ics.iloc[0], res, ic, scale_value, diff)
             std_err = ses.loc[val]
             weight = weights[idx]
             df_comp.at[val] = (
@@ -296,14 +293,95 @@ def compare(
     return df_comp.sort_values(by=ic, ascending=ascending)
 
 
+def _stacking_weights(ic_i_val, scale_value):
+    """Compute the stacking weights of the models from their pointwise ic values.
+
+    The log score is maximized over the simplex, parameterized by the weights of all the
+    models but the last one. The pointwise predictive densities are rescaled per
+    observation, which only shifts the log score.
+    """
+    log_dens = ic_i_val / scale_value
+    exp_ic_i = np.exp(log_dens - log_dens.max(axis=1, keepdims=True))
+    km1 = ic_i_val.shape[1] - 1
+
+    def w_fuller(weights):
+        return np.concatenate((weights, [max(1.0 - np.sum(weights), 0.0)]))
+
+    def log_score(weights):
+        return -np.log(exp_ic_i @ w_fuller(weights)).sum()
+
+    def gradient(weights):
+        dens = exp_ic_i @ w_fuller(weights)
+        return -((exp_ic_i[:, :km1] - exp_ic_i[:, km1:]) / dens[:, None]).sum(axis=0)
+
+    theta = np.full(km1, 1.0 / (km1 + 1))
+    bounds = [(0.0, 1.0) for _ in range(km1)]
+    constraints = [
+        {"type": "ineq", "fun": lambda x: -np.sum(x) + 1.0},
+        {"type": "ineq", "fun": np.sum},
+    ]
+    weights = minimize(
+        fun=log_score, x0=theta, jac=gradient, bounds=bounds, constraints=constraints
+    )["x"]
+    return w_fuller(weights)
+
+
+def _bb_pseudo_bma_weights(ic_i_val, scale_value, b_samples, alpha, seed):
+    """Compute the Bayesian bootstrap pseudo-BMA weights of the models.
+
+    All the bootstrap samples are drawn and weighted with a single matrix product. Returns
+    the weights and the standard deviation of the bootstrapped ic values.
+    """
+    rows = ic_i_val.shape[0]
+    b_weighting = st.dirichlet.rvs(alpha=[alpha] * rows, size=b_samples, random_state=seed)
+    z_bs = b_weighting @ (ic_i_val * rows)
+    log_u_weights = z_bs / scale_value
+    u_weights = np.exp(log_u_weights - log_u_weights.max(axis=1, keepdims=True))
+    weights = (u_weights / u_weights.sum(axis=1, keepdims=True)).mean(axis=0)
+    return weights, z_bs.std(axis=0)
+
+
+def _is_subsampled(elpd_data):
+    """Check if the pointwise ELPDData row of compare comes from a subsample."""
+    observations = elpd_data.get("subsample_observations")
+    return observations is not None and not np.all(pd.isna(observations))
+
+
+def _subsample_diff(best, res, ic, scale_value, diff):
+    """Difference of a model with the best one, when either of them comes from a subsample.
+
+    The difference is that of the estimates. Its standard error uses the difference
+    estimator on the pointwise differences if both models used the same simple random
+    subsample, and the pointwise values, partially approximated, otherwise.
+    """
+    if scale_value < 0:
+        d_ic = res[ic] - best[ic]
+    else:
+        d_ic = best[ic] - res[ic]
+    d_std_err = np.sqrt(len(diff) * np.var(diff))
+    if (
+        _is_subsampled(res)
+        and _is_subsampled(best)
+        and res["subsample_estimator"] == best["subsample_estimator"] == "diff_srs"
+        and np.array_equal(res["subsample_observations"], best["subsample_observations"])
+    ):
+        approx_diff = np.ravel(best[f"{ic}_approximation_i"] - res[f"{ic}_approximation_i"])
+        observations = res["subsample_observations"]
+        *_, diff_var = _srs_diff_est(
+            np.sign(scale_value) * approx_diff, diff[observations], observations
+        )
+        d_std_err = np.sqrt(max(diff_var, 0))
+    return d_ic, d_std_err
+
+
 def _ic_matrix(ics, ic_i):
     """Store the previously computed pointwise predictive accuracy values (ics) in a 2D matrix."""
     cols, _ = ics.shape
-    rows = len(ics[ic_i].iloc[0])
+    rows = np.size(ics[ic_i].iloc[0])
     ic_i_val = np.zeros((rows, cols))
 
     for idx, val in enumerate(ics.index):
-        ic = ics.loc[val][ic_i]
+        ic = np.ravel(ics.loc[val][ic_i])
 
         if len(ic) != rows:
             raise ValueError("The number of observations should be the same across all models")
@@ -468,7 +546,7 @@ def hdi(
         "skipna": skipna,
         "out_shape": (max_modes, 2) if multimodal else (2,),
     }
-    kwargs.setdefault("output_core_dims", [["hdi", "mode"] if multimodal else ["hdi"]])
+    kwargs.setdefault("output_core_dims", [["mode", "hdi"] if multimodal else ["hdi"]])
     if not multimodal:
         func_kwargs["circular"] = circular
     else:
@@ -497,6 +575,7 @@ def hdi(
     ary = ary[var_names] if var_names else ary
 
     hdi_coord = xr.DataArray(["lower", "higher"], dims=["hdi"], attrs=dict(hdi_prob=hdi_prob))
+    kwargs.setdefault("ufunc_kwargs", {"vectorized": True})
     hdi_data = _wrap_xarray_ufunc(
         func, ary, func_kwargs=func_kwargs, dask_kwargs=dask_kwargs, **kwargs
     ).assign_coords({"hdi": hdi_coord})
@@ -505,30 +584,58 @@ def hdi(
 
 
 def _hdi(ary, hdi_prob, circular, skipna):
-    """Compute hpi over the flattened array."""
-    ary = ary.flatten()
-    if skipna:
-        nans = np.isnan(ary)
-        if not nans.all():
-            ary = ary[~nans]
-    n = len(ary)
+    """Compute hpi over the last axis, for every element along the leading dimensions.
+
+    The minimum width interval is found from the differences between sorted values
+    ``floor(hdi_prob * n)`` positions apart, computed for all the elements at once. With
+    skipna, ``n`` is the number of non NaN values of each element.
+    """
+    ary = np.asarray(ary)
+    n = ary.shape[-1]
 
     if circular:
-        mean = st.circmean(ary, high=np.pi, low=-np.pi)
+        nan_policy = "omit" if skipna else "propagate"
+        mean = st.circmean(ary, high=np.pi, low=-np.pi, axis=-1, nan_policy=nan_policy)
+        mean = np.asarray(mean)[..., None]
         ary = ary - mean
         ary = np.arctan2(np.sin(ary), np.cos(ary))
 
-    ary = np.sort(ary)
-    interval_idx_inc = int(np.floor(hdi_prob * n))
-    n_intervals = n - interval_idx_inc
-    interval_width = np.subtract(ary[interval_idx_inc:], ary[:n_intervals], dtype=np.float_)
+    n_valid = np.full((*ary.shape[:-1], 1), n)
+    if skipna:
+        n_valid = n_valid - np.isnan(ary).sum(axis=-1, keepdims=True)
+        n_valid[n_valid == 0] = n
+    interval_idx_inc = np.floor(hdi_prob * n_valid).astype(int)
+    n_intervals = n_valid - interval_idx_inc
 
-    if len(interval_width) == 0:
+    if np.any(n_intervals < 1):
         raise ValueError("Too few elements for interval calculation. ")
 
-    min_idx = np.argmin(interval_width)
-    hdi_min = ary[min_idx]
-    hdi_max = ary[min_idx + interval_idx_inc]
+    if np.all(n_valid == n):
+        interval_idx_inc = interval_idx_inc.flat[0]
+        n_intervals = n - interval_idx_inc
+        if interval_idx_inc >= n_intervals:
+            # only the n_intervals lowest and highest values can be interval bounds,
+            # the values in between don't need to be sorted
+            ary = np.partition(ary, (n_intervals - 1, interval_idx_inc), axis=-1)
+            lower = np.sort(ary[..., :n_intervals], axis=-1)
+            higher = np.sort(ary[..., interval_idx_inc:], axis=-1)
+        else:
+            ary = np.sort(ary, axis=-1)
+            lower = ary[..., :n_intervals]
+            higher = ary[..., interval_idx_inc:]
+        interval_width = np.subtract(higher, lower, dtype=np.float_)
+    else:
+        # NaN values are sorted last, widths past the last interval of each element are ignored
+        ary = np.sort(ary, axis=-1)
+        positions = np.arange(n - interval_idx_inc.min())
+        lower = ary[..., : len(positions)]
+        higher = np.take_along_axis(ary, np.minimum(positions + interval_idx_inc, n - 1), axis=-1)
+        interval_width = np.subtract(higher, lower, dtype=np.float_)
+        interval_width = np.where(positions < n_intervals, interval_width, np.inf)
+
+    min_idx = np.argmin(interval_width, axis=-1)[..., None]
+    hdi_min = np.take_along_axis(lower, min_idx, axis=-1)
+    hdi_max = np.take_along_axis(higher, min_idx, axis=-1)
 
     if circular:
         hdi_min = hdi_min + mean
@@ -536,13 +643,70 @@ def _hdi(ary, hdi_prob, circular, skipna):
         hdi_min = np.arctan2(np.sin(hdi_min), np.cos(hdi_min))
         hdi_max = np.arctan2(np.sin(hdi_max), np.cos(hdi_max))
 
-    hdi_interval = np.array([hdi_min, hdi_max])
+    hdi_interval = np.concatenate((hdi_min, hdi_max), axis=-1)
 
     return hdi_interval
 
 
 def _hdi_multimodal(ary, hdi_prob, skipna, max_modes):
-    """Compute HDI if the distribution is multimodal."""
+    """Compute HDI if the distribution is multimodal.
+
+    The intervals are computed over the last axis, for every element along the leading
+    dimensions. The densities of float elements are estimated with a single batched KDE,
+    the bins within the HDI and the modes they form are then found with array operations.
+    Integer elements and elements with less than two distinct finite values are computed
+    one at a time.
+    """
+    ary = np.asarray(ary)
+    lead_shape = ary.shape[:-1]
+    ary = ary.reshape(-1, ary.shape[-1])
+    hdi_intervals = np.full((ary.shape[0], max_modes, 2), np.nan)
+
+    if ary.dtype.kind == "f":
+        finite = np.isfinite(ary)
+        x_min = np.where(finite, ary, np.inf).min(axis=-1)
+        x_max = np.where(finite, ary, -np.inf).max(axis=-1)
+        batched = (finite.sum(axis=-1) > 1) & (x_max > x_min)
+    else:
+        batched = np.zeros(ary.shape[0], dtype=bool)
+
+    if batched.any():
+        bins, density = _kde_linear_batched(ary[batched])
+        dx = (bins[:, -1:] - bins[:, :1]) / density.shape[-1]
+        density *= dx
+
+        # bins with the highest density whose cumulative probability is below hdi_prob
+        idx = np.argsort(-density, axis=-1)
+        in_hdi = np.empty_like(density, dtype=bool)
+        np.put_along_axis(
+            in_hdi, idx, np.take_along_axis(density, idx, axis=-1).cumsum(axis=-1) <= hdi_prob, -1
+        )
+
+        # every run of consecutive bins is a mode
+        padded = np.pad(in_hdi, ((0, 0), (1, 1)))
+        starts = in_hdi & ~padded[:, :-2]
+        ends = in_hdi & ~padded[:, 2:]
+        mode_idx = starts.cumsum(axis=-1) - 1
+        if mode_idx[:, -1].max() >= max_modes:
+            warnings.warn(
+                f"found more modes than {max_modes}, returning only the first {max_modes} modes"
+            )
+        intervals = np.full((len(bins), max_modes, 2), np.nan)
+        for i, bounds in enumerate((starts, ends)):
+            element, bin_idx = np.nonzero(bounds & (mode_idx < max_modes))
+            intervals[element, mode_idx[element, bin_idx], i] = bins[element, bin_idx]
+        empty = ~in_hdi.any(axis=-1)
+        intervals[empty, 0] = bins[empty, :1]
+        hdi_intervals[batched] = intervals
+
+    for i in np.flatnonzero(~batched):
+        hdi_intervals[i] = _hdi_multimodal_element(ary[i], hdi_prob, skipna, max_modes)
+
+    return hdi_intervals.reshape(*lead_shape, max_modes, 2)
+
+
+def _hdi_multimodal_element(ary, hdi_prob, skipna, max_modes):
+    """Compute HDI of a single element if the distribution is multimodal."""
     ary = ary.flatten()
     if skipna:
         ary = ary[~np.isnan(ary)]
@@ -580,7 +744,17 @@ def _hdi_multimodal(ary, hdi_prob, skipna, max_modes):
     return np.array(hdi_intervals)
 
 
-def loo(data, pointwise=None, var_name=None, reff=None, scale=None):
+def loo(
+    data,
+    pointwise=None,
+    var_name=None,
+    reff=None,
+    scale=None,
+    dask_kwargs=None,
+    chunk_size=None,
+    pointwise_file=None,
+    save_psis=False,
+):
     """Compute Pareto-smoothed importance sampling leave-one-out cross-validation (PSIS-LOO-CV).
 
     Estimates the expected log pointwise predictive density (elpd) using Pareto-smoothed
@@ -611,6 +785,23 @@ def loo(data, pointwise=None, var_name=None, reff=None, scale=None):
 
         A higher log-score (or a lower deviance or negative log_score) indicates a model with
         better predictive accuracy.
+    dask_kwargs : dict, optional
+        Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
+    chunk_size : int, optional
+        Maximum number of observations whose log likelihood is loaded and processed at once.
+        Observations are split along the first observation dimension, so that memory usage
+        is bounded by the chunk size when the ``log_likelihood`` group is lazily loaded.
+        By default all the observations are processed at once.
+    pointwise_file : str, optional
+        Path of a netCDF file where the pointwise ``loo_i`` and ``pareto_k`` are written.
+    save_psis : bool or str, optional
+        Store the smoothed log weights, pareto shapes and relative efficiency in a ``psis``
+        group of `data`, which must be an InferenceData object. If a dtype such as
+        ``"float32"``, the log weights are stored with that dtype. ``loo``, ``loo_pit``,
+        :func:`~arviz.plot_khat` and the functions calling them reuse a stored ``psis``
+        group instead of computing PSIS again, as long as the ``posterior`` and
+        ``log_likelihood`` groups are not modified and `reff` is None or the stored one.
+        Defaults to False.
 
     Returns
     -------
@@ -644,14 +835,14 @@ def loo(data, pointwise=None, var_name=None, reff=None, scale=None):
         In [2]: data_loo = az.loo(data, pointwise=True)
            ...: data_loo.loo_i
     """
+    if save_psis and not isinstance(data, InferenceData):
+        raise TypeError("save_psis requires data to be an InferenceData object")
     inference_data = convert_to_inference_data(data)
     log_likelihood = _get_log_likelihood(inference_data, var_name=var_name)
     pointwise = rcParams["stats.ic_pointwise"] if pointwise is None else pointwise
 
-    log_likelihood = log_likelihood.stack(sample=("chain", "draw"))
-    shape = log_likelihood.shape
-    n_samples = shape[-1]
-    n_data_points = np.product(shape[:-1])
+    n_samples = log_likelihood.sizes["chain"] * log_likelihood.sizes["draw"]
+    n_data_points = log_likelihood.size // n_samples
     scale = rcParams["stats.ic_scale"] if scale is None else scale.lower()
 
     if scale == "deviance":
@@ -663,51 +854,44 @@ def loo(data, pointwise=None, var_name=None, reff=None, scale=None):
     else:
         raise TypeError('Valid scale values are "deviance", "log", "negative_log"')
 
-    if reff is None:
-        if not hasattr(inference_data, "posterior"):
-            raise TypeError("Must be able to extract a posterior group from data.")
-        posterior = inference_data.posterior
-        n_chains = len(posterior.chain)
-        if n_chains == 1:
-            reff = 1.0
-        else:
-            ess_p = ess(posterior, method="mean")
-            # this mean is over all data variables
-            reff = (
-                np.hstack([ess_p[v].values.flatten() for v in ess_p.data_vars]).mean() / n_samples
-            )
-
-    log_weights, pareto_shape = psislw(-log_likelihood, reff)
-    log_weights += log_likelihood
-
-    warn_mg = False
-    if np.any(pareto_shape > 0.7):
-        warnings.warn(
-            "Estimated shape parameter of Pareto distribution is greater than 0.7 for "
-            "one or more samples. You should consider using a more robust model, this is because "
-            "importance sampling is less likely to work well if the marginal posterior and "
-            "LOO posterior are very different. This is more likely to happen with a non-robust "
-            "model and highly influential observations."
+    psis = _get_psis(inference_data, log_likelihood.name, reff)
+    if psis is not None:
+        loo_lppd_i, lppd_i = _map_observation_chunks(
+            partial(_loo_pointwise_psis, dask_kwargs=dask_kwargs),
+            [log_likelihood, psis["log_weights"]],
+            chunk_size,
         )
-        warn_mg = True
+        pareto_shape = psis["pareto_k"].rename("pareto_shape")
+    else:
+        if reff is None:
+            reff = _loo_reff(inference_data, n_samples)
+        pointwise_results = _map_observation_chunks(
+            partial(
+                _loo_pointwise, reff=reff, dask_kwargs=dask_kwargs, return_weights=bool(save_psis)
+            ),
+            [log_likelihood],
+            chunk_size,
+        )
+        loo_lppd_i, lppd_i, pareto_shape = pointwise_results[:3]
+        if save_psis:
+            log_weights = pointwise_results[3].unstack("sample").transpose(*log_likelihood.dims)
+            if isinstance(save_psis, str):
+                log_weights = log_weights.astype(save_psis)
+            inference_data._set_psis(  # pylint: disable=protected-access
+                xr.Dataset(
+                    {"log_weights": log_weights, "pareto_k": pareto_shape},
+                    attrs={"var_name": log_likelihood.name, "reff": float(reff)},
+                )
+            )
+    warn_mg = _check_pareto_shape(pareto_shape)
+    loo_lppd_i = scale_value * loo_lppd_i
+    if pointwise_file is not None:
+        xr.Dataset({"loo_i": loo_lppd_i, "pareto_k": pareto_shape}).to_netcdf(pointwise_file)
 
-    ufunc_kwargs = {"n_dims": 1, "ravel": False}
-    kwargs = {"input_core_dims": [["sample"]]}
-    loo_lppd_i = scale_value * _wrap_xarray_ufunc(
-        _logsumexp, log_weights, ufunc_kwargs=ufunc_kwargs, **kwargs
-    )
     loo_lppd = loo_lppd_i.values.sum()
     loo_lppd_se = (n_data_points * np.var(loo_lppd_i.values)) ** 0.5
 
-    lppd = np.sum(
-        _wrap_xarray_ufunc(
-            _logsumexp,
-            log_likelihood,
-            func_kwargs={"b_inv": n_samples},
-            ufunc_kwargs=ufunc_kwargs,
-            **kwargs,
-        ).values
-    )
+    lppd = np.sum(lppd_i.values)
     p_loo = lppd - loo_lppd / scale_value
 
     if pointwise:
@@ -724,7 +908,7 @@ def loo(data, pointwise=None, var_name=None, reff=None, scale=None):
                 n_samples,
                 n_data_points,
                 warn_mg,
-                loo_lppd_i.rename("loo_i"),
+                loo_lppd_i,
                 pareto_shape,
                 scale,
             ],
@@ -748,7 +932,371 @@ def loo(data, pointwise=None, var_name=None, reff=None, scale=None):
         )
 
 
-def psislw(log_weights, reff=1.0):
+def loo_subsample(
+    data,
+    observations=400,
+    loo_approximation="lpd",
+    estimator="diff_srs",
+    pointwise=None,
+    var_name=None,
+    reff=None,
+    scale=None,
+    seed=None,
+    dask_kwargs=None,
+):
+    """Compute PSIS-LOO-CV on a subsample of the observations.
+
+    Exact PSIS-LOO is only computed for a subsample of the observations, a cheap approximation
+    of the pointwise elpd is used for the rest of them. The elpd and its standard error are
+    estimated from the subsample, plus the standard error due to subsampling. See
+    Magnusson et al. (2019) https://arxiv.org/abs/1902.06504 and (2020)
+    https://arxiv.org/abs/2001.00980
+
+    Parameters
+    ----------
+    data: obj
+        Any object that can be converted to an az.InferenceData object. Refer to documentation of
+        az.convert_to_inference_data for details
+    observations: int or array of int, optional
+        Size of the subsample or flat indices of the observations in the subsample.
+        Defaults to 400.
+    loo_approximation: str or array-like, optional
+        Approximation of the pointwise elpd of every observation. Either ``"lpd"``, the log
+        pointwise predictive density, or an array with the log scale approximation of each
+        observation, for example the log likelihood evaluated at a point estimate.
+        Defaults to ``"lpd"``.
+    estimator: str, optional
+        Method used to draw the subsample and estimate the elpd. Available options are:
+
+        - `diff_srs` : (default) difference estimator with simple random sampling
+          without replacement.
+        - `hh_pps` : Hansen-Hurwitz estimator with sampling with replacement and
+          probabilities proportional to the elpd approximations.
+
+    pointwise: bool, optional
+        If True the pointwise predictive accuracy will be returned. Defaults to
+        ``stats.ic_pointwise`` rcParam. It is needed to use the result in :func:`compare`.
+    var_name : str, optional
+        The name of the variable in log_likelihood groups storing the pointwise log
+        likelihood data to use for loo computation.
+    reff: float, optional
+        Relative MCMC efficiency, `ess / n` i.e. number of effective samples divided by the number
+        of actual samples. Computed from trace by default.
+    scale: str
+        Output scale for loo. Available options are:
+
+        - `log` : (default) log-score
+        - `negative_log` : -1 * log-score
+        - `deviance` : -2 * log-score
+
+    seed: int or np.random.RandomState instance, optional
+        Seed used to draw the subsample. Default None the global np.random state is used.
+    dask_kwargs : dict, optional
+        Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
+
+    Returns
+    -------
+    ELPDData object (inherits from panda.Series) with the rows of :func:`loo` plus:
+    loo_subsampling_se: standard error of loo due to subsampling
+    subsample_size: number of observations in the subsample
+    subsample_estimator: estimator used
+    loo_i: array of pointwise predictive accuracy, exact for the observations in the subsample
+        and approximated for the rest, only if pointwise True
+    pareto_k: array of Pareto shape values, nan outside the subsample, only if pointwise True
+    loo_approximation_i: array of pointwise approximations, only if pointwise True
+    subsample_observations: flat indices of the observations in the subsample,
+        only if pointwise True
+
+    See Also
+    --------
+    loo : Compute Pareto-smoothed importance sampling leave-one-out cross-validation.
+    compare : Compare models based on PSIS-LOO `loo` or WAIC `waic` cross-validation.
+
+    Examples
+    --------
+    Calculate LOO of a model using only 4 of its 8 observations:
+
+    .. ipython::
+
+        In [1]: import arviz as az
+           ...: data = az.load_arviz_data("centered_eight")
+           ...: az.loo_subsample(data, observations=4, seed=3)
+
+    """
+    inference_data = convert_to_inference_data(data)
+    log_likelihood = _get_log_likelihood(inference_data, var_name=var_name)
+    pointwise = rcParams["stats.ic_pointwise"] if pointwise is None else pointwise
+    scale = rcParams["stats.ic_scale"] if scale is None else scale.lower()
+
+    if scale == "deviance":
+        scale_value = -2
+    elif scale == "log":
+        scale_value = 1
+    elif scale == "negative_log":
+        scale_value = -1
+    else:
+        raise TypeError('Valid scale values are "deviance", "log", "negative_log"')
+    if estimator not in ("diff_srs", "hh_pps"):
+        raise ValueError('Valid estimator values are "diff_srs", "hh_pps"')
+
+    obs_dims = [dim for dim in log_likelihood.dims if dim not in ("chain", "draw")]
+    obs_shape = tuple(log_likelihood.sizes[dim] for dim in obs_dims)
+    n_samples = log_likelihood.sizes["chain"] * log_likelihood.sizes["draw"]
+    n_data_points = int(np.product(obs_shape))
+
+    if isinstance(loo_approximation, str):
+        if loo_approximation != "lpd":
+            raise ValueError('Valid loo_approximation values are "lpd" or an array')
+        loo_approximation = _wrap_xarray_ufunc(
+            _logsumexp,
+            log_likelihood,
+            func_kwargs={"b_inv": n_samples, "axis": (-2, -1)},
+            ufunc_kwargs={"ravel": False, "vectorized": True},
+            dask_kwargs=dask_kwargs,
+        )
+    approx = np.asarray(loo_approximation, dtype=float).flatten()
+    if approx.size != n_data_points:
+        raise ValueError(
+            f"loo_approximation has {approx.size} values but there are "
+            f"{n_data_points} observations"
+        )
+
+    if seed is None or isinstance(seed, (int, np.integer)):
+        seed = np.random.RandomState(seed)
+    probs = np.abs(approx) / np.sum(np.abs(approx)) if estimator == "hh_pps" else None
+    if np.ndim(observations) == 0:
+        if estimator == "diff_srs":
+            observations = seed.choice(
+                n_data_points, min(observations, n_data_points), replace=False
+            )
+        else:
+            observations = seed.choice(n_data_points, observations, replace=True, p=probs)
+    observations = np.asarray(observations, dtype=int)
+    if observations.size < 2:
+        raise ValueError("The subsample must contain at least two observations")
+
+    # exact PSIS-LOO of the (unique) observations in the subsample
+    unique_obs, obs_idx = np.unique(observations, return_inverse=True)
+    if obs_dims:
+        indexers = np.unravel_index(unique_obs, obs_shape)
+        log_likelihood_sub = log_likelihood.isel(
+            {dim: xr.DataArray(idx, dims="__obs__") for dim, idx in zip(obs_dims, indexers)}
+        )
+    else:
+        log_likelihood_sub = log_likelihood.expand_dims("__obs__")
+    log_likelihood_sub = log_likelihood_sub.stack(sample=("chain", "draw")).transpose(
+        "__obs__", "sample"
+    )
+    if reff is None:
+        reff = _loo_reff(inference_data, n_samples)
+    loo_lppd_i, lppd_i, pareto_shape = _loo_pointwise(
+        log_likelihood_sub, reff, dask_kwargs=dask_kwargs
+    )
+    warn_mg = _check_pareto_shape(pareto_shape)
+    loo_sub = loo_lppd_i.values[obs_idx]
+    p_loo_sub = lppd_i.values[obs_idx] - loo_sub
+
+    if estimator == "diff_srs":
+        loo_lppd, loo_subsampling_var, loo_var = _srs_diff_est(approx, loo_sub, observations)
+        p_loo, *_ = _srs_diff_est(np.zeros_like(approx), p_loo_sub, observations)
+    else:
+        loo_lppd, loo_subsampling_var, loo_var = _hh_pps_est(
+            loo_sub, probs[observations], n_data_points
+        )
+        p_loo, *_ = _hh_pps_est(p_loo_sub, probs[observations], n_data_points)
+
+    loo_lppd = scale_value * loo_lppd
+    if loo_var < 0:
+        warnings.warn(
+            "The estimated variance of the loo values is negative, the subsample is too small "
+            "to estimate loo_se, which is set to NaN. Increase the number of observations."
+        )
+        loo_var = np.nan
+    loo_lppd_se = np.abs(scale_value) * loo_var ** 0.5
+    loo_subsampling_se = np.abs(scale_value) * max(loo_subsampling_var, 0) ** 0.5
+
+    data = [loo_lppd, loo_lppd_se, p_loo, n_samples, n_data_points, warn_mg]
+    index = ["loo", "loo_se", "p_loo", "n_samples", "n_data_points", "warning"]
+    if pointwise:
+        loo_i = approx.copy()
+        loo_i[unique_obs] = loo_lppd_i.values
+        pareto_k = np.full(n_data_points, np.nan)
+        pareto_k[unique_obs] = pareto_shape.values
+        coords = {
+            dim: log_likelihood[dim].values for dim in obs_dims if dim in log_likelihood.coords
+        }
+        data += [
+            xr.DataArray(scale_value * loo_i.reshape(obs_shape), dims=obs_dims, coords=coords),
+            xr.DataArray(pareto_k.reshape(obs_shape), dims=obs_dims, coords=coords),
+        ]
+        index += ["loo_i", "pareto_k"]
+    data += [scale, loo_subsampling_se, len(observations), estimator]
+    index += ["loo_scale", "loo_subsampling_se", "subsample_size", "subsample_estimator"]
+    if pointwise:
+        data += [
+            xr.DataArray(scale_value * approx.reshape(obs_shape), dims=obs_dims, coords=coords),
+            observations,
+        ]
+        index += ["loo_approximation_i", "subsample_observations"]
+    return ELPDData(data=data, index=index)
+
+
+def _srs_diff_est(y_approx, y, idx):
+    """Difference estimator of the total of `y` from a simple random subsample.
+
+    `y_approx` contains the approximations of all the values, `y` the exact values of the
+    subsample at positions `idx`. Returns the estimate of the total, its variance due to
+    subsampling and the estimate of ``N * var(y)``.
+    """
+    n_total = len(y_approx)
+    n_sub = len(y)
+    y_approx_sub = y_approx[idx]
+    e_i = y - y_approx_sub
+    t_pi = np.sum(y_approx)
+    t_pi2 = np.sum(y_approx ** 2)
+    t_e = n_total * np.mean(e_i)
+    y_hat = t_pi + t_e
+    v_y_hat = n_total ** 2 * (1 - n_sub / n_total) * np.var(e_i, ddof=1) / n_sub
+    hat_v_y = t_pi2 + n_total * np.mean(e_i * (y + y_approx_sub))
+    hat_v_y -= (t_e ** 2 - v_y_hat + 2 * t_pi * y_hat - t_pi ** 2) / n_total
+    return y_hat, v_y_hat, hat_v_y
+
+
+def _hh_pps_est(y, probs, n_total):
+    """Hansen-Hurwitz estimator of the total of `y` from a subsample drawn with replacement.
+
+    `probs` are the probabilities with which each value of the subsample was drawn.
+    Returns the estimate of the total, its variance due to subsampling and the estimate
+    of ``N * var(y)``.
+    """
+    z_i = y / probs
+    y_hat = np.mean(z_i)
+    v_y_hat = np.var(z_i, ddof=1) / len(y)
+    hat_v_y = np.mean(y ** 2 / probs) - (y_hat ** 2 - v_y_hat) / n_total
+    return y_hat, v_y_hat, hat_v_y
+
+
+def _loo_reff(inference_data, n_samples):
+    """Compute the relative MCMC efficiency used by PSIS from the posterior group."""
+    if not hasattr(inference_data, "posterior"):
+        raise TypeError("Must be able to extract a posterior group from data.")
+    posterior = inference_data.posterior
+    n_chains = len(posterior.chain)
+    if n_chains == 1:
+        return 1.0
+    ess_p = ess(inference_data, method="mean")
+    # this mean is over all data variables
+    return np.hstack([ess_p[v].values.flatten() for v in ess_p.data_vars]).mean() / n_samples
+
+
+def _get_psis(inference_data, var_name, reff=None):
+    """Get the stored ``psis`` group if it is valid for `var_name` and `reff`, else None."""
+    if not isinstance(inference_data, InferenceData):
+        return None
+    psis = inference_data._psis  # pylint: disable=protected-access
+    if psis is None or psis.attrs.get("var_name") != var_name:
+        return None
+    if reff is not None and not np.isclose(psis.attrs["reff"], reff):
+        return None
+    return psis
+
+
+def _loo_pointwise(log_likelihood, reff, dask_kwargs=None, return_weights=False):
+    """Compute the pointwise PSIS-LOO elpd, lppd and pareto shapes, in log scale.
+
+    `log_likelihood` must have the draws stacked in the last dimension, ``sample``. If
+    `return_weights`, the smoothed log weights are also returned.
+    """
+    log_weights, pareto_shape = psislw(-log_likelihood, reff, dask_kwargs=dask_kwargs)
+    loo_lppd_i, lppd_i = _loo_pointwise_psis(
+        log_likelihood, log_weights, dask_kwargs, compute=False
+    )
+    pointwise = {"loo_i": loo_lppd_i, "lppd_i": lppd_i, "pareto_shape": pareto_shape}
+    if return_weights:
+        pointwise["log_weights"] = log_weights
+    # evaluate all pointwise quantities together so dask backed data is only loaded once
+    pointwise_ds = xr.Dataset(pointwise).compute()
+    return tuple(pointwise_ds[name] for name in pointwise)
+
+
+def _loo_pointwise_psis(log_likelihood, log_weights, dask_kwargs=None, compute=True):
+    """Compute the pointwise PSIS-LOO elpd and lppd from smoothed log weights, in log scale.
+
+    Both `log_likelihood` and `log_weights` must have the draws stacked in the last
+    dimension, ``sample``.
+    """
+    n_samples = log_likelihood.shape[-1]
+    ufunc_kwargs = {"ravel": False, "vectorized": True}
+    kwargs = {"input_core_dims": [["sample"]]}
+    loo_lppd_i = _wrap_xarray_ufunc(
+        _logsumexp,
+        log_weights + log_likelihood,
+        func_kwargs={"axis": -1},
+        ufunc_kwargs=ufunc_kwargs,
+        dask_kwargs=dask_kwargs,
+        **kwargs,
+    )
+    lppd_i = _wrap_xarray_ufunc(
+        _logsumexp,
+        log_likelihood,
+        func_kwargs={"b_inv": n_samples, "axis": -1},
+        ufunc_kwargs=ufunc_kwargs,
+        dask_kwargs=dask_kwargs,
+        **kwargs,
+    )
+    if not compute:
+        return loo_lppd_i, lppd_i
+    pointwise_ds = xr.Dataset({"loo_i": loo_lppd_i, "lppd_i": lppd_i}).compute()
+    return pointwise_ds["loo_i"], pointwise_ds["lppd_i"]
+
+
+def _check_pareto_shape(pareto_shape):
+    """Warn if any pareto shape is greater than 0.7, return whether it warned."""
+    warn_mg = False
+    if np.any(pareto_shape > 0.7):
+        warnings.warn(
+            "Estimated shape parameter of Pareto distribution is greater than 0.7 for "
+            "one or more samples. You should consider using a more robust model, this is because "
+            "importance sampling is less likely to work well if the marginal posterior and "
+            "LOO posterior are very different. This is more likely to happen with a non-robust "
+            "model and highly influential observations."
+        )
+        warn_mg = True
+    return warn_mg
+
+
+def _map_observation_chunks(func, arrays, chunk_size=None):
+    """Apply `func` to chunks of observations of `arrays` and concatenate the results.
+
+    `arrays` is a list of DataArrays with the same dimensions as the first one, the log
+    likelihood. The chunks are slices along the first observation dimension with at most
+    `chunk_size` observations, or a single index if that already exceeds `chunk_size`, so
+    only one chunk is loaded in memory at a time. `func` is called with the chunk of every
+    array, with the draws stacked in the ``sample`` dimension, and must return a tuple of
+    pointwise DataArrays.
+    """
+    log_likelihood = arrays[0]
+    obs_dims = [dim for dim in log_likelihood.dims if dim not in ("chain", "draw")]
+    if chunk_size is None or not obs_dims:
+        return func(*(array.stack(sample=("chain", "draw")) for array in arrays))
+    dim = obs_dims[0]
+    dim_size = log_likelihood.sizes[dim]
+    n_samples = log_likelihood.sizes["chain"] * log_likelihood.sizes["draw"]
+    obs_per_slice = log_likelihood.size // (n_samples * dim_size)
+    step = max(1, chunk_size // max(1, obs_per_slice))
+    results = [
+        func(
+            *(
+                array.isel({dim: slice(start, start + step)}).stack(sample=("chain", "draw"))
+                for array in arrays
+            )
+        )
+        for start in range(0, dim_size, step)
+    ]
+    return tuple(xr.concat(result, dim=dim) for result in zip(*results))
+
+
+def psislw(log_weights, reff=1.0, dask_kwargs=None):
     """
     Pareto smoothed importance sampling (PSIS).
 
@@ -758,6 +1306,8 @@ def psislw(log_weights, reff=1.0):
         Array of size (n_observations, n_samples)
     reff: float
         relative MCMC efficiency, `ess / n`
+    dask_kwargs : dict, optional
+        Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
 
     Returns
     -------
@@ -784,27 +1334,34 @@ def psislw(log_weights, reff=1.0):
     """
     if hasattr(log_weights, "sample"):
         n_samples = len(log_weights.sample)
-        shape = [size for size, dim in zip(log_weights.shape, log_weights.dims) if dim != "sample"]
     else:
         n_samples = log_weights.shape[-1]
-        shape = log_weights.shape[:-1]
     # precalculate constants
     cutoff_ind = -int(np.ceil(min(n_samples / 5.0, 3 * (n_samples / reff) ** 0.5))) - 1
     cutoffmin = np.log(np.finfo(float).tiny)  # pylint: disable=no-member, assignment-from-no-return
     k_min = 1.0 / 3
 
-    # create output array with proper dimensions
-    out = tuple([np.empty_like(log_weights), np.empty(shape)])
-
     # define kwargs
-    func_kwargs = {"cutoff_ind": cutoff_ind, "cutoffmin": cutoffmin, "k_min": k_min, "out": out}
-    ufunc_kwargs = {"n_dims": 1, "n_output": 2, "ravel": False, "check_shape": False}
+    func_kwargs = {
+        "cutoff_ind": cutoff_ind,
+        "cutoffmin": cutoffmin,
+        "k_min": k_min,
+        "out_shape": ((n_samples,), ()),
+    }
+    ufunc_kwargs = {
+        "n_dims": 1,
+        "n_output": 2,
+        "ravel": False,
+        "check_shape": False,
+        "vectorized": True,
+    }
     kwargs = {"input_core_dims": [["sample"]], "output_core_dims": [["sample"], []]}
     log_weights, pareto_shape = _wrap_xarray_ufunc(
         _psislw,
         log_weights,
         ufunc_kwargs=ufunc_kwargs,
         func_kwargs=func_kwargs,
+        dask_kwargs=dask_kwargs,
         **kwargs,
     )
     if isinstance(log_weights, xr.DataArray):
@@ -816,12 +1373,16 @@ def psislw(log_weights, reff=1.0):
 
 def _psislw(log_weights, cutoff_ind, cutoffmin, k_min=1.0 / 3):
     """
-    Pareto smoothed importance sampling (PSIS) for a 1D vector.
+    Pareto smoothed importance sampling (PSIS) over the last axis.
+
+    Only the tail candidates of each observation are selected with a partial sort, the
+    GPD is then fitted to the tails of all the observations with the same tail length at
+    once.
 
     Parameters
     ----------
     log_weights: array
-        Array of length n_observations
+        Array of shape (..., n_samples)
     cutoff_ind: int
     cutoffmin: float
     k_min: float
@@ -830,93 +1391,102 @@ def _psislw(log_weights, cutoff_ind, cutoffmin, k_min=1.0 / 3):
     -------
     lw_out: array
         Smoothed log weights
-    kss: float
-        Pareto tail index
+    kss: array
+        Pareto tail indices
     """
     x = np.asarray(log_weights)
-
+    lead_shape = x.shape[:-1]
+    n_samples = x.shape[-1]
     # improve numerical accuracy
-    x -= np.max(x)
-    # sort the array
-    x_sort_ind = np.argsort(x)
+    x = x.reshape(-1, n_samples)
+    x = x - np.max(x, axis=-1, keepdims=True)
+
+    # partial sort to get the cutoff and the sorted tail candidates
+    cutoff_pos = n_samples + cutoff_ind
+    tail_ind = np.argpartition(x, cutoff_pos, axis=-1)[:, cutoff_pos:]
+    x_tail = np.take_along_axis(x, tail_ind, axis=-1)
+    x_tail_si = np.argsort(x_tail, axis=-1)
+    tail_ind = np.take_along_axis(tail_ind, x_tail_si, axis=-1)
+    x_tail = np.take_along_axis(x_tail, x_tail_si, axis=-1)
     # divide log weights into body and right tail
-    xcutoff = max(x[x_sort_ind[cutoff_ind]], cutoffmin)
-
+    xcutoff = np.maximum(x_tail[:, 0], cutoffmin)
     expxcutoff = np.exp(xcutoff)
-    (tailinds,) = np.where(x > xcutoff)  # pylint: disable=unbalanced-tuple-unpacking
-    x_tail = x[tailinds]
-    tail_len = len(x_tail)
-    if tail_len <= 4:
-        # not enough tail samples for gpdfit
-        k = np.inf
-    else:
-        # order of tail samples
-        x_tail_si = np.argsort(x_tail)
-        # fit generalized Pareto distribution to the right tail samples
-        x_tail = np.exp(x_tail) - expxcutoff
-        k, sigma = _gpdfit(x_tail[x_tail_si])
+    tail_len = (x_tail > xcutoff[:, None]).sum(axis=-1)
+
+    # not enough tail samples for gpdfit
+    k = np.full(len(x), np.inf)
+    for length in np.unique(tail_len[tail_len > 4]):
+        rows = np.flatnonzero(tail_len == length)
+        # bound the memory used by the grid of candidates in _gpdfit
+        block_size = max(1, 2 ** 22 // (length * (30 + int(length ** 0.5))))
+        for start in range(0, len(rows), block_size):
+            block = rows[start : start + block_size]
+            # fit generalized Pareto distribution to the right tail samples
+            k_block, sigma = _gpdfit(np.exp(x_tail[block, -length:]) - expxcutoff[block, None])
+            k[block] = k_block
 
-        if k >= k_min:
             # no smoothing if short tail or GPD fit failed
+            smooth = k_block >= k_min
+            if not smooth.any():
+                continue
+            block = block[smooth]
             # compute ordered statistic for the fit
-            sti = np.arange(0.5, tail_len) / tail_len
-            smoothed_tail = _gpinv(sti, k, sigma)
+            sti = np.arange(0.5, length) / length
+            smoothed_tail = _gpinv(sti, k_block[smooth, None], sigma[smooth, None])
             smoothed_tail = np.log(  # pylint: disable=assignment-from-no-return
-                smoothed_tail + expxcutoff
+                smoothed_tail + expxcutoff[block, None]
             )
-            # place the smoothed tail into the output array
-            x[tailinds[x_tail_si]] = smoothed_tail
-            # truncate smoothed values to the largest raw weight 0
-            x[x > 0] = 0
+            # place the smoothed tail into the output array, truncating smoothed
+            # values to the largest raw weight 0
+            x[block[:, None], tail_ind[block, -length:]] = np.minimum(smoothed_tail, 0)
     # renormalize weights
-    x -= _logsumexp(x)
+    x -= _logsumexp(x, axis=-1, keepdims=True)
 
-    return x, k
+    return x.reshape(*lead_shape, n_samples), k.reshape(lead_shape)
 
 
 def _gpdfit(ary):
     """Estimate the parameters for the Generalized Pareto Distribution (GPD).
 
     Empirical Bayes estimate for the parameters of the generalized Pareto
-    distribution given the data.
+    distribution given the data. The parameters are estimated over the last
+    axis, for every element along the leading dimensions.
 
     Parameters
     ----------
     ary: array
-        sorted 1D data array
+        data array sorted along the last axis
 
     Returns
     -------
-    k: float
+    k: float or array
         estimated shape parameter
-    sigma: float
+    sigma: float or array
         estimated scale parameter
     """
     prior_bs = 3
     prior_k = 10
-    n = len(ary)
+    n = ary.shape[-1]
     m_est = 30 + int(n ** 0.5)
 
     b_ary = 1 - np.sqrt(m_est / (np.arange(1, m_est + 1, dtype=float) - 0.5))
-    b_ary /= prior_bs * ary[int(n / 4 + 0.5) - 1]
-    b_ary += 1 / ary[-1]
+    b_ary = b_ary / (prior_bs * ary[..., int(n / 4 + 0.5) - 1, None])
+    b_ary += 1 / ary[..., -1, None]
 
-    k_ary = np.log1p(-b_ary[:, None] * ary).mean(axis=1)  # pylint: disable=no-member
+    k_ary = np.log1p(-b_ary[..., None] * ary[..., None, :])  # pylint: disable=no-member
+    k_ary = k_ary.mean(axis=-1)
     len_scale = n * (np.log(-(b_ary / k_ary)) - k_ary - 1)
-    weights = 1 / np.exp(len_scale - len_scale[:, None]).sum(axis=1)
+    weights = 1 / np.exp(len_scale[..., None, :] - len_scale[..., None]).sum(axis=-1)
 
     # remove negligible weights
-    real_idxs = weights >= 10 * np.finfo(float).eps
-    if not np.all(real_idxs):
-        weights = weights[real_idxs]
-        b_ary = b_ary[real_idxs]
+    weights = np.where(weights >= 10 * np.finfo(float).eps, weights, 0)
     # normalise weights
-    weights /= weights.sum()
+    weights /= weights.sum(axis=-1, keepdims=True)
 
     # posterior mean for b
-    b_post = np.sum(b_ary * weights)
+    b_post = np.sum(b_ary * weights, axis=-1)
     # estimate for k
-    k_post = np.log1p(-b_post * ary).mean()  # pylint: disable=invalid-unary-operand-type,no-member
+    k_post = np.log1p(-b_post[..., None] * ary).mean(axis=-1)  # pylint: disable=no-member
     # add prior for k_post
     k_post = (n * k_post + prior_k * 0.5) / (n + prior_k)
     sigma = -k_post / b_post
@@ -925,30 +1495,26 @@ def _gpdfit(ary):
 
 
 def _gpinv(probs, kappa, sigma):
-    """Inverse Generalized Pareto distribution function."""
-    # pylint: disable=unsupported-assignment-operation, invalid-unary-operand-type
-    x = np.full_like(probs, np.nan)
-    if sigma <= 0:
-        return x
+    """Inverse Generalized Pareto distribution function.
+
+    `kappa` and `sigma` can be arrays that broadcast with `probs`.
+    """
+    probs = np.asarray(probs, dtype=float)
+    kappa = np.asarray(kappa, dtype=float)
+    sigma = np.asarray(sigma, dtype=float)
     ok = (probs > 0) & (probs < 1)
-    if np.all(ok):
-        if np.abs(kappa) < np.finfo(float).eps:
-            x = -np.log1p(-probs)
-        else:
-            x = np.expm1(-kappa * np.log1p(-probs)) / kappa
-        x *= sigma
-    else:
-        if np.abs(kappa) < np.finfo(float).eps:
-            x[ok] = -np.log1p(-probs[ok])
-        else:
-            x[ok] = np.expm1(-kappa * np.log1p(-probs[ok])) / kappa
-        x *= sigma
-        x[probs == 0] = 0
-        if kappa >= 0:
-            x[probs == 1] = np.inf
-        else:
-            x[probs == 1] = -sigma / kappa
-    return x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log1m_probs = np.log1p(-np.where(ok, probs, 0))
+        x = np.where(
+            np.abs(kappa) < np.finfo(float).eps,
+            -log1m_probs,
+            np.expm1(-kappa * log1m_probs) / kappa,
+        )
+        x = x * sigma
+        x = np.where(ok, x, np.nan)
+        x = np.where(probs == 0, 0, x)
+        x = np.where(probs == 1, np.where(kappa >= 0, np.inf, -sigma / kappa), x)
+    return np.where(sigma <= 0, np.nan, x)
 
 
 def r2_score(y_true, y_pred):
@@ -1011,6 +1577,7 @@ def summary(
     coords: Optional[CoordSpec] = None,
     dims: Optional[DimSpec] = None,
     credible_interval=None,
+    jit_stat_funcs=False,
 ) -> Union[pd.DataFrame, xr.Dataset]:
     """Create a data frame with summary statistics.
 
@@ -1072,6 +1639,11 @@ def summary(
         Dimensions specification for the variables to be used if the ``fmt`` is ``'xarray'``.
     credible_interval: float, optional
         deprecated: Please see hdi_prob
+    jit_stat_funcs: bool, optional
+        If True and numba is enabled, compile the functions in ``stat_funcs`` with numba and
+        loop over the variable elements in compiled code, see the ``jit`` argument of
+        :func:`~arviz.make_ufunc`. Functions that can't be compiled fall back to the Python
+        loop with a warning. Defaults to False.
 
     Returns
     -------
@@ -1160,16 +1732,16 @@ def summary(
             if not data.groups():
                 raise TypeError("InferenceData does not contain any groups")
             if "posterior" in data:
-                dataset = data["posterior"]
+                group = "posterior"
             elif "prior" in data:
-                dataset = data["prior"]
+                group = "prior"
             else:
-                warnings.warn(f"Selecting first found group: {data.groups()[0]}")
-                dataset = data[data.groups()[0]]
+                group = data.groups()[0]
+                warnings.warn(f"Selecting first found group: {group}")
         else:
             if group not in data.groups():
                 raise TypeError(f"InferenceData does not contain group: {group}")
-            dataset = data[group]
+        dataset = data[group]
     else:
         dataset = convert_to_dataset(data, group="posterior", **extra_args)
     var_names = _var_names(var_names, dataset, filter_vars)
@@ -1189,24 +1761,23 @@ def summary(
     extra_metric_names = []
 
     if stat_funcs is not None:
+        stat_ufunc_kwargs = {"jit": jit_stat_funcs}
         if isinstance(stat_funcs, dict):
             for stat_func_name, stat_func in stat_funcs.items():
                 extra_metrics.append(
-                    xr.apply_ufunc(
-                        _make_ufunc(stat_func), dataset, input_core_dims=(("chain", "draw"),)
-                    )
+                    _wrap_xarray_ufunc(stat_func, dataset, ufunc_kwargs=stat_ufunc_kwargs.copy())
                 )
                 extra_metric_names.append(stat_func_name)
         else:
             for stat_func in stat_funcs:
                 extra_metrics.append(
-                    xr.apply_ufunc(
-                        _make_ufunc(stat_func), dataset, input_core_dims=(("chain", "draw"),)
-                    )
+                    _wrap_xarray_ufunc(stat_func, dataset, ufunc_kwargs=stat_ufunc_kwargs.copy())
                 )
                 extra_metric_names.append(stat_func.__name__)
 
-    if extend and kind in ["all", "stats"]:
+    # without skipna, mean, sd and hdi are computed from the draws sorted for the diagnostics
+    sorted_stats = extend and kind in ["all", "stats"] and not skipna
+    if extend and kind in ["all", "stats"] and skipna:
         mean = dataset.mean(dim=("chain", "draw"), skipna=skipna)
 
         sd = dataset.std(dim=("chain", "draw"), ddof=1, skipna=skipna)
@@ -1217,45 +1788,78 @@ def summary(
 
     if circ_var_names:
         nan_policy = "omit" if skipna else "propagate"
-        circ_mean = xr.apply_ufunc(
-            _make_ufunc(st.circmean),
+        circ_mean = _wrap_xarray_ufunc(
+            st.circmean,
             dataset,
-            kwargs=dict(high=np.pi, low=-np.pi, nan_policy=nan_policy),
-            input_core_dims=(("chain", "draw"),),
+            func_kwargs=dict(high=np.pi, low=-np.pi, nan_policy=nan_policy, axis=-1),
+            ufunc_kwargs={"vectorized": True},
         )
         _numba_flag = Numba.numba_flag
         func = None
         if _numba_flag:
             func = _circular_standard_deviation
-            kwargs_circ_std = dict(high=np.pi, low=-np.pi, skipna=skipna)
+            kwargs_circ_std = dict(high=np.pi, low=-np.pi, skipna=skipna, axis=-1)
         else:
             func = st.circstd
-            kwargs_circ_std = dict(high=np.pi, low=-np.pi, nan_policy=nan_policy)
-        circ_sd = xr.apply_ufunc(
-            _make_ufunc(func),
-            dataset,
-            kwargs=kwargs_circ_std,
-            input_core_dims=(("chain", "draw"),),
+            kwargs_circ_std = dict(high=np.pi, low=-np.pi, nan_policy=nan_policy, axis=-1)
+        circ_sd = _wrap_xarray_ufunc(
+            func, dataset, func_kwargs=kwargs_circ_std, ufunc_kwargs={"vectorized": True}
         )
 
-        circ_mcse = xr.apply_ufunc(
-            _make_ufunc(_mc_error),
+        circ_mcse = _wrap_xarray_ufunc(
+            _mc_error,
             dataset,
-            kwargs=dict(circular=True),
-            input_core_dims=(("chain", "draw"),),
+            func_kwargs=dict(circular=True, axis=-1),
+            ufunc_kwargs={"vectorized": True},
         )
 
         circ_hdi = hdi(dataset, hdi_prob=hdi_prob, circular=True, skipna=skipna)
         circ_hdi_lower = circ_hdi.sel(hdi="lower", drop=True)
         circ_hdi_higher = circ_hdi.sel(hdi="higher", drop=True)
 
-    if kind in ["all", "diagnostics"]:
-        mcse_mean, mcse_sd, ess_mean, ess_sd, ess_bulk, ess_tail, r_hat = xr.apply_ufunc(
-            _make_ufunc(_multichain_statistics, n_output=7, ravel=False),
-            dataset,
-            input_core_dims=(("chain", "draw"),),
-            output_core_dims=tuple([] for _ in range(7)),
+    with_diagnostics = extend and kind in ["all", "diagnostics"]
+    if sorted_stats or with_diagnostics:
+        keys = []
+        if sorted_stats:
+            keys.extend(
+                [
+                    ("mean", {}),
+                    ("sd", {}),
+                    ("hdi_lower", {"hdi_prob": hdi_prob}),
+                    ("hdi_higher", {"hdi_prob": hdi_prob}),
+                ]
+            )
+        if with_diagnostics:
+            # same keys as the ess, mcse and rhat functions, results are shared with them
+            keys.extend(
+                [
+                    ("mcse_mean", {"prob": None}),
+                    ("mcse_sd", {"prob": None}),
+                    ("ess_mean", {"prob": None, "relative": False}),
+                    ("ess_sd", {"prob": None, "relative": False}),
+                    ("ess_bulk", {"prob": None, "relative": False}),
+                    ("ess_tail", {"prob": None, "relative": False}),
+                    ("rhat_rank", {}),
+                ]
+            )
+        compute = partial(
+            _wrap_xarray_ufunc,
+            _multichain_statistics,
+            func_kwargs={
+                "hdi_prob": hdi_prob if sorted_stats else None,
+                "diagnostics": with_diagnostics,
+            },
+            ufunc_kwargs={"n_output": len(keys), "ravel": False, "vectorized": True},
         )
+        if isinstance(data, InferenceData):
+            statistics = data.diagnostics_cache.compute(group, dataset, keys, compute)
+        else:
+            statistics = compute(dataset)
+        if sorted_stats:
+            mean, sd, hdi_lower, hdi_higher = statistics[:4]
+            statistics = statistics[4:]
+        if with_diagnostics:
+            mcse_mean, mcse_sd, ess_mean, ess_sd, ess_bulk, ess_tail, r_hat = statistics
 
     # Combine metrics
     metrics = []
@@ -1314,27 +1918,31 @@ def summary(
         xr.concat(metrics, dim="metric").assign_coords(metric=metric_names).reset_coords(drop=True)
     )
 
+    if fmt.lower() != "xarray":
+        # compute all dask backed metrics at once, sharing the loading of the draws
+        joined = joined.load()
+
     if fmt.lower() == "wide":
-        dfs = []
+        # the values of all the variables are copied once into the dataframe block
+        metric = list(joined.metric.values)
+        index = []
+        blocks = []
         for var_name, values in joined.data_vars.items():
-            if len(values.shape[1:]):
-                metric = list(values.metric.values)
-                data_dict = OrderedDict()
-                for idx in np.ndindex(values.shape[1:] if order == "C" else values.shape[1:][::-1]):
-                    if order == "F":
-                        idx = tuple(idx[::-1])
-                    ser = pd.Series(values[(Ellipsis, *idx)].values, index=metric)
+            shape = values.shape[1:]
+            if shape:
+                blocks.append(values.values.reshape(len(metric), -1, order=order.upper()))
+                idxs = np.unravel_index(np.arange(np.prod(shape)), shape, order=order.upper())
+                for idx in zip(*idxs):
                     key_index = ",".join(map(str, (i + index_origin for i in idx)))
-                    key = f"{var_name}[{key_index}]"
-                    data_dict[key] = ser
-                df = pd.DataFrame.from_dict(data_dict, orient="index")
-                df = df.loc[list(data_dict.keys())]
+                    index.append(f"{var_name}[{key_index}]")
             else:
-                df = values.to_dataframe()
-                df.index = list(df.index)
-                df = df.T
-            dfs.append(df)
-        summary_df = pd.concat(dfs, sort=False)
+                blocks.append(values.values.reshape(len(metric), 1))
+                index.append(var_name)
+        summary_df = pd.DataFrame(
+            np.concatenate(blocks, axis=1).T if blocks else np.empty((0, len(metric))),
+            index=index,
+            columns=metric,
+        )
     elif fmt.lower() == "long":
         df = joined.to_dataframe().reset_index().set_index("metric")
         df.index = list(df.index)
@@ -1359,7 +1967,15 @@ def summary(
     return summary_df
 
 
-def waic(data, pointwise=None, var_name=None, scale=None, dask_kwargs=None):
+def waic(
+    data,
+    pointwise=None,
+    var_name=None,
+    scale=None,
+    dask_kwargs=None,
+    chunk_size=None,
+    pointwise_file=None,
+):
     """Compute the widely applicable information criterion.
 
     Estimates the expected log pointwise predictive density (elpd) using WAIC. Also calculates the
@@ -1388,6 +2004,11 @@ def waic(data, pointwise=None, var_name=None, scale=None, dask_kwargs=None):
         better predictive accuracy.
     dask_kwargs : dict, optional
         Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
+    chunk_size : int, optional
+        Maximum number of observations whose log likelihood is loaded and processed at once.
+        See :func:`loo` for details. By default all the observations are processed at once.
+    pointwise_file : str, optional
+        Path of a netCDF file where the pointwise ``waic_i`` are written.
 
     Returns
     -------
@@ -1433,23 +2054,12 @@ def waic(data, pointwise=None, var_name=None, scale=None, dask_kwargs=None):
     else:
         raise TypeError('Valid scale values are "deviance", "log", "negative_log"')
 
-    log_likelihood = log_likelihood.stack(sample=("chain", "draw"))
-    shape = log_likelihood.shape
-    n_samples = shape[-1]
-    n_data_points = np.product(shape[:-1])
+    n_samples = log_likelihood.sizes["chain"] * log_likelihood.sizes["draw"]
+    n_data_points = log_likelihood.size // n_samples
 
-    ufunc_kwargs = {"n_dims": 1, "ravel": False}
-    kwargs = {"input_core_dims": [["sample"]]}
-    lppd_i = _wrap_xarray_ufunc(
-        _logsumexp,
-        log_likelihood,
-        func_kwargs={"b_inv": n_samples},
-        ufunc_kwargs=ufunc_kwargs,
-        dask_kwargs=dask_kwargs,
-        **kwargs,
+    lppd_i, vars_lpd = _map_observation_chunks(
+        partial(_waic_pointwise, dask_kwargs=dask_kwargs), [log_likelihood], chunk_size
     )
-
-    vars_lpd = log_likelihood.var(dim="sample")
     warn_mg = False
     if np.any(vars_lpd > 0.4):
         warnings.warn(
@@ -1462,6 +2072,8 @@ def waic(data, pointwise=None, var_name=None, scale=None, dask_kwargs=None):
         warn_mg = True
 
     waic_i = scale_value * (lppd_i - vars_lpd)
+    if pointwise_file is not None:
+        xr.Dataset({"waic_i": waic_i}).to_netcdf(pointwise_file)
     waic_se = (n_data_points * np.var(waic_i.values)) ** 0.5
     waic_sum = np.sum(waic_i.values)
     p_waic = np.sum(vars_lpd.values)
@@ -1510,7 +2122,38 @@ def waic(data, pointwise=None, var_name=None, scale=None, dask_kwargs=None):
         )
 
 
-def loo_pit(idata=None, *, y=None, y_hat=None, log_weights=None):
+def _waic_pointwise(log_likelihood, dask_kwargs=None):
+    """Compute the pointwise lppd and posterior variance of the log likelihood.
+
+    `log_likelihood` must have the draws stacked in the last dimension, ``sample``.
+    """
+    ufunc_kwargs = {"ravel": False, "vectorized": True}
+    kwargs = {"input_core_dims": [["sample"]]}
+    lppd_i = _wrap_xarray_ufunc(
+        _logsumexp,
+        log_likelihood,
+        func_kwargs={"b_inv": log_likelihood.shape[-1], "axis": -1},
+        ufunc_kwargs=ufunc_kwargs,
+        dask_kwargs=dask_kwargs,
+        **kwargs,
+    )
+
+    vars_lpd = log_likelihood.var(dim="sample")
+    # evaluate both pointwise quantities together so dask backed data is only loaded once
+    pointwise_ds = xr.Dataset({"lppd_i": lppd_i, "vars_lpd": vars_lpd}).compute()
+    return pointwise_ds["lppd_i"], pointwise_ds["vars_lpd"]
+
+
+def loo_pit(
+    idata=None,
+    *,
+    y=None,
+    y_hat=None,
+    log_weights=None,
+    dask_kwargs=None,
+    randomized=False,
+    seed=None,
+):
     """Compute leave one out (PSIS-LOO) probability integral transform (PIT) values.
 
     Parameters
@@ -1525,14 +2168,23 @@ def loo_pit(idata=None, *, y=None, y_hat=None, log_weights=None):
         None, idata must contain the posterior predictive group. If None, y_hat is taken
         equal to y, thus, y must be str too.
     log_weights: array or DataArray
-        Smoothed log_weights. It must have the same shape as ``y_hat``
+        Smoothed log_weights. It must have the same shape as ``y_hat``. If None, they are
+        taken from the ``psis`` group of idata stored by :func:`loo` when valid, and
+        computed from the log likelihood otherwise.
     dask_kwargs : dict, optional
         Dask related kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
+    randomized : bool, optional
+        Compute the randomized LOO-PIT, for discrete outcomes. The values are drawn uniformly
+        between the LOO-PIT of ``y_hat < y`` and that of ``y_hat <= y``. Defaults to False.
+    seed : int, optional
+        Seed of the random numbers of the randomized LOO-PIT.
 
     Returns
     -------
     loo_pit: array or DataArray
-        Value of the LOO-PIT at each observed data point.
+        Value of the LOO-PIT at each observed data point. Data taken from ``idata`` is
+        kept as a DataArray when it is backed by dask arrays, in which case the result is
+        a lazy DataArray.
 
     Examples
     --------
@@ -1575,11 +2227,13 @@ def loo_pit(idata=None, *, y=None, y_hat=None, log_weights=None):
             raise ValueError("y_hat cannot be None if y is not a str")
         if isinstance(y, str):
             y_str = y
-            y = idata.observed_data[y].values
+            y = _values_unless_dask(idata.observed_data[y])
         elif not isinstance(y, (np.ndarray, xr.DataArray)):
             raise ValueError(f"y must be of types array, DataArray or str, not {type(y)}")
         if isinstance(y_hat, str):
-            y_hat = idata.posterior_predictive[y_hat].stack(sample=("chain", "draw")).values
+            y_hat = _values_unless_dask(
+                idata.posterior_predictive[y_hat].stack(sample=("chain", "draw"))
+            )
         elif not isinstance(y_hat, (np.ndarray, xr.DataArray)):
             raise ValueError(f"y_hat must be of types array, DataArray or str, not {type(y_hat)}")
         if log_weights is None:
@@ -1590,18 +2244,14 @@ def loo_pit(idata=None, *, y=None, y_hat=None, log_weights=None):
                     log_likelihood = _get_log_likelihood(idata)
             else:
                 log_likelihood = _get_log_likelihood(idata)
-            log_likelihood = log_likelihood.stack(sample=("chain", "draw"))
-            posterior = convert_to_dataset(idata, group="posterior")
-            n_chains = len(posterior.chain)
-            n_samples = len(log_likelihood.sample)
-            ess_p = ess(posterior, method="mean")
-            # this mean is over all data variables
-            reff = (
-                (np.hstack([ess_p[v].values.flatten() for v in ess_p.data_vars]).mean() / n_samples)
-                if n_chains > 1
-                else 1
-            )
-            log_weights = psislw(-log_likelihood, reff=reff)[0].values
+            psis = _get_psis(idata, log_likelihood.name)
+            if psis is not None:
+                log_weights = psis["log_weights"].stack(sample=("chain", "draw"))
+            else:
+                log_likelihood = log_likelihood.stack(sample=("chain", "draw"))
+                reff = _loo_reff(idata, len(log_likelihood.sample))
+                log_weights = psislw(-log_likelihood, reff=reff, dask_kwargs=dask_kwargs)[0]
+            log_weights = _values_unless_dask(log_weights)
         elif not isinstance(log_weights, (np.ndarray, xr.DataArray)):
             raise ValueError(
                 f"log_weights must be None or of types array or DataArray, not {type(log_weights)}"
@@ -1625,31 +2275,68 @@ def loo_pit(idata=None, *, y=None, y_hat=None, log_weights=None):
             f"{y_hat.shape,} and {log_weights.shape}"
         )
 
+    n_output = 2 if randomized else 1
     kwargs = {
         "input_core_dims": [[], ["sample"], ["sample"]],
-        "output_core_dims": [[]],
+        "output_core_dims": [[] for _ in range(n_output)],
         "join": "left",
     }
-    ufunc_kwargs = {"n_dims": 1}
+    ufunc_kwargs = {"n_dims": 1, "n_output": n_output, "vectorized": True}
 
-    return _wrap_xarray_ufunc(
+    loo_pit_values = _wrap_xarray_ufunc(
         _loo_pit,
         y,
         y_hat,
         log_weights,
+        func_kwargs={"randomized": randomized},
         ufunc_kwargs=ufunc_kwargs,
+        dask_kwargs=dask_kwargs,
         **kwargs,
     )
+    if randomized:
+        loo_pit_lower, loo_pit_upper = loo_pit_values
+        rng = np.random.RandomState(seed)
+        loo_pit_values = loo_pit_lower + rng.uniform(size=np.shape(loo_pit_lower)) * (
+            loo_pit_upper - loo_pit_lower
+        )
+    return loo_pit_values
 
 
-def _loo_pit(y, y_hat, log_weights):
-    """Compute LOO-PIT values."""
-    sel = y_hat <= y
-    if np.sum(sel) > 0:
-        value = np.exp(_logsumexp(log_weights[sel]))
-        return min(1, value)
-    else:
-        return 0
+def _values_unless_dask(data_array):
+    """Get the values of a DataArray unless they are dask arrays that should stay lazy."""
+    return data_array if _is_dask_backed(data_array) else data_array.values
+
+
+# maximum number of masked log weights computed at once by _loo_pit
+_LOO_PIT_BLOCK_SIZE = 2 ** 22
+
+
+def _loo_pit(y, y_hat, log_weights, randomized=False):
+    """Compute LOO-PIT values, vectorized over the leading dimensions of the inputs.
+
+    The logsumexp of the log weights of the ``y_hat <= y`` samples is computed as a masked
+    sum of the weights relative to the largest one of each observation, over blocks of
+    observations. If `randomized`, the LOO-PIT values of both ``y_hat < y`` and
+    ``y_hat <= y`` are returned.
+    """
+    y_hat = np.asarray(y_hat)
+    n_samples = y_hat.shape[-1]
+    shape = y_hat.shape[:-1]
+    y = np.broadcast_to(y, shape).reshape(-1, 1)
+    y_hat = y_hat.reshape(-1, n_samples)
+    log_weights = np.asarray(log_weights).reshape(-1, n_samples)
+    comparisons = (np.less, np.less_equal) if randomized else (np.less_equal,)
+    pits = [np.empty(len(y)) for _ in comparisons]
+    block_size = max(1, _LOO_PIT_BLOCK_SIZE // n_samples)
+    for start in range(0, len(y), block_size):
+        block = slice(start, start + block_size)
+        max_weights = log_weights[block].max(axis=-1, keepdims=True)
+        weights = np.exp(log_weights[block] - max_weights)
+        for pit, comparison in zip(pits, comparisons):
+            sel_weights = np.where(comparison(y_hat[block], y[block]), weights, 0)
+            pit[block] = sel_weights.sum(axis=-1) * np.exp(max_weights[:, 0])
+    pits = tuple(np.minimum(pit, 1).reshape(shape) for pit in pits)
+    return pits if randomized else pits[0]
 
 
 def apply_test_function(
@@ -1705,6 +2392,9 @@ def apply_test_function(
         Passed as is to ``func``
     func_kwargs: mapping, optional
         Passed as is to ``func``
+    ufunc_kwargs: mapping, optional
+        Passed to :func:`~arviz.make_ufunc`. Use ``{"jit": True}`` to compile ``func`` with
+        numba.
     wrap_data_kwargs, wrap_pp_kwargs: mapping, optional
         kwargs passed to :func:`~arviz.wrap_xarray_ufunc`. By default, some suitable input_core_dims
         are used.
@@ -1725,7 +2415,8 @@ def apply_test_function(
     -----
     This function is provided for convenience to wrap scalar or functions working on low
     dims to inference data object. It is not optimized to be faster nor as fast as vectorized
-    computations.
+    computations. Compiling ``func`` with ``ufunc_kwargs={"jit": True}`` avoids calling it
+    from Python for every sample, if it returns a scalar and takes no extra arguments.
 
     Examples
     --------
@@ -1,18 +1,40 @@
 """Stats functions that require refitting the model."""
 import logging
+import os
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy as np
 
-from .stats import loo
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+from ..rcparams import rcParams
+from .stats import loo, psislw
+from .stats_utils import ELPDData, _get_n_jobs
+from .stats_utils import get_log_likelihood as _get_log_likelihood
 from .stats_utils import logsumexp as _logsumexp
 
-__all__ = ["reloo"]
+__all__ = ["reloo", "kfold"]
 
 _log = logging.getLogger(__name__)
 
+_REFIT_METHODS = ("sel_observations", "sample", "get_inference_data", "log_likelihood__i")
+
 
-def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
+def reloo(
+    wrapper,
+    loo_orig=None,
+    k_thresh=0.7,
+    scale=None,
+    verbose=True,
+    executor=None,
+    checkpoint=None,
+    moment_match=False,
+    max_iters=30,
+):
     """Recalculate exact Leave-One-Out cross validation refitting where the approximation fails.
 
     ``az.loo`` estimates the values of Leave-One-Out (LOO) cross validation using Pareto
@@ -31,6 +53,11 @@ def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
     LOO-CV with only a handful of refits, which in most cases is still much less computationally
     expensive than exact LOO-CV, which needs one refit per observation.
 
+    With ``moment_match=True``, the posterior draws are first adapted to each problematic
+    observation with importance weighted moment matching [1]_, which needs no refits, and
+    the model is only refitted for the observations whose Pareto shape is still above
+    the threshold.
+
     Parameters
     ----------
     wrapper: SamplingWrapper-like
@@ -46,6 +73,22 @@ def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
         a refit excluding that observation.
     scale : str, optional
         Only taken into account when loo_orig is None. See ``az.loo`` for valid options.
+    verbose : bool, optional
+        Warn that reloo is experimental and log the progress of the refits.
+    executor : concurrent.futures.Executor, optional
+        Executor the refits are submitted to, for example a
+        :class:`~concurrent.futures.ProcessPoolExecutor`, which requires `wrapper` to be
+        picklable. By default the refits are performed sequentially.
+    checkpoint : str, optional
+        Path of a JSON file where the results of the completed refits are stored. If the file
+        exists, the refits it contains are not repeated, so an interrupted call can be
+        resumed by calling ``reloo`` again with the same `checkpoint`.
+    moment_match : bool, optional
+        Try moment matching before refitting. It requires `wrapper` to implement the
+        ``log_prob`` and ``log_likelihood_i`` methods, the sampling methods are then only
+        required if some refit is needed.
+    max_iters : int, optional
+        Maximum number of moment matching iterations per observation.
 
     Returns
     -------
@@ -53,7 +96,8 @@ def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
         ELPDData instance containing the PSIS approximation where possible and the exact
         LOO-CV result where PSIS failed. The Pareto shape of the observations where exact
         LOO-CV was performed is artificially set to 0, but as PSIS is not performed, it
-        should be ignored.
+        should be ignored. The Pareto shape of the observations solved with moment matching
+        is the one of the adapted draws.
 
     Notes
     -----
@@ -66,24 +110,28 @@ def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
     This is not generally recommended
     nor intended, however, if needed, this function can be used to achieve the result.
 
+    Moment matching transforms the posterior draws, it works best when all the posterior
+    variables are unconstrained.
+
     Warnings
     --------
     Sampling wrappers are an experimental feature in a very early stage. Please use them
     with caution.
+
+    References
+    ----------
+    .. [1] Paananen et al. (2021) Implicitly adaptive importance sampling. Statistics and
+        Computing 31:16 https://doi.org/10.1007/s11222-020-09982-2
     """
-    required_methods = ("sel_observations", "sample", "get_inference_data", "log_likelihood__i")
-    not_implemented = wrapper.check_implemented_methods(required_methods)
-    if not_implemented:
-        raise TypeError(
-            "Passed wrapper instance does not implement all methods required for reloo "
-            f"to work. Check the documentation of SamplingWrapper. {not_implemented} must be "
-            "implemented and were not found."
-        )
+    if moment_match:
+        _check_wrapper_methods(wrapper, ("log_prob", "log_likelihood_i"), "reloo")
+    else:
+        _check_wrapper_methods(wrapper, _REFIT_METHODS, "reloo")
     if loo_orig is None:
         loo_orig = loo(wrapper.idata_orig, pointwise=True, scale=scale)
     loo_refitted = loo_orig.copy()
-    khats = loo_refitted.pareto_k
-    loo_i = loo_refitted.loo_i
+    khats = loo_refitted.pareto_k.copy()
+    loo_i = loo_refitted.loo_i.copy()
     scale = loo_orig.loo_scale
 
     if scale.lower() == "deviance":
@@ -99,16 +147,50 @@ def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
         warnings.warn("reloo is an experimental and untested feature", UserWarning)
 
     if np.any(khats > k_thresh):
-        for idx in np.argwhere(khats.values > 0.7):
+        idxs = np.argwhere(khats.values > k_thresh)
+        if moment_match:
+            draws = _posterior_draws_matrix(wrapper.idata_orig)
+            log_prob_orig = wrapper.log_prob(draws)
+            refit_idxs = []
+            for idx in idxs:
+                loo_lppd_idx, khat_idx = _moment_match_loo_lppd(
+                    wrapper, idx, draws, log_prob_orig, k_thresh, max_iters
+                )
+                if khat_idx > k_thresh:
+                    refit_idxs.append(idx)
+                else:
+                    khats.values[tuple(idx)] = khat_idx
+                    loo_i.values[tuple(idx)] = scale_value * loo_lppd_idx
+                if verbose:
+                    _log.info(
+                        "Moment matching for observation %s: Pareto shape %.2f",
+                        _idx_key(idx),
+                        khat_idx,
+                    )
+            idxs = refit_idxs
+            if idxs:
+                _check_wrapper_methods(wrapper, _REFIT_METHODS, "reloo")
+        completed = _read_checkpoint(checkpoint)
+        pending = [idx for idx in idxs if _idx_key(idx) not in completed]
+        n_done = len(idxs) - len(pending)
+        if verbose and n_done:
+            _log.info("Resuming from %d completed refits", n_done)
+        for idx, loo_lppd_idx in _map_refits(_refit_loo_lppd, wrapper, pending, executor):
+            completed[_idx_key(idx)] = loo_lppd_idx
+            _write_checkpoint(checkpoint, completed)
+            n_done += 1
             if verbose:
-                _log.info("Refitting model excluding observation %d", idx)
-            new_obs, excluded_obs = wrapper.sel_observations(idx)
-            fit = wrapper.sample(new_obs)
-            idata_idx = wrapper.get_inference_data(fit)
-            log_like_idx = wrapper.log_likelihood__i(excluded_obs, idata_idx).values.flatten()
-            loo_lppd_idx = scale_value * _logsumexp(log_like_idx, b_inv=len(log_like_idx))
-            khats[idx] = 0
-            loo_i[idx] = loo_lppd_idx
+                _log.info(
+                    "Refitted model excluding observation %s (%d/%d)",
+                    _idx_key(idx),
+                    n_done,
+                    len(idxs),
+                )
+        for idx in idxs:
+            khats.values[tuple(idx)] = 0
+            loo_i.values[tuple(idx)] = scale_value * completed[_idx_key(idx)]
+        loo_refitted.pareto_k = khats
+        loo_refitted.loo_i = loo_i
         loo_refitted.loo = loo_i.values.sum()
         loo_refitted.loo_se = (n_data_points * np.var(loo_i.values)) ** 0.5
         loo_refitted.p_loo = lppd_orig - loo_refitted.loo / scale_value
@@ -116,3 +198,328 @@ def reloo(wrapper, loo_orig=None, k_thresh=0.7, scale=None, verbose=True):
     else:
         _log.info("No problematic observations")
         return loo_orig
+
+
+def kfold(
+    wrapper,
+    k=10,
+    folds=None,
+    stratify=None,
+    var_name=None,
+    scale=None,
+    seed=None,
+    n_jobs=None,
+    executor=None,
+    verbose=True,
+):
+    """Compute K-fold cross validation refitting the model once per fold.
+
+    The observations are split in ``k`` folds, the model is refitted excluding each
+    fold and the pointwise log predictive density of the held out observations is
+    computed with the refitted posterior. Unlike ``reloo``, the number of refits does not
+    depend on the number of observations where PSIS fails, which makes K-fold cross
+    validation the alternative when PSIS fails for many observations.
+
+    Parameters
+    ----------
+    wrapper: SamplingWrapper-like
+        Class (preferably a subclass of ``az.SamplingWrapper``, see :ref:`wrappers_api`
+        for details) implementing the methods described in the SamplingWrapper docs.
+        ``sel_observations`` is called with an array of shape ``(n_held_out, ndim)`` with
+        the indexes of all the observations in a fold to refit the model, and with each of
+        its rows to get the held out observations one by one.
+    k : int, optional
+        Number of folds, ignored if `folds` is given.
+    folds : array_like of int, optional
+        Fold of each observation, with the shape of the pointwise log likelihood. Use the
+        same folds to compare the K-fold results of several models.
+    stratify : array_like, optional
+        Group of each observation, with the shape of the pointwise log likelihood. The
+        observations of each group are split evenly across folds. Ignored if `folds`
+        is given.
+    var_name : str, optional
+        The name of the variable in the log_likelihood group of ``wrapper.idata_orig``
+        defining the observations, required if there is more than one variable.
+    scale : str
+        Output scale for the K-fold results, see ``az.loo`` for valid options.
+    seed : int or numpy.random.Generator, optional
+        Seed of the random split of the observations in folds.
+    n_jobs : int, optional
+        Number of threads the refits are performed in. Defaults to the value of
+        ``rcParams["stats.n_jobs"]``, all the cpus if that is None.
+    executor : concurrent.futures.Executor, optional
+        Executor the refits are submitted to, for example a
+        :class:`~concurrent.futures.ProcessPoolExecutor`, which requires `wrapper` to be
+        picklable. Overrides `n_jobs`.
+    verbose : bool, optional
+        Warn that kfold is experimental and log the progress of the refits.
+
+    Returns
+    -------
+    ELPDData
+        ELPDData instance with the same rows as the pointwise ``az.loo`` results, except
+        ``pareto_k``, and the fold of each observation in ``folds``. It can be used in
+        ``az.compare`` with ``ic="loo"``.
+
+    Warnings
+    --------
+    Sampling wrappers are an experimental feature in a very early stage. Please use them
+    with caution.
+    """
+    _check_wrapper_methods(wrapper, _REFIT_METHODS, "kfold")
+    log_likelihood = _get_log_likelihood(wrapper.idata_orig, var_name=var_name)
+    n_samples = log_likelihood.sizes["chain"] * log_likelihood.sizes["draw"]
+    template = log_likelihood.isel(chain=0, draw=0, drop=True)
+    n_data_points = template.size
+    scale = rcParams["stats.ic_scale"] if scale is None else scale.lower()
+
+    if scale == "deviance":
+        scale_value = -2
+    elif scale == "log":
+        scale_value = 1
+    elif scale == "negative_log":
+        scale_value = -1
+    else:
+        raise TypeError('Valid scale values are "deviance", "log", "negative_log"')
+
+    if folds is None:
+        if not 1 < k <= n_data_points:
+            raise ValueError(f"k must be between 2 and the number of observations, got {k}")
+        if stratify is not None and np.size(stratify) != n_data_points:
+            raise ValueError("stratify must have one value per observation")
+        folds = _kfold_split(n_data_points, k, stratify, seed)
+    elif np.size(folds) != n_data_points:
+        raise ValueError("folds must have one value per observation")
+    folds = np.reshape(folds, template.shape)
+    fold_idxs = [np.argwhere(folds == fold) for fold in np.unique(folds)]
+
+    if verbose:
+        warnings.warn("kfold is an experimental and untested feature", UserWarning)
+
+    n_jobs = min(_get_n_jobs(n_jobs), len(fold_idxs))
+    thread_pool = None
+    if executor is None and n_jobs > 1:
+        executor = thread_pool = ThreadPoolExecutor(max_workers=n_jobs)
+    kfold_lppd_i = np.empty(template.shape)
+    try:
+        refits = _map_refits(_refit_kfold_lppd, wrapper, fold_idxs, executor)
+        for n_done, (idxs, lppd_fold) in enumerate(refits, 1):
+            for idx, lppd_idx in zip(idxs, lppd_fold):
+                kfold_lppd_i[tuple(idx)] = lppd_idx
+            if verbose:
+                _log.info("Refitted model excluding fold %d/%d", n_done, len(fold_idxs))
+    finally:
+        if thread_pool is not None:
+            thread_pool.shutdown()
+
+    lppd = _logsumexp(
+        log_likelihood.stack(__sample__=("chain", "draw")).values, b_inv=n_samples, axis=-1
+    ).sum()
+    kfold_lppd_i = template.copy(data=scale_value * kfold_lppd_i).rename("loo_i")
+    kfold_lppd = kfold_lppd_i.values.sum()
+    kfold_lppd_se = (n_data_points * np.var(kfold_lppd_i.values)) ** 0.5
+    return ELPDData(
+        data=[
+            kfold_lppd,
+            kfold_lppd_se,
+            lppd - kfold_lppd / scale_value,
+            n_samples,
+            n_data_points,
+            False,
+            kfold_lppd_i,
+            template.copy(data=folds).rename("folds"),
+            scale,
+        ],
+        index=[
+            "loo",
+            "loo_se",
+            "p_loo",
+            "n_samples",
+            "n_data_points",
+            "warning",
+            "loo_i",
+            "folds",
+            "loo_scale",
+        ],
+    )
+
+
+def _kfold_split(n_data_points, k, stratify=None, seed=None):
+    """Assign the observations to folds at random, stratified by `stratify` if given."""
+    order = np.random.default_rng(seed).permutation(n_data_points)
+    if stratify is not None:
+        order = order[np.argsort(np.ravel(stratify)[order], kind="stable")]
+    folds = np.empty(n_data_points, dtype=int)
+    folds[order] = np.arange(n_data_points) % k
+    return folds
+
+
+def _check_wrapper_methods(wrapper, required_methods, func_name):
+    """Raise a TypeError if `wrapper` does not implement all of `required_methods`."""
+    not_implemented = wrapper.check_implemented_methods(required_methods)
+    if not_implemented:
+        raise TypeError(
+            f"Passed wrapper instance does not implement all methods required for {func_name} "
+            f"to work. Check the documentation of SamplingWrapper. {not_implemented} must be "
+            "implemented and were not found."
+        )
+
+
+def _posterior_draws_matrix(idata):
+    """Flatten and concatenate the posterior variables in a (n_samples, n_parameters) array."""
+    posterior = idata.posterior.stack(__sample__=("chain", "draw"))
+    n_samples = posterior.sizes["__sample__"]
+    return np.hstack(
+        [
+            posterior[var_name].transpose("__sample__", ...).values.reshape(n_samples, -1)
+            for var_name in posterior.data_vars
+        ]
+    )
+
+
+def _shift(draws, weights):
+    """Affine map matching the mean of the draws to their importance weighted mean."""
+    mapping = np.eye(draws.shape[1])
+    return mapping, weights @ draws - draws.mean(axis=0)
+
+
+def _shift_and_scale(draws, weights):
+    """Affine map matching the mean and the marginal variances to the weighted ones."""
+    mean_weighted = weights @ draws
+    var_weighted = weights @ draws ** 2 - mean_weighted ** 2
+    scaling = np.sqrt(var_weighted / draws.var(axis=0, ddof=1))
+    return np.diag(scaling), mean_weighted - draws.mean(axis=0) * scaling
+
+
+def _shift_and_cov(draws, weights):
+    """Affine map matching the mean and the covariance to the weighted ones.
+
+    Returns None if there are too few draws to estimate the covariance.
+    """
+    n_samples, n_parameters = draws.shape
+    if n_samples < 10 * n_parameters:
+        return None
+    cov_orig = np.atleast_2d(np.cov(draws, rowvar=False))
+    cov_weighted = np.atleast_2d(np.cov(draws, rowvar=False, aweights=weights))
+    try:
+        chol_orig = np.linalg.cholesky(cov_orig)
+        chol_weighted = np.linalg.cholesky(cov_weighted)
+    except np.linalg.LinAlgError:
+        return None
+    mapping = chol_weighted @ np.linalg.inv(chol_orig)
+    return mapping, weights @ draws - draws.mean(axis=0) @ mapping.T
+
+
+def _moment_match_loo_lppd(wrapper, idx, draws, log_prob_orig, k_thresh, max_iters=30):
+    """Compute the elpd of observation `idx`, in log scale, with moment matching.
+
+    The draws are iteratively transformed with affine maps that match their moments to
+    the importance weighted ones, a map is only accepted if it decreases the Pareto shape
+    of the importance weights. As the maps are affine, the density of the transformed
+    draws is proportional to `log_prob_orig`. The elpd is then computed with half of the
+    draws transformed, using the mixture of the posterior and the transformed posterior
+    as proposal, which keeps the estimate unbiased when the transformed draws miss the
+    regions where the likelihood of the observation is large.
+
+    Returns
+    -------
+    loo_lppd : float
+    pareto_shape : float
+    """
+    n_samples, n_parameters = draws.shape
+    total_mapping = np.eye(n_parameters)
+    total_offset = np.zeros(n_parameters)
+    draws_trans = draws
+    log_like = wrapper.log_likelihood_i(idx, draws)
+    log_weights, pareto_shape = psislw(-log_like)
+    for _ in range(max_iters):
+        if pareto_shape <= k_thresh:
+            break
+        for transform in (_shift, _shift_and_scale, _shift_and_cov):
+            affine_map = transform(draws_trans, np.exp(log_weights))
+            if affine_map is None:
+                continue
+            mapping, offset = affine_map
+            draws_new = draws_trans @ mapping.T + offset
+            log_like_new = wrapper.log_likelihood_i(idx, draws_new)
+            log_weights_new, pareto_shape_new = psislw(
+                wrapper.log_prob(draws_new) - log_prob_orig - log_like_new
+            )
+            if pareto_shape_new < pareto_shape:
+                draws_trans, log_like = draws_new, log_like_new
+                log_weights, pareto_shape = log_weights_new, pareto_shape_new
+                total_mapping = mapping @ total_mapping
+                total_offset = total_offset @ mapping.T + offset
+                break
+        else:
+            break
+    if draws_trans is draws:
+        return _logsumexp(log_weights + log_like), float(pareto_shape)
+
+    # split proposal: the first half of the draws are transformed, the second half are not
+    n_half = n_samples // 2
+    draws_half = draws.copy()
+    draws_half[:n_half] = draws_trans[:n_half]
+    draws_half_inv = draws.copy()
+    draws_half_inv[n_half:] = (draws[n_half:] - total_offset) @ np.linalg.inv(total_mapping).T
+    log_prob_half = wrapper.log_prob(draws_half)
+    log_prob_half_inv = wrapper.log_prob(draws_half_inv) - np.linalg.slogdet(total_mapping)[1]
+    log_like = wrapper.log_likelihood_i(idx, draws_half)
+    log_weights, pareto_shape = psislw(
+        log_prob_half - log_like - np.logaddexp(log_prob_half, log_prob_half_inv)
+    )
+    return _logsumexp(log_weights + log_like), float(pareto_shape)
+
+
+def _lppd(wrapper, excluded_obs, idata):
+    """Compute the elpd of `excluded_obs` with the posterior in `idata`, in log scale."""
+    log_like = wrapper.log_likelihood__i(excluded_obs, idata).values.flatten()
+    return _logsumexp(log_like, b_inv=len(log_like))
+
+
+def _refit_loo_lppd(wrapper, idx):
+    """Refit the model excluding observation `idx` and compute its elpd, in log scale."""
+    new_obs, excluded_obs = wrapper.sel_observations(idx)
+    fit = wrapper.sample(new_obs)
+    return _lppd(wrapper, excluded_obs, wrapper.get_inference_data(fit))
+
+
+def _refit_kfold_lppd(wrapper, idxs):
+    """Refit the model excluding the observations `idxs` and compute their pointwise elpd."""
+    new_obs, _ = wrapper.sel_observations(idxs)
+    idata_fold = wrapper.get_inference_data(wrapper.sample(new_obs))
+    return np.array([_lppd(wrapper, wrapper.sel_observations(idx)[1], idata_fold) for idx in idxs])
+
+
+def _map_refits(refit_func, wrapper, idxs, executor=None):
+    """Yield the observations and result of every refit, in order of completion."""
+    if executor is None:
+        for idx in idxs:
+            yield idx, refit_func(wrapper, idx)
+    else:
+        futures = {executor.submit(refit_func, wrapper, idx): i for i, idx in enumerate(idxs)}
+        for future in as_completed(futures):
+            yield idxs[futures[future]], future.result()
+
+
+def _idx_key(idx):
+    """Convert the index of an observation to a checkpoint key."""
+    return ",".join(str(i) for i in np.ravel(idx))
+
+
+def _read_checkpoint(checkpoint):
+    """Read the elpd of the completed refits from the checkpoint file, if any."""
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return {}
+    with open(checkpoint, "r", encoding="utf-8") as file:
+        return json.load(file)["loo_lppd"]
+
+
+def _write_checkpoint(checkpoint, completed):
+    """Write the elpd of the completed refits to the checkpoint file."""
+    if checkpoint is None:
+        return
+    tmp_path = f"{checkpoint}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"loo_lppd": {key: float(value) for key, value in completed.items()}}, file)
+    os.replace(tmp_path, checkpoint)
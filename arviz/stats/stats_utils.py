@@ -1,6 +1,10 @@
+# pylint: disable=too-many-lines
 """Stats-utility functions for ArviZ."""
+import importlib
+import os
 import warnings
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from copy import copy as _copy
 from copy import deepcopy as _deepcopy
 
@@ -11,31 +15,52 @@ from scipy.stats.mstats import mquantiles
 from xarray import apply_ufunc
 
 from arviz import _log
-from ..utils import conditional_jit, conditional_vect, conditional_dask
+from ..rcparams import rcParams
+from ..utils import Numba, conditional_jit, conditional_vect, conditional_dask
 from .density_utils import histogram as _histogram
 
 
 __all__ = ["autocorr", "autocov", "ELPDData", "make_ufunc", "wrap_xarray_ufunc"]
 
 
-def autocov(ary, axis=-1):
+def autocov(ary, axis=-1, max_lag=None):
     """Compute autocovariance estimates for every lag for the input array.
 
     Parameters
     ----------
     ary : Numpy array
         An array containing MCMC samples
+    axis : int, optional
+        Axis along which the autocovariance is computed.
+    max_lag : int, optional
+        Maximum lag to compute. By default all lags are computed with an FFT of length
+        ``next_fast_len(2 * n)``. Otherwise only lags up to `max_lag` are computed, either
+        directly or with a shorter FFT, whichever is cheaper.
 
     Returns
     -------
-    acov: Numpy array same size as the input array
+    acov: Numpy array same size as the input array or with ``max_lag + 1``
+        elements along `axis` if `max_lag` is given.
     """
-    axis = axis if axis > 0 else len(ary.shape) + axis
+    axis = axis if axis >= 0 else len(ary.shape) + axis
     n = ary.shape[axis]
-    m = next_fast_len(2 * n)
+    n_lags = n if max_lag is None else max(min(max_lag + 1, n), 1)
 
     ary = ary - ary.mean(axis, keepdims=True)
 
+    if n_lags == n:
+        m = next_fast_len(2 * n)
+    else:
+        m = next_fast_len(n + n_lags - 1)
+        if n_lags * n < m * np.log2(m):
+            # direct computation is cheaper than the FFT for a few lags
+            ary = np.moveaxis(ary, axis, -1)
+            cov = np.empty(ary.shape[:-1] + (n_lags,))
+            for lag in range(n_lags):
+                cov[..., lag] = np.sum(ary[..., : n - lag] * ary[..., lag:], axis=-1)
+            cov /= n
+            return np.moveaxis(cov, -1, axis)
+
     # added to silence tuple warning for a submodule
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
@@ -44,7 +69,8 @@ def autocov(ary, axis=-1):
         ifft_ary *= np.conjugate(ifft_ary)
 
         shape = tuple(
-            slice(None) if dim_len != axis else slice(0, n) for dim_len, _ in enumerate(ary.shape)
+            slice(None) if dim_len != axis else slice(0, n_lags)
+            for dim_len, _ in enumerate(ary.shape)
         )
         cov = np.fft.irfft(ifft_ary, n=m, axis=axis)[shape]
         cov /= n
@@ -52,7 +78,7 @@ def autocov(ary, axis=-1):
     return cov
 
 
-def autocorr(ary, axis=-1):
+def autocorr(ary, axis=-1, max_lag=None):
     """Compute autocorrelation using FFT for every lag for the input array.
 
     See https://en.wikipedia.org/wiki/autocorrelation#Efficient_computation
@@ -61,13 +87,18 @@ def autocorr(ary, axis=-1):
     ----------
     ary : Numpy array
         An array containing MCMC samples
+    axis : int, optional
+        Axis along which the autocorrelation is computed.
+    max_lag : int, optional
+        Maximum lag to compute, see :func:`autocov`. By default all lags are computed.
 
     Returns
     -------
-    acorr: Numpy array same size as the input array
+    acorr: Numpy array same size as the input array or with ``max_lag + 1``
+        elements along `axis` if `max_lag` is given.
     """
-    corr = autocov(ary, axis=axis)
-    axis = axis = axis if axis > 0 else len(corr.shape) + axis
+    corr = autocov(ary, axis=axis, max_lag=max_lag)
+    axis = axis if axis >= 0 else len(corr.shape) + axis
     norm = tuple(
         slice(None, None) if dim != axis else slice(None, 1) for dim, _ in enumerate(corr.shape)
     )
@@ -76,8 +107,83 @@ def autocorr(ary, axis=-1):
     return corr
 
 
+def _get_n_jobs(n_jobs):
+    """Get the number of threads to use, None defaults to the ``stats.n_jobs`` rcParam."""
+    if n_jobs is None:
+        n_jobs = rcParams["stats.n_jobs"]
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    return n_jobs
+
+
+def _map_chunks(func, size, n_jobs):
+    """Call `func` on contiguous slices covering ``range(size)``, in a thread pool if n_jobs > 1.
+
+    Returns the list of the results for every slice, in order.
+    """
+    n_chunks = max(min(n_jobs, size), 1)
+    bounds = np.linspace(0, size, n_chunks + 1).astype(int)
+    chunks = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+    if n_chunks == 1:
+        return [func(chunk) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=n_chunks) as executor:
+        return list(executor.map(func, chunks))
+
+
+class _JitGufunc:
+    """Compile a function returning a scalar per element into a numba gufunc.
+
+    The gufunc loops over the leading dimensions of the inputs in compiled code, each
+    input keeps its trailing core dimensions. Gufuncs are compiled lazily for every
+    combination of core dimensions, and numba compiles them for every input dtype.
+    """
+
+    def __init__(self, func, n_input):
+        self.numba = importlib.import_module("numba")
+        self.func = self.numba.njit(func)
+        self.n_input = n_input
+        self.gufuncs = {}
+
+    def _kernel(self):
+        func = self.func
+        if self.n_input == 1:
+
+            def kernel(ary, out):
+                out[0] = func(ary)
+
+        else:
+
+            def kernel(ary1, ary2, out):
+                out[0] = func(ary1, ary2)
+
+        return kernel
+
+    def __call__(self, arys, out):
+        """Compute `func` on every element of `arys`, writing the results in `out`."""
+        core_ndims = tuple(ary.ndim - out.ndim for ary in arys)
+        gufunc = self.gufuncs.get(core_ndims)
+        if gufunc is None:
+            layout = ",".join(
+                f"({','.join(f'n{i}_{j}' for j in range(core_ndim))})"
+                for i, core_ndim in enumerate(core_ndims)
+            )
+            gufunc = self.numba.guvectorize(f"{layout}->()", nopython=True)(self._kernel())
+            self.gufuncs[core_ndims] = gufunc
+        gufunc(*arys, out)
+        return out
+
+
 def make_ufunc(
-    func, n_dims=2, n_output=1, n_input=1, index=Ellipsis, ravel=True, check_shape=None
+    func,
+    n_dims=2,
+    n_output=1,
+    n_input=1,
+    index=Ellipsis,
+    ravel=True,
+    check_shape=None,
+    vectorized=False,
+    n_jobs=None,
+    jit=False,
 ):  # noqa: D202
     """Make ufunc from a function taking 1D array input.
 
@@ -102,6 +208,22 @@ def make_ufunc(
         n_output. By default, True only for n_input=1. If n_input is larger than 1, the last
         input array is used to check the shape, however, shape checking with multiple inputs
         may not be correct.
+    vectorized : bool, optional
+        If true, `func` already works on arrays with any number of leading (broadcasted)
+        dimensions followed by the `n_dims` core dimensions, and it is called once on the
+        whole input instead of once per element. If `ravel` is also true, the core
+        dimensions are flattened into a single one before calling `func`.
+    n_jobs : int, optional
+        Number of threads the elements are split between. Vectorized functions are
+        split along the first broadcasted dimension. `func` should release the GIL
+        (as most numpy and scipy functions do) to run in parallel. Defaults to
+        ``rcParams["stats.n_jobs"]``, all the cpus if that is None.
+    jit : bool, optional
+        If true and numba is enabled, compile `func` with ``numba.njit`` and loop over the
+        elements with a compiled gufunc instead of calling `func` from Python once per
+        element. Only used with one or two array inputs, a single scalar output per
+        element and no extra arguments. If the compilation fails, a warning is emitted
+        and the Python loop is used. `n_jobs` is ignored by the compiled loop.
 
     Returns
     -------
@@ -116,6 +238,28 @@ def make_ufunc(
     elif check_shape is None:
         check_shape = False
 
+    jit_gufunc = []
+    if jit and Numba.numba_flag and n_input <= 2 and n_output == 1 and not vectorized:
+        jit_gufunc.append(_JitGufunc(func, n_input))
+
+    def _jit_ufunc(arys, out):
+        """Call the compiled gufunc, return False if the Python loop has to be used instead."""
+        if any(ary.shape[: out.ndim] != out.shape for ary in arys):
+            return False
+        numba_error = jit_gufunc[0].numba.core.errors.NumbaError
+        if ravel:
+            arys = [ary.reshape(*ary.shape[: out.ndim], -1) for ary in arys]
+        try:
+            jit_gufunc[0](arys, out)
+        except numba_error as err:
+            warnings.warn(
+                f"Could not compile {getattr(func, '__name__', func)} with numba, "
+                f"falling back to the Python loop: {err}"
+            )
+            jit_gufunc.clear()
+            return False
+        return True
+
     def _ufunc(*args, out=None, out_shape=None, **kwargs):
         """General ufunc for single-output function."""
         arys = args[:n_input]
@@ -131,9 +275,17 @@ def make_ufunc(
                 msg = f"Shape incorrect for `out`: {out.shape}."
                 msg += f" Correct shape is {arys[-1].shape[:-n_dims]}"
                 raise TypeError(msg)
-        for idx in np.ndindex(out.shape[:n_dims_out]):
-            arys_idx = [ary[idx].ravel() if ravel else ary[idx] for ary in arys]
-            out[idx] = np.asarray(func(*arys_idx, *args[n_input:], **kwargs))[index]
+        use_jit = jit_gufunc and n_dims_out is None and len(args) == n_input and not kwargs
+        if use_jit and index is Ellipsis and _jit_ufunc(arys, out):
+            return out
+        indices = list(np.ndindex(out.shape[:n_dims_out]))
+
+        def _compute(chunk):
+            for idx in indices[chunk]:
+                arys_idx = [ary[idx].ravel() if ravel else ary[idx] for ary in arys]
+                out[idx] = np.asarray(func(*arys_idx, *args[n_input:], **kwargs))[index]
+
+        _map_chunks(_compute, len(indices), _get_n_jobs(n_jobs))
         return out
 
     def _multi_ufunc(*args, out=None, out_shape=None, **kwargs):
@@ -160,14 +312,77 @@ def make_ufunc(
                 msg = f"Shapes incorrect for `out`: {out_shape}."
                 msg += f" Correct shapes are {correct_shape}"
                 raise TypeError(msg)
-        for idx in np.ndindex(element_shape):
-            arys_idx = [ary[idx].ravel() if ravel else ary[idx] for ary in arys]
-            results = func(*arys_idx, *args[n_input:], **kwargs)
-            for i, res in enumerate(results):
-                out[i][idx] = np.asarray(res)[index]
+        indices = list(np.ndindex(element_shape))
+
+        def _compute(chunk):
+            for idx in indices[chunk]:
+                arys_idx = [ary[idx].ravel() if ravel else ary[idx] for ary in arys]
+                results = func(*arys_idx, *args[n_input:], **kwargs)
+                for i, res in enumerate(results):
+                    out[i][idx] = np.asarray(res)[index]
+
+        _map_chunks(_compute, len(indices), _get_n_jobs(n_jobs))
         return out
 
-    if n_output > 1:
+    def _vectorized_ufunc(*args, out=None, out_shape=None, **kwargs):
+        """General ufunc for functions already vectorized over the non core dimensions."""
+        arys = args[:n_input]
+        element_shape = arys[-1].shape[:-n_dims]
+        if check_shape and out is not None:
+            correct_shape = element_shape if n_output == 1 else (element_shape,) * n_output
+            out_shapes = out.shape if n_output == 1 else tuple(np.shape(item) for item in out)
+            if out_shapes != correct_shape:
+                msg = f"Shape incorrect for `out`: {out_shapes}."
+                msg += f" Correct shape is {correct_shape}"
+                raise TypeError(msg)
+        if ravel:
+            arys = [ary.reshape(*ary.shape[:-n_dims], -1) for ary in arys]
+        n_jobs_ = _get_n_jobs(n_jobs) if element_shape else 1
+        size = element_shape[0] if element_shape else 1
+
+        def _compute(chunk):
+            if n_jobs_ > 1:
+                # inputs broadcasted along the first dimension are not sliced
+                arys_chunk = [ary if ary.shape[0] == 1 else ary[chunk] for ary in arys]
+            else:
+                arys_chunk = arys
+            results = func(*arys_chunk, *args[n_input:], **kwargs)
+            if n_output == 1:
+                results = (results,)
+            if index is not Ellipsis:
+                leading = tuple(slice(None) for _ in element_shape)
+                results = tuple(np.asarray(res)[(*leading, index)] for res in results)
+            return results
+
+        chunk_results = _map_chunks(_compute, size, n_jobs_)
+        if out_shape is not None:
+            out_shapes = (out_shape,) if n_output == 1 else out_shape
+            res_shapes = tuple(np.shape(res)[len(element_shape) :] for res in chunk_results[0])
+            if res_shapes != tuple(tuple(shape) for shape in out_shapes):
+                msg = f"Shape incorrect for the results of `func`: {res_shapes}."
+                msg += f" Correct shape is {out_shape}"
+                raise TypeError(msg)
+        if out is None:
+            first = chunk_results[0]
+            if len(chunk_results) == 1:
+                out = tuple(np.empty(np.shape(res)) for res in first)
+            else:
+                out = tuple(np.empty((size, *np.shape(res)[1:])) for res in first)
+        elif n_output == 1:
+            out = (out,)
+        if len(chunk_results) == 1:
+            for out_i, res in zip(out, chunk_results[0]):
+                out_i[...] = res
+        else:
+            bounds = np.cumsum([0] + [np.shape(results[0])[0] for results in chunk_results])
+            for start, stop, results in zip(bounds[:-1], bounds[1:], chunk_results):
+                for out_i, res in zip(out, results):
+                    out_i[start:stop] = res
+        return out[0] if n_output == 1 else out
+
+    if vectorized:
+        ufunc = _vectorized_ufunc
+    elif n_output > 1:
         ufunc = _multi_ufunc
     else:
         ufunc = _ufunc
@@ -199,6 +414,9 @@ def wrap_xarray_ufunc(
             - 'n_input', int, by default len(datasets)
             - 'index', slice, by default Ellipsis
             - 'ravel', bool, by default True
+            - 'vectorized', bool, by default False
+            - 'n_jobs', int, by default ``rcParams["stats.n_jobs"]``, 1 for dask inputs
+            - 'jit', bool, by default False
     func_args : tuple
         Arguments passed to 'ufunc'.
     func_kwargs : dict
@@ -206,7 +424,10 @@ def wrap_xarray_ufunc(
             - 'out_shape', int, by default None
     dask_kwargs : dict
         Dask related kwargs passed to :func:`xarray:xarray.apply_ufunc`.
-        Use :meth:`~arviz.Dask.enable_dask` to set default kwargs.
+        Use :meth:`~arviz.Dask.enable_dask` to set default kwargs. If any of the
+        inputs is backed by dask arrays, ``ufunc`` is applied lazily and blockwise with
+        ``dask="parallelized"`` unless another ``dask`` option is given. Missing
+        ``output_dtypes`` and ``dask_gufunc_kwargs`` are then filled in.
     **kwargs
         Passed to xarray.apply_ufunc.
 
@@ -230,6 +451,15 @@ def wrap_xarray_ufunc(
     ufunc_kwargs.setdefault("n_dims", len(kwargs["input_core_dims"][-1]))
     kwargs.setdefault("output_core_dims", tuple([] for _ in range(ufunc_kwargs.get("n_output", 1))))
 
+    if dask_kwargs.get("dask", "parallelized") == "parallelized" and is_dask_backed(
+        *datasets, *func_args
+    ):
+        dask_kwargs = _default_dask_kwargs(
+            dask_kwargs, ufunc_kwargs.get("n_output", 1), kwargs["output_core_dims"], func_kwargs
+        )
+        # dask already computes the blocks in parallel
+        ufunc_kwargs.setdefault("n_jobs", 1)
+
     callable_ufunc = make_ufunc(ufunc, **ufunc_kwargs)
 
     return apply_ufunc(
@@ -237,6 +467,52 @@ def wrap_xarray_ufunc(
     )
 
 
+def is_dask_backed(*objs):
+    """Check if any of the xarray objects or arrays is backed by dask arrays.
+
+    Parameters
+    ----------
+    *objs : xarray.Dataset, xarray.DataArray or array_like
+
+    Returns
+    -------
+    bool
+    """
+    for obj in objs:
+        if hasattr(obj, "data_vars"):
+            arrays = [var.data for var in obj.data_vars.values()]
+        else:
+            arrays = [getattr(obj, "data", obj)]
+        if any(hasattr(ary, "__dask_graph__") for ary in arrays):
+            return True
+    return False
+
+
+def _default_dask_kwargs(dask_kwargs, n_output, output_core_dims, func_kwargs):
+    """Complete dask kwargs to run a ufunc blockwise over dask backed inputs.
+
+    Core dimensions are merged into a single chunk, the other dimensions keep their
+    chunks and every block is processed independently. The sizes of the output core
+    dimensions not present in the inputs are taken from the ``out_shape`` func kwarg.
+    """
+    gufunc_kwargs = {"allow_rechunk": True}
+    out_shape = func_kwargs.get("out_shape")
+    if out_shape is not None:
+        out_shapes = [out_shape] if n_output == 1 else out_shape
+        gufunc_kwargs["output_sizes"] = {
+            dim: size
+            for dims, shape in zip(output_core_dims, out_shapes)
+            for dim, size in zip(dims, shape)
+        }
+    gufunc_kwargs.update(dask_kwargs.get("dask_gufunc_kwargs", {}))
+    return {
+        "dask": "parallelized",
+        "output_dtypes": [float] * n_output,
+        **dask_kwargs,
+        "dask_gufunc_kwargs": gufunc_kwargs,
+    }
+
+
 def update_docstring(ufunc, func, n_output=1):
     """Update ArviZ generated ufunc docstring."""
     module = ""
@@ -409,6 +685,158 @@ def not_valid(ary, check_nan=True, check_shape=True, nan_kwargs=None, shape_kwar
     return nan_error | chain_error | draw_error
 
 
+class _QuantileSketch:
+    """Mergeable quantile sketch for many elements, fed with the same number of values each.
+
+    Deterministic merge and reduce sketch (Manku et al., 1998). Values are added to sorted
+    buffers of `size` items. Two buffers in the same level are merged and every other item
+    is kept, promoting a buffer with items of twice the weight to the next level. Every
+    element receives the same number of values, so all elements are compacted at the same
+    time with array operations.
+
+    Ranks returned by the sketch differ from the exact ones by at most
+    ``count * log2(count / size) / (2 * size)``, memory is
+    ``size * (log2(count / size) + 2)`` values per element.
+
+    Parameters
+    ----------
+    n_elements : int
+        Number of independent elements.
+    size : int, optional
+        Number of items per buffer.
+    """
+
+    def __init__(self, n_elements, size=1024):
+        self.size = size
+        self.count = 0
+        self._levels = []
+        self._offsets = []
+        self._buffer = np.empty((n_elements, 0))
+        self._summary = None
+
+    def update(self, values):
+        """Add values of shape ``(n_elements, n_values)`` to the sketch."""
+        values = np.concatenate((self._buffer, values), axis=1)
+        self.count += values.shape[1] - self._buffer.shape[1]
+        n_full = values.shape[1] // self.size
+        if n_full:
+            full = values[:, : n_full * self.size].reshape(len(values), n_full, self.size)
+            full = np.sort(full, axis=-1)
+            for i in range(n_full):
+                self._insert(full[:, i], 0)
+        self._buffer = values[:, n_full * self.size :]
+        self._summary = None
+        return self
+
+    def merge(self, other):
+        """Merge another sketch of the same elements and size into this one."""
+        for level, items in enumerate(other._levels):  # pylint: disable=protected-access
+            if items is not None:
+                self._insert(items, level)
+        self.count += other.count - other._buffer.shape[1]  # pylint: disable=protected-access
+        return self.update(other._buffer)  # pylint: disable=protected-access
+
+    def _insert(self, items, level):
+        while True:
+            if level == len(self._levels):
+                self._levels.append(None)
+                self._offsets.append(0)
+            if self._levels[level] is None:
+                self._levels[level] = items
+                return
+            # stable sort is a linear merge of the two sorted buffers
+            merged = np.sort(np.concatenate((self._levels[level], items), axis=1), kind="stable")
+            self._levels[level] = None
+            # alternate the items kept so rank errors of successive compactions cancel out
+            offset = self._offsets[level]
+            self._offsets[level] = 1 - offset
+            items = merged[:, offset::2]
+            level += 1
+
+    def _get_summary(self):
+        if self._summary is None:
+            items = [np.sort(self._buffer, axis=1)]
+            weights = [np.ones(self._buffer.shape[1])]
+            for level, level_items in enumerate(self._levels):
+                if level_items is not None:
+                    items.append(level_items)
+                    weights.append(np.full(self.size, 2.0 ** level))
+            items = np.concatenate(items, axis=1)
+            weights = np.concatenate(weights)
+            order = np.argsort(items, axis=1, kind="stable")
+            items = np.take_along_axis(items, order, axis=1)
+            cum_weights = np.cumsum(weights[order], axis=1)
+            cum_weights = np.concatenate((np.zeros((len(items), 1)), cum_weights), axis=1)
+            # items of every element are mapped to [4 * i, 4 * i + 1], so all the elements are
+            # searched at once in the flattened keys
+            low = np.nan_to_num(items[:, 0])
+            span = np.where(np.isnan(items), -np.inf, items).max(axis=1) - low
+            span = np.where(np.isfinite(span) & (span > 0), span, 1.0)
+            self._summary = items, cum_weights, low, span, _sketch_keys(items, low, span)
+        return self._summary
+
+    def ranks(self, values, assume_sorted=False):
+        """Approximate number of values smaller than and smaller or equal than `values`.
+
+        Parameters
+        ----------
+        values : np.ndarray
+            Array of shape ``(n_elements, n_values)``.
+        assume_sorted : bool, optional
+            Whether every row of `values` is already made of a few sorted runs. Values are
+            searched much faster when sorted, so otherwise they are sorted first.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Counts of values strictly smaller and smaller or equal, same shape as `values`.
+        """
+        _, cum_weights, low, span, keys = self._get_summary()
+        n_elements = len(keys)
+        queries = _sketch_keys(values, low, span)
+        order = None
+        if not assume_sorted:
+            order = np.argsort(queries, axis=1)
+            queries = np.take_along_axis(queries, order, axis=1)
+        keys, queries = keys.ravel(), queries.ravel()
+        position = np.searchsorted(keys, queries, side="left")
+        # only queries equal to an item have a different position on the right
+        tied = np.flatnonzero(keys[np.minimum(position, keys.size - 1)] == queries)
+        tied_position = np.searchsorted(keys, queries[tied], side="right")
+        # rows of the cumulative weights have one more item than the keys
+        position = position.reshape(values.shape)
+        position += np.arange(n_elements)[:, None]
+        cum_weights = cum_weights.ravel()
+        less = cum_weights[position]
+        less_equal = less.copy()
+        less_equal.ravel()[tied] = cum_weights[tied_position + tied // values.shape[1]]
+        if order is not None:
+            np.put_along_axis(less, order, less.copy(), axis=1)
+            np.put_along_axis(less_equal, order, less_equal.copy(), axis=1)
+        return less, less_equal
+
+    def quantile(self, prob):
+        """Approximate quantile `prob` of every element."""
+        items, cum_weights, *_ = self._get_summary()
+        idx = (cum_weights[:, 1:] < prob * self.count).sum(axis=1)
+        return items[np.arange(len(items)), np.minimum(idx, items.shape[1] - 1)]
+
+
+def _sketch_keys(values, low, span):
+    """Map the values of every element to disjoint intervals, keeping their order.
+
+    Values of element ``i`` between ``low[i]`` and ``low[i] + span[i]`` are mapped to
+    ``[4 * i, 4 * i + 1]``, the rest are clipped to ``[4 * i - 1, 4 * i + 2]``.
+    """
+    with np.errstate(invalid="ignore"):
+        keys = values - low[:, None]
+        keys /= span[:, None]
+    np.nan_to_num(keys, copy=False, nan=1.0, posinf=2.0, neginf=-1.0)
+    np.clip(keys, -1, 2, out=keys)
+    keys += 4.0 * np.arange(len(values))[:, None]
+    return keys
+
+
 def get_log_likelihood(idata, var_name=None):
     """Retrieve the log likelihood dataarray of a given variable."""
     if hasattr(idata, "sample_stats") and hasattr(idata.sample_stats, "log_likelihood"):
@@ -473,12 +901,19 @@ class ELPDData(pd.Series):  # pylint: disable=too-many-ancestors
             *self.values,
         )
 
+        if "subsample_size" in self:
+            base += (
+                f"\n\nEstimated from a subsample of {self.subsample_size} observations, "
+                f"subsampling SE {self[f'{kind}_subsampling_se']:.2f}"
+            )
+
         if self.warning:
             base += "\n\nThere has been a warning during the calculation. Please check the results."
 
         if kind == "loo" and "pareto_k" in self:
             bins = np.asarray([-np.Inf, 0.5, 0.7, 1, np.Inf])
-            counts, *_ = _histogram(self.pareto_k.values, bins)
+            pareto_k = np.asarray(self.pareto_k).flatten()
+            counts, *_ = _histogram(pareto_k[~np.isnan(pareto_k)], bins)
             extended = POINTWISE_LOO_FMT.format(max(4, len(str(np.max(counts)))))
             extended = extended.format(
                 "Count", "Pct.", *[*counts, *(counts / np.sum(counts) * 100)]
@@ -548,9 +983,40 @@ def _angle(samples, low, high, p_i=np.pi):
     return ang
 
 
+@conditional_jit(cache=True, nopython=True, fastmath=True)
+def _circular_batch_means(ary, batches, high=2 * np.pi, low=0):
+    """Compute the circular means of consecutive batches for every row of a 2d array.
+
+    Samples not fitting in ``batches`` batches of equal size are discarded. Results are
+    in the ``[low, high)`` range like :func:`scipy.stats.circmean`.
+    """
+    n_rows, n_samples = ary.shape
+    batch_size = n_samples // batches
+    scale = 2.0 * np.pi / (high - low)
+    means = np.empty((n_rows, batches))
+    for i in range(n_rows):
+        for j in range(batches):
+            sin_sum = 0.0
+            cos_sum = 0.0
+            for k in range(j * batch_size, (j + 1) * batch_size):
+                ang = ary[i, k] * scale
+                sin_sum += np.sin(ang)
+                cos_sum += np.cos(ang)
+            # rotating the mean angle is equivalent to rotating all the samples by `low`
+            mean = (np.arctan2(sin_sum, cos_sum) - low * scale) % (2.0 * np.pi)
+            means[i, j] = mean / scale + low
+    return means
+
+
 def _circular_standard_deviation(samples, high=2 * np.pi, low=0, skipna=False, axis=None):
-    ang = _circfunc(samples, high, low, skipna)
-    s_s = np.sin(ang).mean(axis=axis)
-    c_c = np.cos(ang).mean(axis=axis)
+    if axis is None:
+        ang = _circfunc(samples, high, low, skipna)
+        mean = np.mean
+    else:
+        # removing nans would flatten the samples, ignore them in the means instead
+        ang = _angle(np.asarray(samples), low, high, np.pi)
+        mean = np.nanmean if skipna else np.mean
+    s_s = mean(np.sin(ang), axis=axis)
+    c_c = mean(np.cos(ang), axis=axis)
     r_r = np.hypot(s_s, c_c)
     return ((high - low) / 2.0 / np.pi) * np.sqrt(-2 * np.log(r_r))
@@ -19,11 +19,13 @@ from arviz import (
     concat,
     convert_to_dataset,
     convert_to_inference_data,
+    ess,
     from_dict,
     from_json,
     from_netcdf,
     list_datasets,
     load_arviz_data,
+    loo,
     to_netcdf,
 )
 
@@ -792,6 +794,87 @@ class TestInferenceData:  # pylint: disable=too-many-public-methods
         with pytest.warns(UserWarning):
             idata.extend(idata2)
 
+    def test_diagnostics_cache(self):
+        idata = load_arviz_data("centered_eight")
+        cache = idata.diagnostics_cache
+        ess_mu = ess(idata, var_names=["mu"])
+        assert (len(cache), cache.hits, cache.misses) == (1, 0, 1)
+        ess_all = ess(idata)
+        assert (len(cache), cache.hits, cache.misses) == (3, 1, 3)
+        assert_identical(ess_mu.mu, ess_all.mu)
+        assert_identical(ess_all, ess(idata.posterior))
+
+    @pytest.mark.parametrize("method", ["sel", "map", "rename", "setattr", "delattr"])
+    def test_diagnostics_cache_invalidation(self, method):
+        idata = load_arviz_data("centered_eight")
+        ess(idata)
+        if method == "sel":
+            idata2 = idata.sel(draw=slice(100, None))
+            assert len(idata2.diagnostics_cache) == 0
+            idata.sel(draw=slice(100, None), inplace=True)
+        elif method == "map":
+            idata.map(lambda x: x + 1, groups="posterior", inplace=True)
+        elif method == "rename":
+            idata.rename({"mu": "mu2"}, inplace=True)
+        elif method == "setattr":
+            idata.posterior = idata.posterior.isel(draw=slice(100, None))
+        else:
+            del idata.posterior
+        assert len(idata.diagnostics_cache) == 0
+
+    def test_diagnostics_cache_netcdf(self, tmpdir):
+        idata = load_arviz_data("centered_eight")
+        ess_bulk = ess(idata)
+        ess_quantile = ess(idata, method="quantile", prob=[0.1, 0.9])
+        filepath = str(tmpdir.join("test_file.nc"))
+        idata.to_netcdf(filepath, diagnostics_cache=True)
+        idata2 = from_netcdf(filepath)
+        assert "diagnostics_cache" not in idata2.groups()
+        assert len(idata2.diagnostics_cache) == len(idata.diagnostics_cache)
+        assert_identical(ess(idata2), ess_bulk)
+        assert_identical(ess(idata2, method="quantile", prob=[0.1, 0.9]), ess_quantile)
+        assert idata2.diagnostics_cache.misses == 0
+        idata.to_netcdf(filepath)
+        assert len(from_netcdf(filepath).diagnostics_cache) == 0
+
+    @pytest.mark.parametrize(
+        "method", ["sel", "concat", "setattr_log_likelihood", "setattr_psis", "delattr"]
+    )
+    def test_psis_invalidation(self, method):
+        idata = load_arviz_data("centered_eight")
+        loo(idata, save_psis=True)
+        assert idata._psis is not None  # pylint: disable=protected-access
+        assert idata.groups().index("psis") == idata.groups().index("posterior_predictive") + 1
+        idata2 = deepcopy(idata)
+        assert idata2._psis is not None  # pylint: disable=protected-access
+        if method == "sel":
+            idata.sel(draw=slice(100, None), inplace=True)
+        elif method == "concat":
+            concat(idata, deepcopy(idata), dim="chain", inplace=True)
+        elif method == "setattr_log_likelihood":
+            idata.sample_stats = idata.sample_stats.copy()
+            idata.posterior = idata.posterior.copy()
+        elif method == "setattr_psis":
+            idata.psis = idata.psis.copy()
+        else:
+            del idata.posterior
+        assert idata._psis is None  # pylint: disable=protected-access
+        assert idata2._psis is not None  # pylint: disable=protected-access
+
+    def test_psis_netcdf(self, tmpdir):
+        idata = load_arviz_data("centered_eight")
+        loo(idata, save_psis="float32")
+        filepath = str(tmpdir.join("test_file.nc"))
+        idata.to_netcdf(filepath)
+        idata2 = from_netcdf(filepath)
+        assert idata2._psis is not None  # pylint: disable=protected-access
+        assert idata2.psis.log_weights.dtype == np.float32
+        assert_identical(idata2.psis.pareto_k, idata.psis.pareto_k)
+        idata.posterior = idata.posterior.copy()
+        filepath = str(tmpdir.join("test_file_invalid.nc"))
+        idata.to_netcdf(filepath)
+        assert "psis" not in from_netcdf(filepath).groups()
+
 
 class TestNumpyToDataArray:
     def test_1d_dataset(self):
@@ -1,18 +1,23 @@
 """Test Diagnostic methods"""
 # pylint: disable=redefined-outer-name, no-member, too-many-public-methods
 import os
+import time
+import tracemalloc
 
 import numpy as np
 import pandas as pd
 import pytest
+import xarray as xr
 from numpy.testing import assert_almost_equal
 
 from ...data import from_cmdstan, load_arviz_data
 from ...plots.plot_utils import xarray_var_iter
 from ...rcparams import rc_context, rcParams
-from ...stats import bfmi, ess, geweke, mcse, rhat
+from ...stats import StreamingDiagnostics, bfmi, ess, ess_evolution, geweke, mcse, rhat
+from ...stats import diagnostics
 from ...stats.diagnostics import (
     _ess,
+    _ess_autocov,
     _ess_quantile,
     _mc_error,
     _mcse_quantile,
@@ -23,6 +28,7 @@ from ...stats.diagnostics import (
     _z_scale,
     ks_summary,
 )
+from ...stats.stats_utils import autocov
 
 # For tests only, recommended value should be closer to 1.01-1.05
 # See discussion in https://github.com/stan-dev/rstan/pull/618
@@ -324,6 +330,45 @@ class TestDiagnostics:
         with pytest.raises(ValueError):
             ess(np.random.randn(4, 100), method="local", prob=[0.1, 0.2, 0.9], relative=relative)
 
+    @pytest.mark.parametrize("method", ("quantile", "local"))
+    @pytest.mark.parametrize("relative", (True, False))
+    def test_effective_sample_size_multiple_probs(self, data, method, relative):
+        probs = np.linspace(0.1, 0.8, 5)
+        if method == "local":
+            probs = np.stack((probs, probs + 0.1), axis=-1)
+        ess_hat = ess(data, var_names=["mu", "theta"], method=method, prob=probs, relative=relative)
+        assert ess_hat["theta"].dims[-1] == "prob"
+        for i, prob in enumerate(probs):
+            ess_prob = ess(
+                data, var_names=["mu", "theta"], method=method, prob=prob, relative=relative
+            )
+            for var_name in ("mu", "theta"):
+                assert np.allclose(ess_hat[var_name].isel(prob=i), ess_prob[var_name])
+
+    @pytest.mark.parametrize("relative", (True, False))
+    def test_ess_evolution(self, data, relative):
+        ess_hat = ess_evolution(data, var_names=["mu", "theta"], n_points=7, relative=relative)
+        assert ess_hat["theta"].dims[-2:] == ("ess_method", "draw_prefix")
+        for n_draw in ess_hat["draw_prefix"].values:
+            draws = data.isel(draw=slice(n_draw))
+            for method in ("bulk", "tail"):
+                ess_prefix = ess(draws, var_names=["mu", "theta"], method=method, relative=relative)
+                for var_name in ("mu", "theta"):
+                    assert np.allclose(
+                        ess_hat[var_name].sel(ess_method=method, draw_prefix=n_draw),
+                        ess_prefix[var_name],
+                    )
+
+    def test_ess_evolution_array(self):
+        ary = np.random.randn(4, 101)
+        ary[1, 60] = np.nan
+        ess_hat = ess_evolution(ary, n_points=10)
+        assert ess_hat.shape == (2, 10)
+        assert not np.isnan(ess_hat[:, :5]).any()
+        assert np.isnan(ess_hat[:, 6:]).all()
+        assert np.allclose(ess_hat[0, 4], ess(ary[:, :50], method="bulk"))
+        assert np.allclose(ess_hat[1, 4], ess(ary[:, :50], method="tail"))
+
     def test_effective_sample_size_constant(self):
         assert ess(np.ones((4, 100))) == 400
 
@@ -365,6 +410,95 @@ class TestDiagnostics:
             ess_hat = ess(data, var_names=var_names, method=method, relative=relative)
         assert np.all(ess_hat.mu.values > n_low)  # This might break if the data is regenerated
 
+    @pytest.mark.parametrize(
+        "method",
+        (
+            "bulk",
+            "tail",
+            "quantile",
+            "local",
+            "mean",
+            "sd",
+            "median",
+            "mad",
+            "z_scale",
+            "folded",
+            "identity",
+        ),
+    )
+    @pytest.mark.parametrize("relative", (True, False))
+    def test_effective_sample_size_batched(self, data, method, relative):
+        theta = data["theta"].copy()
+        theta[..., 0] = 1.0
+        theta[0, 0, 1] = np.nan
+        if method in ("quantile", "tail"):
+            prob = 0.34
+        elif method == "local":
+            prob = (0.2, 0.3)
+        else:
+            prob = None
+        ess_hat = ess(theta.to_dataset(), method=method, prob=prob, relative=relative)["theta"]
+        for i, school in enumerate(theta.transpose("school", "chain", "draw").values):
+            assert_almost_equal(
+                ess_hat[i], ess(school, method=method, prob=prob, relative=relative), decimal=8
+            )
+
+    @pytest.mark.parametrize("scale", (0.01, 0.5, 1))
+    def test_effective_sample_size_truncated_lags(self, scale):
+        """Test lags computed in growing blocks give the same ess as using all lags."""
+        ary = np.random.randn(4, 3, 2000)
+        ary = np.cumsum(ary * scale, axis=-1) + ary
+        acov = np.stack([[autocov(chain) for chain in element] for element in ary])
+        ess_hat, stopped = _ess_autocov(acov, ary.mean(axis=-1), 2000)
+        assert stopped.all()
+        assert np.allclose(_ess(ary), ess_hat)
+
+    def test_rank_approx(self, data, tmp_path, monkeypatch):
+        """Test approximate rank methods reading lazily loaded data in chunks."""
+        monkeypatch.setattr(diagnostics, "_RANK_APPROX_SKETCH_SIZE", 64)
+        monkeypatch.setattr(diagnostics, "_RANK_APPROX_CHUNK_SIZE", 1000)
+        filepath = tmp_path / "posterior.nc"
+        data.to_netcdf(filepath)
+        with xr.open_dataset(filepath) as lazy_data:
+            rhat_approx = rhat(lazy_data, method="rank_approx")
+            ess_approx = ess(lazy_data, method="rank_approx", relative=True)
+        rhat_exact = rhat(data, method="rank")
+        ess_exact = ess(data, method="bulk", relative=True)
+        for var_name in data.data_vars:
+            assert rhat_approx[var_name].dims == rhat_exact[var_name].dims
+            assert np.allclose(rhat_approx[var_name], rhat_exact[var_name], atol=0.01)
+            assert np.allclose(ess_approx[var_name], ess_exact[var_name], rtol=0.1)
+        ary = data["mu"].values.copy()
+        assert np.isclose(rhat(ary, method="rank_approx"), rhat_exact["mu"], atol=0.01)
+        ary[0, 0] = np.nan
+        assert np.isnan(ess(ary, method="rank_approx"))
+
+    def test_rank_approx_memory_and_runtime(self, monkeypatch):
+        """Test approximate rank methods use bounded memory and run about as fast as exact ones."""
+        dataset = xr.Dataset(
+            {"x": (("chain", "draw", "dim"), np.random.default_rng(0).normal(size=(4, 4000, 200)))}
+        )
+        start = time.perf_counter()
+        rhat(dataset, method="rank")
+        ess(dataset, method="bulk")
+        exact_time = time.perf_counter() - start
+        start = time.perf_counter()
+        rhat(dataset, method="rank_approx")
+        ess(dataset, method="rank_approx")
+        assert time.perf_counter() - start < 3 * exact_time
+
+        chunk_size = 2 ** 14
+        monkeypatch.setattr(diagnostics, "_RANK_APPROX_CHUNK_SIZE", chunk_size)
+        for func in (rhat, ess):
+            tracemalloc.start()
+            try:
+                func(dataset, method="rank_approx")
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            # memory depends on the chunk size, the data holds 200 chunks
+            assert peak < 32 * chunk_size * 8
+
     @pytest.mark.parametrize("mcse_method", ("mean", "sd", "median", "quantile"))
     def test_mcse_array(self, mcse_method):
         if mcse_method == "quantile":
@@ -386,6 +520,16 @@ class TestDiagnostics:
             mcse_hat = mcse(data, var_names=var_names, method=mcse_method)
         assert mcse_hat  # This might break if the data is regenerated
 
+    def test_mcse_multiple_probs(self, data):
+        probs = np.linspace(0.1, 0.9, 5)
+        mcse_hat = mcse(data, var_names=["mu", "theta"], method="quantile", prob=probs)
+        assert np.allclose(mcse_hat["prob"], probs)
+        for prob in probs:
+            mcse_prob = mcse(data, var_names=["mu", "theta"], method="quantile", prob=prob)
+            for var_name in ("mu", "theta"):
+                assert np.allclose(mcse_hat[var_name].sel(prob=prob), mcse_prob[var_name])
+        assert mcse(np.random.randn(4, 100), method="quantile", prob=probs).shape == (5,)
+
     @pytest.mark.parametrize("mcse_method", ("mean", "sd", "median", "quantile"))
     @pytest.mark.parametrize("chain", (None, 1, 2))
     @pytest.mark.parametrize("draw", (1, 2, 3, 4))
@@ -476,6 +620,70 @@ class TestDiagnostics:
             else:
                 assert round(rhat_hat, 3) == round(rhat_hat_, 3)
 
+    @pytest.mark.parametrize("draws", (100, 101))
+    def test_multichain_summary_batched(self, draws):
+        """Test multichain statistics of several elements against individual functions."""
+        ary = np.round(np.random.randn(5, 3, draws), 1)
+        ary[1] = 2.0
+        ary[2, 0, 3] = np.nan
+        statistics = _multichain_statistics(ary)
+        assert np.isnan([stat[2] for stat in statistics]).all()
+        for i, ary_i in enumerate(ary):
+            if i == 2:
+                continue
+            ary_folded = np.abs(ary_i - np.median(ary_i))
+            expected = (
+                mcse(ary_i, method="mean"),
+                mcse(ary_i, method="sd"),
+                ess(ary_i, method="mean"),
+                ess(ary_i, method="sd"),
+                ess(ary_i, method="bulk"),
+                ess(ary_i, method="tail"),
+                max(
+                    _rhat(_z_scale(_split_chains(ary_i))),
+                    _rhat(_z_scale(_split_chains(ary_folded))),
+                ),
+            )
+            assert_almost_equal([stat[i] for stat in statistics], expected)
+
+    @pytest.mark.parametrize("blocks", ([500], [1, 3, 96, 250, 150], [250, 250]))
+    @pytest.mark.parametrize("by_chain", (True, False))
+    def test_streaming_diagnostics(self, data, blocks, by_chain):
+        theta = data["theta"].values
+        streaming = StreamingDiagnostics(chains=4, shape=(8,), max_lag=100)
+        start = 0
+        for block in blocks:
+            if by_chain:
+                for chain in range(4):
+                    streaming.update(theta[chain, start : start + block], chain=chain)
+            else:
+                streaming.update(theta[:, start : start + block])
+            start += block
+        assert (streaming.draws == 500).all()
+        theta = np.moveaxis(theta, -1, 0)
+        ess_hat = np.array([ess(ary, method="identity") for ary in theta])
+        rhat_hat = np.array([rhat(ary, method="identity") for ary in theta])
+        mcse_hat = np.std(theta, axis=(1, 2), ddof=1) / np.sqrt(ess_hat)
+        assert np.allclose(streaming.ess(), ess_hat, rtol=1e-8)
+        assert np.allclose(streaming.ess(relative=True), ess_hat / 2000, rtol=1e-8)
+        assert np.allclose(streaming.rhat(), rhat_hat, rtol=1e-8)
+        assert np.allclose(streaming.mcse(), mcse_hat, rtol=1e-8)
+
+    def test_streaming_diagnostics_invalid(self):
+        streaming = StreamingDiagnostics(chains=2)
+        streaming.update(np.random.randn(2, 3))
+        assert np.isnan(streaming.ess())
+        assert np.isnan(streaming.rhat())
+        streaming.update(np.ones(10), chain=0)
+        with pytest.raises(ValueError):
+            streaming.ess()
+        with pytest.raises(ValueError):
+            streaming.update(np.ones((3, 10)))
+        streaming = StreamingDiagnostics(chains=1)
+        streaming.update(np.ones((1, 10)))
+        assert streaming.ess() == 10
+        assert np.isnan(streaming.rhat())
+
     def test_geweke(self):
         first = 0.1
         last = 0.5
@@ -520,6 +728,17 @@ class TestDiagnostics:
         x = np.random.randn(size, ndim).squeeze()  # pylint: disable=no-member
         assert _mc_error(x, batches=batches, circular=circular) is not None
 
+    @pytest.mark.parametrize("batches", [1, 5])
+    @pytest.mark.parametrize("circular", [False, True])
+    def test_mc_error_vectorized(self, batches, circular):
+        x = np.random.uniform(-np.pi, np.pi, size=(3, 4, 101))
+        expected = np.array(
+            [_mc_error(x_i, batches=batches, circular=circular) for x_i in x.reshape(-1, 101)]
+        )
+        result = _mc_error(x, batches=batches, circular=circular, axis=-1)
+        assert result.shape == (3, 4)
+        assert np.allclose(result.ravel(), expected)
+
     @pytest.mark.parametrize("size", [100, 101])
     @pytest.mark.parametrize("ndim", [1, 2, 3])
     def test_mc_error_nan(self, size, ndim):
@@ -1141,11 +1141,14 @@ def test_plot_elpd_one_model(models):
         {"color": np.random.uniform(size=(8, 3)), "show_bins": True, "annotate": True},
     ],
 )
-@pytest.mark.parametrize("input_type", ["elpd_data", "data_array", "array"])
+@pytest.mark.parametrize("input_type", ["elpd_data", "data_array", "array", "inference_data"])
 def test_plot_khat(models, input_type, kwargs):
     khats_data = loo(models.model_1, pointwise=True)
 
-    if input_type == "data_array":
+    if input_type == "inference_data":
+        khats_data = deepcopy(models.model_1)
+        loo(khats_data, save_psis=True)
+    elif input_type == "data_array":
         khats_data = khats_data.pareto_k
     elif input_type == "array":
         khats_data = khats_data.pareto_k.values
@@ -1196,6 +1199,8 @@ def test_plot_khat_annotate():
 def test_plot_khat_bad_input(models):
     with pytest.raises(ValueError):
         plot_khat(models.model_1.sample_stats)
+    with pytest.raises(ValueError):
+        plot_khat(models.model_2)
 
 
 @pytest.mark.parametrize(
@@ -3,10 +3,16 @@ from copy import deepcopy
 
 import numpy as np
 import pytest
-from numpy.testing import assert_allclose, assert_array_almost_equal, assert_array_equal
+from numpy.testing import (
+    assert_allclose,
+    assert_almost_equal,
+    assert_array_almost_equal,
+    assert_array_equal,
+)
 from scipy.stats import linregress
-from xarray import DataArray, Dataset
+from xarray import DataArray, Dataset, open_dataset
 
+from ... import _log
 from ...data import concat, convert_to_inference_data, from_dict, load_arviz_data
 from ...rcparams import rcParams
 from ...stats import (
@@ -16,12 +22,14 @@ from ...stats import (
     hdi,
     loo,
     loo_pit,
+    loo_subsample,
     psislw,
     r2_score,
     summary,
     waic,
 )
-from ...stats.stats import _gpinv
+from ...stats import stats as stats_module
+from ...stats.stats import _gpinv, _hdi_multimodal_element, _stacking_weights
 from ...stats.stats_utils import get_log_likelihood
 from ..helpers import check_multiple_attrs, multidim_models  # pylint: disable=unused-import
 
@@ -120,6 +128,40 @@ def test_hdi_skipna():
     assert_array_almost_equal(interval, interval_)
 
 
+@pytest.mark.parametrize("circular", [True, False])
+@pytest.mark.parametrize("skipna", [True, False])
+@pytest.mark.parametrize("hdi_prob", [0.3, 0.94])
+def test_hdi_vectorized(circular, skipna, hdi_prob):
+    ary = np.random.vonmises(0, 1, size=(4, 100, 6))
+    ary[:, :10, 1] = np.nan
+    ary[0, 0, 2] = np.nan
+    ary[..., 3] = np.nan
+    result = hdi(
+        from_dict({"x": ary}), hdi_prob=hdi_prob, circular=circular, skipna=skipna
+    ).x.values
+    for i in range(ary.shape[-1]):
+        values = ary[..., i].flatten()
+        if skipna and not np.isnan(values).all():
+            values = values[~np.isnan(values)]
+        expected = hdi(values, hdi_prob=hdi_prob, circular=circular)
+        assert_array_equal(result[i], expected)
+
+
+@pytest.mark.parametrize("hdi_prob", [0.5, 0.94])
+def test_hdi_multimodal_vectorized(hdi_prob):
+    ary = np.concatenate(
+        (np.random.normal(-4, 1, (2, 400, 5)), np.random.normal(2, 0.5, (2, 400, 5))), axis=1
+    )
+    ary[..., 1] = np.random.gamma(2, size=(2, 800))
+    ary[0, :10, 2] = np.nan
+    ary[..., 3] = np.nan
+    ary[..., 4] = 1
+    result = hdi(from_dict({"x": ary}), hdi_prob=hdi_prob, multimodal=True, max_modes=4)
+    for i in range(ary.shape[-1]):
+        expected = _hdi_multimodal_element(ary[..., i], hdi_prob, skipna=False, max_modes=4)
+        assert_allclose(result.x.values[i], expected[: result.sizes["mode"]])
+
+
 def test_r2_score():
     x = np.linspace(0, 1, 100)
     y = np.random.normal(x, 1)
@@ -149,6 +191,30 @@ def test_compare_same(centered_eight, multidim_models, method, multidim):
     assert_allclose(np.sum(weight), 1.0)
 
 
+@pytest.mark.parametrize("scale_value", [1, -2])
+def test_stacking_weights(scale_value):
+    ic_i_val = np.random.normal(-1, 0.5, size=(200, 1)) + np.random.normal(0, 0.3, size=(200, 2))
+    weights = _stacking_weights(scale_value * ic_i_val, scale_value)
+    assert_allclose(weights.sum(), 1)
+    assert np.all(weights >= 0)
+    # the optimum over a grid of the 2 model simplex is not better than the stacking weights
+    grid = np.linspace(0, 1, 101)
+    log_scores = np.log(np.exp(ic_i_val) @ np.stack((grid, 1 - grid))).sum(axis=0)
+    assert np.log(np.exp(ic_i_val) @ weights).sum() >= log_scores.max() - 1e-8
+
+
+def test_stacking_weights_dominated():
+    rng = np.random.default_rng(1)
+    ic_i_val = rng.normal(-1, 0.5, size=(100, 1)) + rng.normal(0, 0.3, size=(100, 2))
+    weights = _stacking_weights(np.column_stack((ic_i_val[:, 0], ic_i_val[:, 0] - 1)), 1)
+    assert_array_equal(weights, [1, 0])
+    # the dominated model gets a zero weight while the other two are mixed
+    weights = _stacking_weights(np.column_stack((ic_i_val, ic_i_val[:, 0] - 2)), 1)
+    assert weights[2] == 0
+    assert np.all(weights[:2] > 0.1)
+    assert_allclose(weights.sum(), 1)
+
+
 def test_compare_unknown_ic_and_method(centered_eight, non_centered_eight):
     model_dict = {"centered": centered_eight, "non_centered": non_centered_eight}
     with pytest.raises(NotImplementedError):
@@ -198,6 +264,18 @@ def test_summary_ndarray():
     assert summary_df.shape
 
 
+def test_summary_single_chain(caplog):
+    # the arviz logger does not propagate to the root logger caplog listens to
+    _log.addHandler(caplog.handler)
+    try:
+        summary_df = summary(np.random.randn(1, 100, 2))
+    finally:
+        _log.removeHandler(caplog.handler)
+    assert summary_df["r_hat"].isna().all()
+    assert "Shape validation failed" in caplog.text
+    assert "minimum_shape: (chains=2, draws=4)" in caplog.text
+
+
 @pytest.mark.parametrize("var_names_expected", ((None, 10), ("mu", 1), (["mu", "tau"], 2)))
 def test_summary_var_names(centered_eight, var_names_expected):
     var_names, expected = var_names_expected
@@ -297,6 +375,28 @@ def test_summary_index_origin(origin):
         assert col == "a[{}]".format(i + origin)
 
 
+@pytest.mark.parametrize("order", ["C", "F"])
+def test_summary_stats_sorted(order):
+    data = from_dict({"a": np.random.randn(4, 100, 3, 2), "b": np.random.randn(4, 100)})
+    data.posterior["a"][:, :, 1, 0] = 1.0
+    data.posterior["a"][0, 0, 2, 1] = np.nan
+    summary_xarray = summary(data, kind="stats", fmt="xarray", hdi_prob=0.9, round_to="none")
+    summary_wide = summary(data, kind="stats", order=order, hdi_prob=0.9, round_to="none")
+    hdi_data = hdi(data, hdi_prob=0.9)
+    for var_name in ("a", "b"):
+        metrics = summary_xarray[var_name]
+        posterior = data.posterior[var_name]
+        assert_allclose(metrics.sel(metric="mean"), posterior.mean(("chain", "draw"), skipna=False))
+        assert_allclose(
+            metrics.sel(metric="sd"), posterior.std(("chain", "draw"), ddof=1, skipna=False)
+        )
+        assert_array_equal(metrics.sel(metric="hdi_5%"), hdi_data[var_name].sel(hdi="lower"))
+        assert_array_equal(metrics.sel(metric="hdi_95%"), hdi_data[var_name].sel(hdi="higher"))
+    values = summary_xarray["a"].values.reshape(4, -1, order=order).T
+    assert_array_equal(summary_wide.iloc[:-1].values, values)
+    assert_array_equal(summary_wide.loc["b"].values, summary_xarray["b"].values)
+
+
 @pytest.mark.parametrize(
     "stat_funcs", [[np.var], {"var": np.var, "var2": lambda x: np.var(x) ** 2}]
 )
@@ -466,6 +566,137 @@ def test_loo_print(centered_eight, scale):
     assert len(loo_data) < len(loo_pointwise)
 
 
+@pytest.mark.parametrize("ic_func", [loo, waic])
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+@pytest.mark.parametrize("multidim", [True, False])
+def test_ic_chunked(centered_eight, multidim_models, ic_func, chunk_size, multidim):
+    data = multidim_models.model_1 if multidim else centered_eight
+    ic_name = ic_func.__name__
+    expected = ic_func(data, pointwise=True)
+    result = ic_func(data, pointwise=True, chunk_size=chunk_size)
+    for key in (ic_name, f"{ic_name}_se", f"p_{ic_name}", "n_data_points", "warning"):
+        assert_almost_equal(result[key], expected[key])
+    assert_array_almost_equal(result[f"{ic_name}_i"], expected[f"{ic_name}_i"])
+    assert result[f"{ic_name}_i"].dims == expected[f"{ic_name}_i"].dims
+    if ic_func is loo:
+        assert_array_almost_equal(result["pareto_k"], expected["pareto_k"])
+
+
+@pytest.mark.parametrize("ic_func", [loo, waic])
+def test_ic_pointwise_file(centered_eight, tmp_path, ic_func):
+    ic_name = ic_func.__name__
+    filepath = tmp_path / f"{ic_name}_pointwise.nc"
+    ic_data = ic_func(centered_eight, pointwise=True, chunk_size=2, pointwise_file=filepath)
+    with open_dataset(filepath) as pointwise_ds:
+        assert_array_almost_equal(pointwise_ds[f"{ic_name}_i"], ic_data[f"{ic_name}_i"])
+        if ic_func is loo:
+            assert_array_almost_equal(pointwise_ds["pareto_k"], ic_data["pareto_k"])
+
+
+@pytest.mark.parametrize("chunk_size", [None, 3])
+def test_loo_save_psis(chunk_size):
+    idata = load_arviz_data("centered_eight")
+    expected = loo(idata, pointwise=True)
+    expected_pit = loo_pit(idata, y="obs")
+    loo(idata, save_psis=True, chunk_size=chunk_size)
+    assert "psis" in idata.groups()
+    assert idata.psis.log_weights.dims == get_log_likelihood(idata).dims
+    assert_allclose(idata.psis.pareto_k, expected.pareto_k)
+    result = loo(idata, pointwise=True, chunk_size=chunk_size)
+    assert_allclose(result.loo_i, expected.loo_i)
+    assert_allclose(result.p_loo, expected.p_loo)
+    assert_allclose(loo_pit(idata, y="obs"), expected_pit)
+    # a different reff does not use the stored psis results
+    result = loo(idata, pointwise=True, reff=0.5)
+    expected = loo(load_arviz_data("centered_eight"), pointwise=True, reff=0.5)
+    assert_allclose(result.pareto_k, expected.pareto_k)
+
+
+def test_loo_save_psis_bad_input(centered_eight):
+    with pytest.raises(TypeError):
+        loo(centered_eight.sample_stats, save_psis=True)
+
+
+@pytest.mark.parametrize("scale", ["log", "negative_log", "deviance"])
+@pytest.mark.parametrize("multidim", [True, False])
+def test_loo_subsample_all_observations(centered_eight, multidim_models, scale, multidim):
+    data = multidim_models.model_1 if multidim else centered_eight
+    loo_data = loo(data, pointwise=True, scale=scale)
+    loo_sub = loo_subsample(
+        data, observations=np.arange(loo_data.n_data_points), pointwise=True, scale=scale
+    )
+    for key in ("loo", "loo_se", "p_loo", "loo_i", "pareto_k"):
+        assert_allclose(loo_sub[key], loo_data[key])
+    assert_allclose(loo_sub.loo_subsampling_se, 0, atol=1e-10)
+    assert loo_sub.loo_i.dims == loo_data.loo_i.dims
+
+
+@pytest.mark.parametrize("estimator", ["diff_srs", "hh_pps"])
+def test_loo_subsample(multidim_models, estimator):
+    data = multidim_models.model_1
+    loo_data = loo(data, pointwise=True)
+    loo_sub = loo_subsample(data, observations=6, estimator=estimator, seed=3, pointwise=True)
+    assert loo_sub.subsample_size == 6
+    assert loo_sub.loo_subsampling_se > 0
+    observations = np.unique(loo_sub.subsample_observations)
+    assert_allclose(
+        loo_sub.loo_i.values.flatten()[observations], loo_data.loo_i.values.flatten()[observations]
+    )
+    assert np.isnan(loo_sub.pareto_k.values).sum() == loo_data.n_data_points - len(observations)
+    assert "subsample" in str(loo_sub)
+
+
+def test_loo_subsample_approximation(centered_eight):
+    approximation = get_log_likelihood(centered_eight).mean(("chain", "draw"))
+    loo_sub = loo_subsample(centered_eight, observations=4, loo_approximation=approximation)
+    assert np.isfinite(loo_sub.loo)
+    with pytest.raises(ValueError):
+        loo_subsample(centered_eight, loo_approximation=np.zeros(3))
+    with pytest.raises(ValueError):
+        loo_subsample(centered_eight, loo_approximation="plpd")
+    with pytest.raises(ValueError):
+        loo_subsample(centered_eight, estimator="unknown")
+
+
+def test_loo_subsample_negative_variance(centered_eight):
+    with pytest.warns(UserWarning, match="variance of the loo values is negative"):
+        loo_sub = loo_subsample(centered_eight, observations=5, estimator="hh_pps", seed=2)
+    assert np.isnan(loo_sub.loo_se)
+
+
+def test_compare_loo_subsample(centered_eight, non_centered_eight):
+    model_dict = {"centered": centered_eight, "non_centered": non_centered_eight}
+    observations = np.arange(8)
+    elpd_dict = {
+        name: loo_subsample(data, observations=observations, pointwise=True)
+        for name, data in model_dict.items()
+    }
+    comparison = compare(model_dict)
+    comparison_sub = compare(elpd_dict)
+    for column in ("loo", "d_loo", "weight", "se", "dse"):
+        assert_allclose(
+            comparison_sub[column].values.astype(float), comparison[column].values.astype(float)
+        )
+    with pytest.raises(ValueError):
+        compare(elpd_dict, scale="deviance")
+
+
+@pytest.mark.parametrize("ic", ["loo", "waic"])
+def test_compare_n_jobs(centered_eight, non_centered_eight, tmp_path, ic):
+    model_dict = {"centered": centered_eight, "non_centered": non_centered_eight}
+    comparison = compare(model_dict, ic=ic)
+    path_dict = {}
+    for name, data in model_dict.items():
+        path_dict[name] = str(tmp_path / f"{name}.nc")
+        data.to_netcdf(path_dict[name])
+    comparison_parallel = compare(path_dict, ic=ic, n_jobs=2, ic_kwargs={"chunk_size": 3})
+    for column in (ic, "d_" + ic, "weight", "se", "dse"):
+        assert_allclose(
+            comparison_parallel[column].values.astype(float),
+            comparison[column].values.astype(float),
+        )
+
+
 def test_psislw(centered_eight):
     pareto_k = loo(centered_eight, pointwise=True, reff=0.7)["pareto_k"]
     log_likelihood = get_log_likelihood(centered_eight)
@@ -473,6 +704,22 @@ def test_psislw(centered_eight):
     assert_allclose(pareto_k, psislw(-log_likelihood, 0.7)[1])
 
 
+def test_psislw_vectorized():
+    log_weights = np.random.standard_t(3, size=(6, 1000))
+    # tails of different lengths: ties at the cutoff, below cutoffmin and too short for gpdfit
+    log_weights[1, np.argsort(log_weights[1])[-150:-100]] = np.sort(log_weights[1])[-150]
+    log_weights[2, :990] = -800
+    log_weights[3, 3:] = log_weights[3, 0]
+    log_weights_copy = log_weights.copy()
+    smoothed_log_weights, pareto_k = psislw(log_weights)
+    assert_array_equal(log_weights, log_weights_copy)
+    assert np.isinf(pareto_k[3])
+    for i, row in enumerate(log_weights):
+        smoothed_row, pareto_k_row = psislw(row)
+        assert_allclose(smoothed_log_weights[i], smoothed_row)
+        assert_allclose(pareto_k[i], pareto_k_row)
+
+
 @pytest.mark.parametrize("probs", [True, False])
 @pytest.mark.parametrize("kappa", [-1, -0.5, 1e-30, 0.5, 1])
 @pytest.mark.parametrize("sigma", [0, 2])
@@ -637,6 +884,34 @@ def test_loo_pit_bad_input_shape(incompatibility):
             loo_pit(y=y, y_hat=y_hat[:, :100], log_weights=log_weights)
 
 
+@pytest.mark.parametrize("block_size", [None, 1000])
+def test_loo_pit_vectorized(monkeypatch, block_size):
+    if block_size is not None:
+        monkeypatch.setattr(stats_module, "_LOO_PIT_BLOCK_SIZE", block_size)
+    y = np.random.normal(size=(10, 8))
+    y[0, :3] = [-10, 10, 0]
+    y_hat = np.random.normal(size=(10, 8, 200))
+    y_hat[0, 2] = 0
+    log_weights = np.random.normal(size=(10, 8, 200))
+    log_weights -= np.log(np.exp(log_weights).sum(axis=-1, keepdims=True))
+    expected = np.minimum((np.exp(log_weights) * (y_hat <= y[..., None])).sum(axis=-1), 1)
+    assert_allclose(loo_pit(y=y, y_hat=y_hat, log_weights=log_weights), expected)
+
+
+def test_loo_pit_randomized():
+    y = np.random.poisson(3, size=50).astype(float)
+    y_hat = np.random.poisson(3, size=(50, 400)).astype(float)
+    log_weights = np.full((50, 400), -np.log(400))
+    lower = (y_hat < y[:, None]).mean(axis=-1)
+    upper = (y_hat <= y[:, None]).mean(axis=-1)
+    result = loo_pit(y=y, y_hat=y_hat, log_weights=log_weights, randomized=True, seed=3)
+    assert np.all((result >= lower - 1e-12) & (result <= upper + 1e-12))
+    assert np.any(result != upper)
+    assert_array_equal(
+        result, loo_pit(y=y, y_hat=y_hat, log_weights=log_weights, randomized=True, seed=3)
+    )
+
+
 @pytest.mark.parametrize("pointwise", [True, False])
 @pytest.mark.parametrize("inplace", [True, False])
 @pytest.mark.parametrize(
@@ -0,0 +1,93 @@
+# pylint: disable=redefined-outer-name, no-member
+import importlib
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from ...data import load_arviz_data
+from ...rcparams import rcParams
+from ...stats import ess, hdi, loo, loo_pit, mcse, psislw, rhat, summary, waic
+from ...stats.stats_utils import is_dask_backed
+from ..helpers import running_on_ci
+
+pytestmark = pytest.mark.skipif(  # pylint: disable=invalid-name
+    (importlib.util.find_spec("dask") is None) and not running_on_ci(),
+    reason="test requires dask which is not installed",
+)
+
+rcParams["data.load"] = "eager"
+
+
+@pytest.fixture(scope="module")
+def eager_data():
+    return load_arviz_data("centered_eight")
+
+
+@pytest.fixture(scope="module")
+def dask_data():
+    idata = load_arviz_data("centered_eight")
+    for group in idata._groups:  # pylint: disable=protected-access
+        dataset = getattr(idata, group)
+        chunks = {dim: size for dim, size in (("school", 3), ("draw", 200)) if dim in dataset.dims}
+        setattr(idata, group, dataset.chunk(chunks))
+    return idata
+
+
+@pytest.mark.parametrize(
+    "func, kwargs",
+    [
+        (ess, {}),
+        (ess, {"method": "tail"}),
+        (rhat, {}),
+        (mcse, {"method": "sd"}),
+        (hdi, {}),
+        (hdi, {"circular": True}),
+        (hdi, {"multimodal": True}),
+    ],
+)
+def test_dask_dataset_output(eager_data, dask_data, func, kwargs):
+    result = func(dask_data, **kwargs)
+    assert is_dask_backed(result)
+    expected = func(eager_data, **kwargs)
+    xr.testing.assert_allclose(result.compute(), expected)
+
+
+def test_dask_psislw(eager_data, dask_data):
+    log_likelihood = -dask_data.sample_stats.log_likelihood.stack(sample=("chain", "draw"))
+    log_weights, pareto_shape = psislw(log_likelihood, reff=0.7)
+    assert is_dask_backed(log_weights)
+    assert is_dask_backed(pareto_shape)
+    log_likelihood = -eager_data.sample_stats.log_likelihood.stack(sample=("chain", "draw"))
+    expected_log_weights, expected_pareto_shape = psislw(log_likelihood, reff=0.7)
+    assert np.allclose(log_weights.values, expected_log_weights.values)
+    assert np.allclose(pareto_shape.values, expected_pareto_shape.values)
+
+
+@pytest.mark.parametrize("ic", [loo, waic])
+def test_dask_information_criterion(eager_data, dask_data, ic):
+    result = ic(dask_data, pointwise=True)
+    expected = ic(eager_data, pointwise=True)
+    for key in expected.index:
+        if isinstance(expected[key], str):
+            assert result[key] == expected[key]
+        else:
+            assert np.allclose(result[key], expected[key])
+
+
+def test_dask_loo_pit(eager_data, dask_data):
+    result = loo_pit(dask_data, y="obs")
+    assert is_dask_backed(result)
+    assert np.allclose(result.values, loo_pit(eager_data, y="obs"))
+
+
+@pytest.mark.parametrize("fmt", ["wide", "xarray"])
+def test_dask_summary(eager_data, dask_data, fmt):
+    kwargs = {"fmt": fmt, "circ_var_names": ["mu"], "stat_funcs": {"median": np.median}}
+    result = summary(dask_data, **kwargs)
+    expected = summary(eager_data, **kwargs)
+    if fmt == "xarray":
+        assert is_dask_backed(result)
+        xr.testing.assert_allclose(result.compute(), expected)
+    else:
+        assert result.equals(expected)
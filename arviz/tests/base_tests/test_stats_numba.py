@@ -4,8 +4,10 @@ import importlib
 import numpy as np
 import pytest
 
+from ...data import load_arviz_data
 from ...rcparams import rcParams
-from ...stats import r2_score, summary
+from ...stats import apply_test_function, r2_score, summary
+from ...stats.stats_utils import make_ufunc
 from ...utils import Numba
 from ..helpers import (  # pylint: disable=unused-import
     check_multiple_attrs,
@@ -55,3 +57,42 @@ def test_numba_stats():
     assert state == Numba.numba_flag  # Ensure that inital state = final state
     assert np.allclose(non_numba, with_numba)
     assert np.allclose(non_numba_one_dimensional, with_numba_one_dimensional)
+
+
+@pytest.mark.parametrize("ravel", [True, False])
+def test_make_ufunc_jit(ravel):
+    func = lambda x: np.mean(x > 0.5)
+    ary = np.random.randn(3, 5, 4, 100)
+    ufunc_jit = make_ufunc(func, ravel=ravel, jit=True)
+    assert np.allclose(make_ufunc(func, ravel=ravel)(ary), ufunc_jit(ary))
+    func2 = lambda y, x: np.sum(x) * y[0]
+    ary2 = np.random.randn(3, 5, 2)
+    assert np.allclose(
+        make_ufunc(func2, n_input=2, ravel=ravel)(ary2, ary),
+        make_ufunc(func2, n_input=2, ravel=ravel, jit=True)(ary2, ary),
+    )
+
+
+def test_make_ufunc_jit_fallback():
+    func = lambda x: np.percentile(x, [5, 10], interpolation="linear")[0]
+    ary = np.random.randn(3, 4, 100)
+    ufunc = make_ufunc(func, jit=True)
+    with pytest.warns(UserWarning, match="Could not compile"):
+        res = ufunc(ary)
+    assert np.allclose(res, make_ufunc(func)(ary))
+
+
+def test_summary_jit_stat_funcs(centered_eight):
+    stat_funcs = {"tail": lambda x: np.mean(x > 2), "median": np.median}
+    summary_jit = summary(centered_eight, stat_funcs=stat_funcs, jit_stat_funcs=True)
+    assert np.allclose(summary_jit, summary(centered_eight, stat_funcs=stat_funcs))
+
+
+def test_apply_test_function_jit():
+    idata = load_arviz_data("centered_eight")
+    idata_jit = load_arviz_data("centered_eight")
+    func = lambda y, theta: np.min(y)
+    apply_test_function(idata, func)
+    apply_test_function(idata_jit, func, ufunc_kwargs={"jit": True})
+    assert np.allclose(idata.observed_data.T, idata_jit.observed_data.T)
+    assert np.allclose(idata.posterior_predictive.T, idata_jit.posterior_predictive.T)
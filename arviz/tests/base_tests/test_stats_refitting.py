@@ -0,0 +1,198 @@
+# pylint: disable=redefined-outer-name, abstract-method
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_array_equal
+from scipy.stats import norm
+
+from ...data import from_dict
+from ...stats import compare, kfold, loo, reloo
+from ...wrappers import SamplingWrapper
+
+
+class NormalSamplingWrapper(SamplingWrapper):
+    """Stub wrapper sampling the exact posterior of a normal mean with known sigma=1."""
+
+    def __init__(self, y, fail_on=None, **kwargs):
+        self.y = y
+        self.fail_on = fail_on
+        self.n_refits = 0
+        posterior = self._posterior_draws(y)
+        idata_orig = from_dict(
+            posterior={"mu": posterior},
+            log_likelihood={"y": norm.logpdf(y, posterior[..., None], 1)},
+            observed_data={"y": y},
+        )
+        super().__init__(
+            model=None,
+            idata_orig=idata_orig,
+            log_like_fun=lambda obs, pars: norm.logpdf(obs, pars[0], 1).sum(),
+            **kwargs,
+        )
+
+    @staticmethod
+    def _posterior_draws(y):
+        # normal(0, 10) prior on the mean
+        precision = len(y) + 1 / 100
+        rng = np.random.default_rng(len(y))
+        return rng.normal(np.sum(y) / precision, precision ** -0.5, size=(2, 500))
+
+    def sel_observations(self, idx):
+        mask = np.zeros(len(self.y), dtype=bool)
+        mask[idx] = True
+        return self.y[~mask], self.y[mask]
+
+    def sample(self, modified_observed_data):
+        posterior = self._posterior_draws(modified_observed_data)
+        if self.fail_on is not None and self.fail_on not in modified_observed_data:
+            raise RuntimeError("Refit failed")
+        self.n_refits += 1
+        return posterior
+
+    def get_inference_data(self, fitted_model):
+        return from_dict(posterior={"mu": fitted_model})
+
+
+@pytest.fixture(scope="module")
+def y_obs():
+    return np.random.default_rng(0).normal(size=20)
+
+
+@pytest.fixture(scope="module")
+def loo_orig(y_obs):
+    loo_data = loo(NormalSamplingWrapper(y_obs).idata_orig, pointwise=True)
+    pareto_k = loo_data.pareto_k.copy()
+    pareto_k[[2, 5, 11]] = 1
+    loo_data.pareto_k = pareto_k
+    return loo_data
+
+
+def test_reloo(y_obs, loo_orig):
+    wrapper = NormalSamplingWrapper(y_obs)
+    loo_refitted = reloo(wrapper, loo_orig=loo_orig, verbose=False)
+    assert wrapper.n_refits == 3
+    assert np.all(loo_refitted.pareto_k.values[[2, 5, 11]] == 0)
+    assert np.all(loo_orig.pareto_k.values[[2, 5, 11]] == 1)
+    # the exact posterior makes the refitted values close to the psis ones
+    assert_allclose(loo_refitted.loo_i, loo_orig.loo_i, rtol=0.05)
+    assert_allclose(loo_refitted.loo, loo_refitted.loo_i.values.sum())
+
+
+def test_reloo_executor(y_obs, loo_orig):
+    expected = reloo(NormalSamplingWrapper(y_obs), loo_orig=loo_orig, verbose=False)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        loo_refitted = reloo(
+            NormalSamplingWrapper(y_obs), loo_orig=loo_orig, verbose=False, executor=executor
+        )
+    assert_allclose(loo_refitted.loo_i, expected.loo_i)
+    assert_allclose(loo_refitted.p_loo, expected.p_loo)
+
+
+def test_reloo_checkpoint(y_obs, loo_orig, tmp_path):
+    checkpoint = str(tmp_path / "reloo.json")
+    expected = reloo(NormalSamplingWrapper(y_obs), loo_orig=loo_orig, verbose=False)
+    with pytest.raises(RuntimeError):
+        reloo(
+            NormalSamplingWrapper(y_obs, fail_on=y_obs[11]),
+            loo_orig=loo_orig,
+            verbose=False,
+            checkpoint=checkpoint,
+        )
+    wrapper = NormalSamplingWrapper(y_obs)
+    loo_refitted = reloo(wrapper, loo_orig=loo_orig, verbose=False, checkpoint=checkpoint)
+    assert wrapper.n_refits == 1
+    assert_allclose(loo_refitted.loo_i, expected.loo_i)
+
+
+class MomentMatchNormalWrapper(NormalSamplingWrapper):
+    """Stub wrapper also implementing the densities required for moment matching."""
+
+    def log_prob(self, parameters):
+        mu = parameters[:, 0]
+        return norm.logpdf(self.y[:, None], mu, 1).sum(axis=0) + norm.logpdf(mu, 0, 10)
+
+    def log_likelihood_i(self, idx, parameters):
+        return norm.logpdf(self.y[idx][:, None], parameters[:, 0], 1).sum(axis=0)
+
+
+@pytest.fixture(scope="module")
+def y_outlier(y_obs):
+    y_outlier = y_obs.copy()
+    y_outlier[3] = 12
+    return y_outlier
+
+
+def test_reloo_moment_match(y_outlier):
+    wrapper = MomentMatchNormalWrapper(y_outlier)
+    loo_orig = loo(wrapper.idata_orig, pointwise=True)
+    assert loo_orig.pareto_k.values[3] > 0.7
+    loo_mm = reloo(wrapper, loo_orig=loo_orig, verbose=False, moment_match=True)
+    assert wrapper.n_refits == 0
+    assert loo_mm.pareto_k.values[3] < 0.7
+    y_loo = np.delete(y_outlier, 3)
+    precision = len(y_loo) + 1 / 100
+    exact = norm.logpdf(y_outlier[3], y_loo.sum() / precision, (1 + 1 / precision) ** 0.5)
+    assert abs(loo_mm.loo_i.values[3] - exact) < abs(loo_orig.loo_i.values[3] - exact)
+    assert_allclose(np.delete(loo_mm.loo_i.values, 3), np.delete(loo_orig.loo_i.values, 3))
+
+
+def test_reloo_moment_match_fallback(y_outlier):
+    wrapper = MomentMatchNormalWrapper(y_outlier)
+    loo_mm = reloo(wrapper, verbose=False, moment_match=True, max_iters=0)
+    assert wrapper.n_refits == 1
+    assert loo_mm.pareto_k.values[3] == 0
+
+
+def test_reloo_moment_match_not_implemented(y_outlier):
+    with pytest.raises(TypeError, match="log_prob"):
+        reloo(NormalSamplingWrapper(y_outlier), verbose=False, moment_match=True)
+
+
+def test_kfold(y_obs):
+    wrapper = NormalSamplingWrapper(y_obs)
+    kfold_data = kfold(wrapper, k=5, seed=0, n_jobs=1, verbose=False)
+    assert wrapper.n_refits == 5
+    assert_array_equal(np.bincount(kfold_data.folds.values), [4, 4, 4, 4, 4])
+    for fold in range(5):
+        held_out = kfold_data.folds.values == fold
+        y_train = y_obs[~held_out]
+        precision = len(y_train) + 1 / 100
+        exact = norm.logpdf(y_obs[held_out], y_train.sum() / precision, (1 + 1 / precision) ** 0.5)
+        assert_allclose(kfold_data.loo_i.values[held_out], exact, atol=0.05)
+    assert_allclose(kfold_data.loo, kfold_data.loo_i.values.sum())
+
+
+def test_kfold_parallel(y_obs):
+    folds = np.arange(len(y_obs)) % 4
+    expected = kfold(NormalSamplingWrapper(y_obs), folds=folds, n_jobs=1, verbose=False)
+    kfold_data = kfold(NormalSamplingWrapper(y_obs), folds=folds, n_jobs=2, verbose=False)
+    assert_allclose(kfold_data.loo_i, expected.loo_i)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        kfold_data = kfold(
+            NormalSamplingWrapper(y_obs), folds=folds, executor=executor, verbose=False
+        )
+    assert_allclose(kfold_data.loo_i, expected.loo_i)
+
+
+def test_kfold_stratify(y_obs):
+    stratify = np.repeat([0, 1], [15, 5])
+    kfold_data = kfold(NormalSamplingWrapper(y_obs), k=5, stratify=stratify, verbose=False)
+    folds = kfold_data.folds.values
+    assert_array_equal(np.bincount(folds[stratify == 1]), [1, 1, 1, 1, 1])
+    assert_array_equal(np.bincount(folds[stratify == 0]), [3, 3, 3, 3, 3])
+
+
+@pytest.mark.parametrize("kwargs", [{"k": 1}, {"k": 21}, {"folds": [0, 1]}, {"stratify": [0, 1]}])
+def test_kfold_bad_folds(y_obs, kwargs):
+    with pytest.raises(ValueError):
+        kfold(NormalSamplingWrapper(y_obs), verbose=False, **kwargs)
+
+
+def test_kfold_compare(y_obs):
+    kfold_data = kfold(NormalSamplingWrapper(y_obs), k=4, seed=0, verbose=False)
+    loo_data = loo(NormalSamplingWrapper(y_obs).idata_orig, pointwise=True)
+    assert_allclose(kfold_data.p_loo, loo_data.p_loo, atol=0.5)
+    assert "loo" in str(kfold_data)
+    df_comp = compare({"kfold": kfold_data, "loo": loo_data}, ic="loo", scale="log")
+    assert set(df_comp.index) == {"kfold", "loo"}
@@ -2,18 +2,22 @@
 #  pylint: disable=no-member
 import numpy as np
 import pytest
-from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_almost_equal, assert_array_equal
 from scipy.special import logsumexp
 from scipy.stats import circstd
 
 from ...data import from_dict, load_arviz_data
+from ...rcparams import rc_context
 from ...stats.density_utils import histogram
 from ...stats.stats_utils import (
     ELPDData,
+    _QuantileSketch,
     _angle,
     _circfunc,
     _circular_standard_deviation,
     _sqrt,
+    autocorr,
+    autocov,
     get_log_likelihood,
 )
 from ...stats.stats_utils import logsumexp as _logsumexp
@@ -150,6 +154,55 @@ def test_wrap_ufunc_out_shape_multi_output_diff():
     assert res2.shape == (*ary.shape[:-1], 10, 4)
 
 
+@pytest.mark.parametrize("max_lag", (0, 3, 40, 998, 999, 2000))
+@pytest.mark.parametrize("axis", (0, -1))
+def test_autocov_max_lag(max_lag, axis):
+    ary = np.cumsum(np.random.randn(4, 1000), axis=-1)
+    if axis == 0:
+        ary = ary.T
+    acov = autocov(ary, axis=axis)
+    acov_trunc = autocov(ary, axis=axis, max_lag=max_lag)
+    n_lags = min(max_lag + 1, 1000)
+    assert acov_trunc.shape[axis] == n_lags
+    assert np.allclose(acov_trunc, np.take(acov, np.arange(n_lags), axis=axis))
+    acorr_trunc = autocorr(ary, axis=axis, max_lag=max_lag)
+    assert np.allclose(acorr_trunc, np.take(autocorr(ary, axis=axis), np.arange(n_lags), axis=axis))
+
+
+@pytest.mark.parametrize("merge", (True, False))
+def test_quantile_sketch(merge):
+    ary = np.random.randn(3, 20000)
+    size = 64
+    if merge:
+        sketch = _QuantileSketch(3, size=size).update(ary[:, :7001])
+        sketch.merge(_QuantileSketch(3, size=size).update(ary[:, 7001:]))
+    else:
+        sketch = _QuantileSketch(3, size=size)
+        for start in range(0, 20000, 999):
+            sketch.update(ary[:, start : start + 999])
+    assert sketch.count == 20000
+    values = np.random.randn(3, 100)
+    less, less_equal = sketch.ranks(values)
+    exact = np.array([np.searchsorted(np.sort(row), vals) for row, vals in zip(ary, values)])
+    assert np.all(less == less_equal)
+    error_bound = 20000 * np.log2(20000 / size) / (2 * size)
+    assert np.abs(less - exact).max() <= error_bound
+    assert np.allclose(sketch.quantile(0.5), np.median(ary, axis=1), atol=0.1)
+
+
+def test_quantile_sketch_ties():
+    ary = np.random.randint(0, 10, size=(3, 50)).astype(float)
+    sketch = _QuantileSketch(3, size=64).update(ary)
+    values = np.tile(np.arange(-1, 11, 0.5), (3, 1))
+    sorted_ary = np.sort(ary, axis=1)
+    for side, ranks in zip(("left", "right"), sketch.ranks(values)):
+        exact = np.array(
+            [np.searchsorted(row, vals, side=side) for row, vals in zip(sorted_ary, values)]
+        )
+        assert np.all(ranks == exact)
+    assert np.all(np.array(sketch.ranks(values)) == sketch.ranks(values, assume_sorted=True))
+
+
 @pytest.mark.parametrize("n_output", (1, 2, 3))
 def test_make_ufunc(n_output):
     if n_output == 3:
@@ -191,6 +244,63 @@ def test_make_ufunc_out(n_output):
         assert (res == 1).all()
 
 
+@pytest.mark.parametrize("n_output", (1, 2))
+@pytest.mark.parametrize("ravel", (True, False))
+def test_make_ufunc_vectorized(n_output, ravel):
+    axis = -1 if ravel else (-2, -1)
+    if n_output == 2:
+        func = lambda x: (np.mean(x, axis=axis), np.std(x, axis=axis))
+    else:
+        func = lambda x: np.mean(x, axis=axis)
+    ufunc = make_ufunc(func, n_output=n_output, ravel=ravel)
+    vectorized_ufunc = make_ufunc(func, n_output=n_output, ravel=ravel, vectorized=True)
+    ary = np.random.randn(3, 5, 4, 100)
+    res = ufunc(ary)
+    vectorized_res = vectorized_ufunc(ary)
+    if n_output == 1:
+        res, vectorized_res = (res,), (vectorized_res,)
+    for res_i, vectorized_res_i in zip(res, vectorized_res):
+        assert vectorized_res_i.shape == (3, 5)
+        assert np.allclose(res_i, vectorized_res_i)
+
+
+def test_make_ufunc_vectorized_out_shape():
+    func = lambda x: np.moveaxis(np.quantile(x, [0.25, 0.75], axis=-1), 0, -1)
+    ary = np.random.randn(3, 5, 100)
+    res = make_ufunc(func, n_dims=1, vectorized=True, ravel=False)(ary, out_shape=(2,))
+    assert res.shape == (3, 5, 2)
+    with pytest.raises(TypeError, match="Shape incorrect"):
+        make_ufunc(func, n_dims=1, vectorized=True, ravel=False)(ary, out_shape=(3,))
+
+
+@pytest.mark.parametrize("n_output", (1, 2))
+@pytest.mark.parametrize("vectorized", (True, False))
+@pytest.mark.parametrize("n_jobs", (2, 3, None))
+def test_make_ufunc_n_jobs(n_output, vectorized, n_jobs):
+    if n_output == 2:
+        func = lambda x: (np.mean(x, axis=-1), np.std(x, axis=-1))
+    else:
+        func = lambda x: np.mean(x, axis=-1)
+    ufunc = make_ufunc(func, n_output=n_output, vectorized=vectorized, n_jobs=1)
+    threaded_ufunc = make_ufunc(func, n_output=n_output, vectorized=vectorized, n_jobs=n_jobs)
+    ary = np.random.randn(7, 5, 4, 100)
+    res = ufunc(ary)
+    threaded_res = threaded_ufunc(ary)
+    if n_output == 1:
+        res, threaded_res = (res,), (threaded_res,)
+    for res_i, threaded_res_i in zip(res, threaded_res):
+        assert threaded_res_i.shape == (7, 5)
+        assert_array_equal(res_i, threaded_res_i)
+
+
+def test_wrap_xarray_ufunc_n_jobs():
+    dataset = from_dict({"a": np.random.randn(2, 100, 7), "b": np.random.randn(2, 100)}).posterior
+    res = wrap_xarray_ufunc(np.mean, dataset)
+    with rc_context(rc={"stats.n_jobs": 3}):
+        threaded_res = wrap_xarray_ufunc(np.mean, dataset)
+    assert res.equals(threaded_res)
+
+
 def test_make_ufunc_bad_ndim():
     with pytest.raises(TypeError):
         make_ufunc(np.mean, n_dims=0)
@@ -734,10 +734,19 @@ def either_dict_or_kwargs(
 class Dask:
     """Class to toggle Dask states.
 
+    Stats and diagnostics computed on datasets backed by dask arrays, for example opened
+    from chunked netCDF or Zarr stores, are evaluated lazily and blockwise over the
+    non sample dimensions without needing to enable Dask. Functions returning xarray
+    objects return lazy results, those returning pandas objects or
+    :class:`~arviz.stats.ELPDData` compute all they need in a single pass. The work is
+    executed by the active dask scheduler, e.g. a ``dask.distributed`` client.
+    Enabling Dask sets the default kwargs passed to :func:`~arviz.wrap_xarray_ufunc`.
+
     Warnings
     --------
-    Dask integration is an experimental feature still in progress. It can already be used
-    but it doesn't work with all stats nor diagnostics yet.
+    Dask integration is an experimental feature still in progress. Draws of a single
+    variable element are loaded together, chunking should therefore be done along
+    the other dimensions. :func:`~arviz.apply_test_function` loads its inputs.
     """
 
     dask_flag = False
@@ -162,6 +162,48 @@ class SamplingWrapper:
         )
         return log_like_idx
 
+    def log_prob(self, parameters):
+        """Unnormalized log posterior density of the model conditioned on all the observations.
+
+        **Not implemented**: This method must be implemented by the SamplingWrapper subclasses
+        to use moment matching in ``reloo``. It is documented here to show its format and
+        call signature.
+
+        Parameters
+        ----------
+        parameters: ndarray
+            Array of shape ``(n_samples, n_parameters)``. Each row contains the values of all
+            the variables in the posterior group of ``idata_orig``, flattened and concatenated
+            in the order of the group.
+
+        Returns
+        -------
+        log_prob: ndarray
+            Log posterior density, up to a constant, of each row of ``parameters``.
+        """
+        raise NotImplementedError("log_prob method must be implemented for each subclass")
+
+    def log_likelihood_i(self, idx, parameters):
+        """Log likelihood of the observations ``idx`` for each row of ``parameters``.
+
+        **Not implemented**: This method must be implemented by the SamplingWrapper subclasses
+        to use moment matching in ``reloo``. It is documented here to show its format and
+        call signature.
+
+        Parameters
+        ----------
+        idx
+            Indexes of the observations, in the same format as in ``sel_observations``.
+        parameters: ndarray
+            Array of shape ``(n_samples, n_parameters)``, see :meth:`log_prob`.
+
+        Returns
+        -------
+        log_likelihood: ndarray
+            Log likelihood of the observations ``idx`` for each row of ``parameters``.
+        """
+        raise NotImplementedError("log_likelihood_i method must be implemented for each subclass")
+
     def _check_method_is_implemented(self, method, *args):
         """Check a given method is implemented."""
         try:
@@ -192,10 +234,12 @@ class SamplingWrapper:
             "sel_observations",
             "sample",
             "get_inference_data",
+            "log_prob",
         )
         supported_methods_2args = (
             "point_log_likelihood",
             "log_likelihood__i",
+            "log_likelihood_i",
         )
         supported_methods = [*supported_methods_1arg, *supported_methods_2args]
         bad_methods = [method for method in methods if method not in supported_methods]
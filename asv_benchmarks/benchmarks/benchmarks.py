@@ -6,6 +6,7 @@ from scipy.stats import circstd
 
 import arviz as az
 from arviz.stats.density_utils import _fast_kde_2d, histogram, kde
+from arviz.stats.stats import _bb_pseudo_bma_weights, _stacking_weights
 from arviz.stats.stats_utils import _circular_standard_deviation, stats_variance_2d
 
 
@@ -104,3 +105,18 @@ class Atleast_Nd:
 
     def time_atleast_1d(self, source):
         self.atleast_1d(self.x)
+
+
+class CompareWeights:
+    params = [("stacking", "BB-pseudo-BMA"), (10 ** 3, 10 ** 5)]
+    param_names = ("method", "n")
+
+    def setup(self, method, n):
+        base = np.random.normal(-1, 0.5, size=(n, 1))
+        self.ic_i_val = base + np.random.normal(0, 0.3, size=(n, 5))
+
+    def time_compare_weights(self, method, n):
+        if method == "stacking":
+            _stacking_weights(self.ic_i_val, 1)
+        else:
+            _bb_pseudo_bma_weights(self.ic_i_val, 1, 1000, 1, None)